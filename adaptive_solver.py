@@ -0,0 +1,144 @@
+# 自适应步长积分（Dormand-Prince 5(4) 嵌入式龙格-库塔法）
+# 用于无界面的长时间离线计算：按误差自动调整步长，并通过稠密输出在等间隔时间网格上采样
+
+import numpy as np
+
+from config import ExperimentConfig
+from integrators import angular_acceleration
+
+# Dormand-Prince 系数
+_C = np.array([0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1])
+_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+]
+_B = np.array([35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84])
+# 五阶解与四阶解之差（含 FSAL 的第 7 级）
+_E = np.array([-71 / 57600, 0, 71 / 16695, -71 / 1920, 17253 / 339200, -22 / 525, 1 / 40])
+# 四阶稠密输出多项式系数：y(t0 + x·h) = y0 + h·Σ k_i·(P_i · [x, x², x³, x⁴])
+_P = np.array([
+    [1, -8048581381 / 2820520608, 8663915743 / 2820520608, -12715105075 / 11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200 / 32700410799, -68118460800 / 10900136933, 87487479700 / 32700410799],
+    [0, -1754552775 / 470086768, 14199869525 / 1410260304, -10690763975 / 1880347072],
+    [0, 127303824393 / 49829197408, -318862633887 / 49829197408, 701980252875 / 199316789632],
+    [0, -282668133 / 205662961, 2019193451 / 616988883, -1453857185 / 822651844],
+    [0, 40617522 / 29380423, -110615467 / 29380423, 69997945 / 29380423],
+])
+
+SAFETY = 0.9
+MIN_FACTOR = 0.2
+MAX_FACTOR = 10.0
+MIN_SCALE = 1e-300  # 误差尺度的下限：纯相对容差且状态为 0 时避免 0/0
+
+
+def _derivative(y, g, radius):
+    """状态 y = [theta, omega] 的导数"""
+    return np.stack([y[1], angular_acceleration(y[0], g, radius)])
+
+
+def solve_adaptive(theta0, omega0, g, radius, duration, sample_dt,
+                   rtol=ExperimentConfig.ADAPTIVE_RTOL, atol=ExperimentConfig.ADAPTIVE_ATOL,
+                   first_step=None, max_step=np.inf):
+    """自适应步长求解一组小球的运动
+
+    所有小球共用一个步长（误差取各小球的均方根），适合批量离线计算。
+    返回字典：
+        times / theta / omega —— 等间隔采样结果，theta、omega 形状为 (采样数, 小球数)；
+                                  采样点不超过 duration，duration 不是 sample_dt 的整数倍时最后一个采样点早于终点
+        final_theta / final_omega —— 积分终点 duration 处的状态
+        n_steps / n_rejected / n_evals —— 接受步数、拒绝步数与加速度求值次数
+    rtol、atol 不能为负，也不能同时为 0（ValueError）；
+    步长缩小到浮点分辨率仍达不到容差时抛出 RuntimeError，而不是原地打转。
+    """
+    if rtol < 0 or atol < 0 or (rtol == 0 and atol == 0):
+        raise ValueError(f"容差必须非负且不能同时为 0：rtol={rtol}, atol={atol}")
+    theta0 = np.atleast_1d(np.asarray(theta0, dtype=float))
+    n = len(theta0)
+    g = np.broadcast_to(np.asarray(g, dtype=float), n)
+    radius = np.broadcast_to(np.asarray(radius, dtype=float), n)
+    y = np.stack([theta0, np.broadcast_to(np.asarray(omega0, dtype=float), n)])
+
+    times = np.arange(0, duration + sample_dt / 2, sample_dt)
+    # 采样网格不能超出积分终点（duration 不是 sample_dt 的整数倍时最后一个点会越界），
+    # 只容许 i * sample_dt 的舍入误差（几个 ulp）
+    end_tolerance = 4 * np.spacing(float(duration))
+    times = times[times <= duration + end_tolerance]
+    theta_out = np.empty((len(times), n))
+    omega_out = np.empty((len(times), n))
+    theta_out[0], omega_out[0] = y
+    next_sample = 1
+
+    k = np.empty((7,) + y.shape)
+    k[0] = _derivative(y, g, radius)
+    n_evals = 1
+    if first_step is None:
+        # 以初始变化率估计首步：使一步内状态变化约为容差的 1/5 次方量级
+        scale = np.maximum(atol + rtol * np.abs(y), MIN_SCALE)
+        d0 = np.sqrt(np.mean((y / scale) ** 2))
+        d1 = np.sqrt(np.mean((k[0] / scale) ** 2))
+        first_step = 0.01 * d0 / d1 if d0 > 1e-5 and d1 > 1e-5 else 1e-6
+    h = min(first_step, max_step, duration)
+
+    t = 0.0
+    n_steps = 0
+    n_rejected = 0
+    while t < duration:
+        h = min(h, duration - t)
+        if h < 16 * np.spacing(t) and h < duration - t:
+            raise RuntimeError(f"步长在 t={t:.6g} s 处缩小到 {h:.3g} s，无法达到容差"
+                               f"（rtol={rtol}, atol={atol}）")
+        for i in range(1, 6):
+            dy = np.tensordot(_A[i], k[:i], axes=1)
+            k[i] = _derivative(y + h * dy, g, radius)
+        y_new = y + h * np.tensordot(_B, k[:6], axes=1)
+        k[6] = _derivative(y_new, g, radius)
+        n_evals += 6
+
+        error = h * np.tensordot(_E, k, axes=1)
+        scale = np.maximum(atol + rtol * np.maximum(np.abs(y), np.abs(y_new)), MIN_SCALE)
+        error_norm = np.sqrt(np.mean((error / scale) ** 2))
+
+        if not error_norm <= 1.0:  # 含 NaN：状态已不是有限值时同样拒绝并缩小步长
+            n_rejected += 1
+            h *= max(MIN_FACTOR, SAFETY * error_norm ** -0.2)  # NaN 时取 MIN_FACTOR
+            continue
+
+        # 稠密输出：在本步区间 (t, t+h] 内的采样点插值
+        t_new = t + h
+        stop = np.searchsorted(times, t_new, side='right')
+        if stop > next_sample:
+            x = (times[next_sample:stop] - t) / h
+            q = np.tensordot(k, _P, axes=(0, 0))  # 形状 (2, 小球数, 4)
+            powers = np.stack([x, x**2, x**3, x**4])
+            values = y[:, :, None] + h * np.einsum('bnp,ps->bns', q, powers)
+            theta_out[next_sample:stop] = values[0].T
+            omega_out[next_sample:stop] = values[1].T
+            next_sample = stop
+
+        t = t_new
+        y = y_new
+        k[0] = k[6]  # FSAL：本步最后一级即下一步第一级
+        n_steps += 1
+        factor = MAX_FACTOR if error_norm == 0 else SAFETY * error_norm ** -0.2
+        h = min(h * min(MAX_FACTOR, max(MIN_FACTOR, factor)), max_step)
+
+    # 浮点舍入可能使最后一个采样点略超出积分终点（不超过 end_tolerance），取终点状态
+    if next_sample < len(times):
+        theta_out[next_sample:] = y[0]
+        omega_out[next_sample:] = y[1]
+
+    return {
+        'times': times,
+        'theta': theta_out,
+        'omega': omega_out,
+        'final_theta': y[0].copy(),
+        'final_omega': y[1].copy(),
+        'n_steps': n_steps,
+        'n_rejected': n_rejected,
+        'n_evals': n_evals,
+    }
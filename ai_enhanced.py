@@ -1,332 +1,535 @@
 # 增强版变速圆周运动小球动画实验
-from vpython import *
 import math
 import time
-import csv
 from datetime import datetime
-
-# 全局变量
-balls = []  # 小球列表
-data_records = []  # 数据记录
-recording = False  # 是否记录数据
-start_time = 0
-current_ball_index = 0  # 当前选中的小球索引
+from config import ExperimentConfig
+from display import DownsampledCurve, ReadoutPanel, VisualSync
+from integrators import INTEGRATORS
+from physics_engine import PendulumEngine, engine_field
+from profiling import profiler
+from recorder import DataRecorder, StreamingCSVWriter
+from sim_clock import SimulationClock
 
 class PhysicsBall:
-    def __init__(self, mass=0.1, radius=2.0, ball_radius=0.1, color_val=color.red, 
+    """单个小球的可视化对象，其物理状态是批量引擎中某一行的视图"""
+
+    theta = engine_field('theta')
+    omega = engine_field('omega')
+    mass = engine_field('mass')
+    radius = engine_field('radius')
+    g = engine_field('g')
+    active = engine_field('active')
+
+    # 物理量
+    speed = engine_field('speed')
+    kinetic_energy = engine_field('kinetic_energy')
+    potential_energy = engine_field('potential_energy')
+    total_energy = engine_field('total_energy')
+    centripetal_acc = engine_field('centripetal_acc')
+
+    def __init__(self, engine, visuals, mass=0.1, radius=2.0, ball_radius=0.1, color_val=None, 
                  initial_theta=0.5, initial_omega=0, name="小球1"):
-        self.mass = mass
-        self.radius = radius
+        from vpython import arrow, color, sphere, vector
+
+        if color_val is None:
+            color_val = color.red
+        self.engine = engine
+        self.visuals = visuals
+        self.index = engine.add_ball(mass=mass, radius=radius, theta=initial_theta,
+                                     omega=initial_omega, g=9.8)  # 重力加速度
         self.ball_radius = ball_radius
-        self.theta = initial_theta
-        self.omega = initial_omega
         self.name = name
-        self.g = 9.8  # 重力加速度
         
         # 创建可视化对象
         self.ball = sphere(pos=self.get_position(), radius=ball_radius, 
                           color=color_val, make_trail=True, trail_type="curve", 
-                          interval=10, retain=300)
+                          interval=ExperimentConfig.TRAIL_INTERVAL,
+                          retain=ExperimentConfig.TRAIL_RETAIN)
         self.arrow_v = arrow(pos=self.ball.pos, axis=vector(0,0,0), 
                             color=color.blue, shaftwidth=0.03)
         self.arrow_c = arrow(pos=self.ball.pos, axis=vector(0,0,0), 
                             color=color.green, shaftwidth=0.03)
         self.arrow_g = arrow(pos=self.ball.pos, axis=vector(0,0,0), 
                             color=color.orange, shaftwidth=0.03)
-        
-        # 物理量
-        self.kinetic_energy = 0
-        self.potential_energy = 0
-        self.total_energy = 0
-        self.speed = 0
-        self.centripetal_acc = 0
+        visuals.add(self.index, self.ball, self.arrow_v, self.arrow_c, self.arrow_g)
         
     def get_position(self):
-        x = self.radius * sin(self.theta)
-        y = self.radius * cos(self.theta)
+        from vpython import vector
+
+        x = self.radius * math.sin(self.theta)
+        y = self.radius * math.cos(self.theta)
         return vector(x, y, 0)
     
     def update(self, dt):
-        # 重力在切向的分量产生的角加速度
-        tangential_acc = self.g * sin(self.theta)
-        alpha = tangential_acc / self.radius
-        
-        # 更新角速度和角度
-        self.omega += alpha * dt
-        self.theta += self.omega * dt
-        
-        # 更新位置
-        self.ball.pos = self.get_position()
-        
-        # 计算物理量
-        self.speed = abs(self.omega * self.radius)
-        self.kinetic_energy = 0.5 * self.mass * self.speed**2
-        height = self.radius * cos(self.theta) + self.radius  # 相对于最低点的高度
-        self.potential_energy = self.mass * self.g * height
-        self.total_energy = self.kinetic_energy + self.potential_energy
-        self.centripetal_acc = self.omega**2 * self.radius
-        
-        # 更新箭头
-        self.update_arrows()
+        # 单独推进本小球（批量推进请使用 engine.step）
+        self.engine.step(dt, active=[self.index])
+        self.sync_visual()
+    
+    def sync_visual(self):
+        # 根据引擎中的状态更新位置和箭头（小于阈值的变化不写入画面）
+        with profiler.phase('visual_sync'):
+            self.visuals.sync([self.index])
     
     def update_arrows(self):
-        # 速度箭头（切向）
-        v = self.omega * self.radius
-        vx = v * cos(self.theta)
-        vy = -v * sin(self.theta)  # 负号因为角度定义
-        self.arrow_v.pos = self.ball.pos
-        self.arrow_v.axis = vector(vx, vy, 0) * 0.15
-        
-        # 向心力箭头（指向圆心）
-        centripetal_force = self.mass * self.centripetal_acc
-        force_scale = 0.05
-        self.arrow_c.pos = self.ball.pos
-        center_dir = -self.ball.pos.norm()
-        self.arrow_c.axis = center_dir * centripetal_force * force_scale
-        
-        # 重力箭头
-        gravity_force = self.mass * self.g
-        self.arrow_g.pos = self.ball.pos
-        self.arrow_g.axis = vector(0, -gravity_force * force_scale, 0)
+        # 立即重写本小球的位置和箭头
+        with profiler.phase('update_arrows'):
+            self.visuals.sync([self.index], force=True)
     
     def reset(self, theta, omega):
         self.theta = theta
         self.omega = omega
         self.ball.pos = self.get_position()
+        self.engine.update_derived([self.index])
         self.ball.clear_trail()
         self.update_arrows()
 
-# 场景设置
-scene = canvas(title="增强版变速圆周运动小球实验", width=1200, height=800, background=color.white)
-scene.camera.pos = vector(0, 0, 8)
-
-# 绘制圆轨道
-circle = ring(pos=vector(0,0,0), axis=vector(0,0,1), radius=2.0, thickness=0.02, color=color.gray(0.7))
-
-# 创建坐标轴
-axis_x = arrow(pos=vector(-3,0,0), axis=vector(6,0,0), color=color.gray(0.5), shaftwidth=0.01)
-axis_y = arrow(pos=vector(0,-3,0), axis=vector(0,6,0), color=color.gray(0.5), shaftwidth=0.01)
-
-# 添加刻度标记
-for i in range(-2, 3):
-    if i != 0:
-        # X轴刻度
-        box(pos=vector(i, 0, 0), size=vector(0.02, 0.1, 0.02), color=color.gray(0.5))
-        label(pos=vector(i, -0.2, 0), text=str(i), height=10, color=color.black, box=False)
-        # Y轴刻度
-        box(pos=vector(0, i, 0), size=vector(0.1, 0.02, 0.02), color=color.gray(0.5))
-        label(pos=vector(-0.2, i, 0), text=str(i), height=10, color=color.black, box=False)
-
-# 状态变量
-is_running = False
-show_energy_graph = True
-show_vectors = True
-
-# 创建初始小球
-ball1 = PhysicsBall(mass=0.1, radius=2.0, ball_radius=0.08, color_val=color.red, 
-                   initial_theta=0.5, initial_omega=0, name="小球1")
-ball2 = PhysicsBall(mass=0.15, radius=2.0, ball_radius=0.08, color_val=color.blue, 
-                   initial_theta=1.0, initial_omega=0, name="小球2")
-ball3 = PhysicsBall(mass=0.2, radius=2.0, ball_radius=0.08, color_val=color.green, 
-                   initial_theta=-0.5, initial_omega=0, name="小球3")
-
-balls = [ball1, ball2, ball3]
-
-# 图表设置
-if show_energy_graph:
-    energy_graph = graph(title="能量随时间变化", xtitle="时间 (s)", ytitle="能量 (J)", 
-                        width=400, height=200, align="left")
-    ke_curve = gcurve(graph=energy_graph, color=color.red, label="动能")
-    pe_curve = gcurve(graph=energy_graph, color=color.blue, label="势能") 
-    te_curve = gcurve(graph=energy_graph, color=color.green, label="总能量")
-
-# 控件回调函数
-def set_theta(s):
-    global current_ball_index
-    if not is_running and current_ball_index < len(balls):
-        balls[current_ball_index].reset(s.value, balls[current_ball_index].omega)
-
-def set_omega(s):
-    global current_ball_index
-    if not is_running and current_ball_index < len(balls):
-        balls[current_ball_index].omega = s.value
-        balls[current_ball_index].update_arrows()
-
-def set_mass(s):
-    global current_ball_index
-    if not is_running and current_ball_index < len(balls):
-        balls[current_ball_index].mass = s.value
-
-def set_gravity(s):
-    for ball in balls:
-        ball.g = s.value
-
-def toggle_run():
-    global is_running, start_time, recording
-    is_running = not is_running
-    if is_running:
-        btn_run.text = "暂停"
-        start_time = time.time()
-    else:
-        btn_run.text = "开始"
+def main():
+    """建立场景与控件并运行主循环（导入本模块不会启动 VPython）"""
+    from vpython import (arrow, box, button, canvas, color, gcurve, graph, label, menu,
+                         pi, rate, ring, slider, vector, wtext)
+
+    # 运行状态
+    engine = PendulumEngine(ExperimentConfig.INTEGRATOR)  # 批量物理引擎，所有小球的状态都保存在这里
+    visuals = VisualSync(engine, vector)  # 只把可见且有变化的位置/箭头写入画面
+    energy_monitor = engine.attach_energy_monitor()  # 每个物理步更新各小球的能量统计（内存占用固定）
+    balls = []  # 小球列表
+    recorder = DataRecorder()  # 数据记录（列式预分配数组）
+    recording = False  # 是否记录数据
+    stream_writer = None  # 流式导出的后台写入器（STREAM_EXPORT 开启时使用）
+    current_ball_index = 0  # 当前选中的小球索引
+    dt = ExperimentConfig.SIMULATION_DT  # 固定物理步长
+    sim_clock = SimulationClock(dt)  # 仿真时间 = 已执行步数 × dt，支持慢放与快进
+
+    # 场景设置
+    scene = canvas(title="增强版变速圆周运动小球实验", width=1200, height=800, background=color.white)
+    scene.camera.pos = vector(0, 0, 8)
 
-def reset_all():
-    global is_running, data_records
+    # 绘制圆轨道
+    ring(pos=vector(0,0,0), axis=vector(0,0,1), radius=2.0, thickness=0.02, color=color.gray(0.7))
+
+    # 创建坐标轴
+    arrow(pos=vector(-3,0,0), axis=vector(6,0,0), color=color.gray(0.5), shaftwidth=0.01)
+    arrow(pos=vector(0,-3,0), axis=vector(0,6,0), color=color.gray(0.5), shaftwidth=0.01)
+
+    # 添加刻度标记
+    for i in range(-2, 3):
+        if i != 0:
+            # X轴刻度
+            box(pos=vector(i, 0, 0), size=vector(0.02, 0.1, 0.02), color=color.gray(0.5))
+            label(pos=vector(i, -0.2, 0), text=str(i), height=10, color=color.black, box=False)
+            # Y轴刻度
+            box(pos=vector(0, i, 0), size=vector(0.1, 0.02, 0.02), color=color.gray(0.5))
+            label(pos=vector(-0.2, i, 0), text=str(i), height=10, color=color.black, box=False)
+
+    # 状态变量
     is_running = False
-    btn_run.text = "开始"
-    for i, ball in enumerate(balls):
-        ball.reset(slider_theta.value if i == current_ball_index else ball.theta, 
-                  slider_omega.value if i == current_ball_index else ball.omega)
-    data_records = []
+    show_energy_graph = True
+    show_vectors = True
+
+    # 创建初始小球
+    ball1 = PhysicsBall(engine, visuals, mass=0.1, radius=2.0, ball_radius=0.08, color_val=color.red, 
+                       initial_theta=0.5, initial_omega=0, name="小球1")
+    ball2 = PhysicsBall(engine, visuals, mass=0.15, radius=2.0, ball_radius=0.08, color_val=color.blue, 
+                       initial_theta=1.0, initial_omega=0, name="小球2")
+    ball3 = PhysicsBall(engine, visuals, mass=0.2, radius=2.0, ball_radius=0.08, color_val=color.green, 
+                       initial_theta=-0.5, initial_omega=0, name="小球3")
+
+    balls = [ball1, ball2, ball3]
+    recorder.ball_names = [ball.name for ball in balls]  # 小球编号即引擎中的行号
+
+    # 可选：物理在独立进程中运行，本进程的 engine 只作为最新快照的镜像
+    worker = None
+    if ExperimentConfig.PHYSICS_WORKER:
+        from physics_worker import PhysicsWorker
+        worker = PhysicsWorker(engine, dt)
+
+    def push_ball(ball):
+        # 把本地修改的小球状态同步给物理进程
+        if worker is not None:
+            worker.push_row(ball.index)
+
+    # 图表设置
     if show_energy_graph:
-        ke_curve.data = []
-        pe_curve.data = []
-        te_curve.data = []
-
-def toggle_recording():
-    global recording, data_records
-    recording = not recording
-    if recording:
-        btn_record.text = "停止记录"
-        data_records = []
-    else:
-        btn_record.text = "开始记录"
-
-def export_data():
-    if data_records:
-        filename = f"physics_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        with open(filename, 'w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow(['时间(s)', '小球', '角度(rad)', '角速度(rad/s)', '速度(m/s)', 
-                           '动能(J)', '势能(J)', '总能量(J)', '向心加速度(m/s²)'])
-            writer.writerows(data_records)
-        print(f"数据已导出到 {filename}")
-
-def switch_ball():
-    global current_ball_index
-    current_ball_index = (current_ball_index + 1) % len(balls)
-    current_ball = balls[current_ball_index]
-    slider_theta.value = current_ball.theta
-    slider_omega.value = current_ball.omega
-    slider_mass.value = current_ball.mass
-    label_current_ball.text = f"当前小球: {current_ball.name}"
-
-def toggle_vectors():
-    global show_vectors
-    show_vectors = not show_vectors
-    for ball in balls:
-        ball.arrow_v.visible = show_vectors
-        ball.arrow_c.visible = show_vectors
-        ball.arrow_g.visible = show_vectors
-
-def toggle_ball_visibility(ball_index):
-    balls[ball_index].ball.visible = not balls[ball_index].ball.visible
-    balls[ball_index].arrow_v.visible = balls[ball_index].ball.visible and show_vectors
-    balls[ball_index].arrow_c.visible = balls[ball_index].ball.visible and show_vectors
-    balls[ball_index].arrow_g.visible = balls[ball_index].ball.visible and show_vectors
-
-# 控制面板
-scene.append_to_caption("\n<b>控制面板</b>\n")
-
-# 当前小球选择
-scene.append_to_caption("当前小球: ")
-label_current_ball = wtext(text=f"当前小球: {balls[0].name}")
-scene.append_to_caption("    ")
-button(text="切换小球", bind=switch_ball)
-scene.append_to_caption("\n")
-
-# 基本参数控制
-scene.append_to_caption("初始角度(弧度): ")
-slider_theta = slider(min=-pi, max=pi, value=0.5, length=200, bind=set_theta, right=15)
-scene.append_to_caption("\n初始角速度(rad/s): ")
-slider_omega = slider(min=-5, max=5, value=0, length=200, bind=set_omega, right=15)
-scene.append_to_caption("\n小球质量(kg): ")
-slider_mass = slider(min=0.05, max=0.5, value=0.1, length=200, bind=set_mass, right=15)
-scene.append_to_caption("\n重力加速度(m/s²): ")
-slider_gravity = slider(min=5, max=15, value=9.8, length=200, bind=set_gravity, right=15)
-scene.append_to_caption("\n")
-
-# 控制按钮
-btn_run = button(text="开始", bind=toggle_run)
-scene.append_to_caption("    ")
-button(text="重置", bind=reset_all)
-scene.append_to_caption("    ")
-btn_record = button(text="开始记录", bind=toggle_recording)
-scene.append_to_caption("    ")
-button(text="导出数据", bind=export_data)
-scene.append_to_caption("\n")
-
-# 显示选项
-button(text="切换矢量显示", bind=toggle_vectors)
-scene.append_to_caption("    小球显示: ")
-button(text="小球1", bind=lambda: toggle_ball_visibility(0))
-scene.append_to_caption(" ")
-button(text="小球2", bind=lambda: toggle_ball_visibility(1))
-scene.append_to_caption(" ")
-button(text="小球3", bind=lambda: toggle_ball_visibility(2))
-scene.append_to_caption("\n\n")
-
-# 实时数据显示
-scene.append_to_caption("<b>实时数据</b>\n")
-label_time = wtext(text="时间: 0.00 s")
-scene.append_to_caption("\n")
-label_speed = wtext(text="速度: 0.00 m/s")
-scene.append_to_caption("\n")
-label_ke = wtext(text="动能: 0.00 J")
-scene.append_to_caption("\n")
-label_pe = wtext(text="势能: 0.00 J")
-scene.append_to_caption("\n")
-label_te = wtext(text="总能量: 0.00 J")
-scene.append_to_caption("\n")
-label_acc = wtext(text="向心加速度: 0.00 m/s²")
-scene.append_to_caption("\n\n")
-
-# 图例
-scene.append_to_caption("<b>图例</b>\n")
-scene.append_to_caption("🔴 小球1 (质量: 0.10 kg)\n")
-scene.append_to_caption("🔵 小球2 (质量: 0.15 kg)\n") 
-scene.append_to_caption("🟢 小球3 (质量: 0.20 kg)\n")
-scene.append_to_caption("🔵 速度矢量\n")
-scene.append_to_caption("🟢 向心力矢量\n")
-scene.append_to_caption("🟠 重力矢量\n")
-
-# 主循环
-dt = 0.002
-sim_time = 0
-
-while True:
-    rate(500)
-    
-    if is_running:
-        sim_time = time.time() - start_time
-        
-        # 更新所有小球
+        energy_graph = graph(title="能量随时间变化", xtitle="时间 (s)", ytitle="能量 (J)", 
+                            width=400, height=200, align="left")
+        ke_curve = gcurve(graph=energy_graph, color=color.red, label="动能")
+        pe_curve = gcurve(graph=energy_graph, color=color.blue, label="势能") 
+        te_curve = gcurve(graph=energy_graph, color=color.green, label="总能量")
+        # 降采样层：限制时间窗口和点数，保留极值
+        energy_curves = [DownsampledCurve(ke_curve), DownsampledCurve(pe_curve),
+                         DownsampledCurve(te_curve)]
+
+    # 控件回调函数
+    def set_theta(s):
+        if not is_running and current_ball_index < len(balls):
+            balls[current_ball_index].reset(s.value, balls[current_ball_index].omega)
+            push_ball(balls[current_ball_index])
+
+    def set_omega(s):
+        if not is_running and current_ball_index < len(balls):
+            balls[current_ball_index].omega = s.value
+            balls[current_ball_index].update_arrows()
+            push_ball(balls[current_ball_index])
+
+    def set_mass(s):
+        if not is_running and current_ball_index < len(balls):
+            balls[current_ball_index].mass = s.value
+            push_ball(balls[current_ball_index])
+
+    def set_gravity(s):
         for ball in balls:
-            if ball.ball.visible:
-                ball.update(dt)
-        
-        # 更新实时数据显示（当前选中的小球）
-        current_ball = balls[current_ball_index]
-        label_time.text = f"时间: {sim_time:.2f} s"
-        label_speed.text = f"速度: {current_ball.speed:.2f} m/s"
-        label_ke.text = f"动能: {current_ball.kinetic_energy:.3f} J"
-        label_pe.text = f"势能: {current_ball.potential_energy:.3f} J"
-        label_te.text = f"总能量: {current_ball.total_energy:.3f} J"
-        label_acc.text = f"向心加速度: {current_ball.centripetal_acc:.2f} m/s²"
-        
-        # 更新能量图表
-        if show_energy_graph and sim_time > 0:
-            ke_curve.plot(sim_time, current_ball.kinetic_energy)
-            pe_curve.plot(sim_time, current_ball.potential_energy)
-            te_curve.plot(sim_time, current_ball.total_energy)
-        
-        # 记录数据
+            ball.g = s.value
+            push_ball(ball)
+
+    def set_integrator(m):
+        # 菜单显示的是积分器的中文名称
+        for name, (display_name, _, _) in INTEGRATORS.items():
+            if display_name == m.selected:
+                engine.integrator = name
+                if worker is not None:
+                    worker.set_integrator(name)
+
+    def set_speed(m):
+        # 菜单显示的是倍速，例如 "10x"
+        sim_clock.real_time_factor = float(m.selected.rstrip('x'))
+        if worker is not None:
+            worker.set_speed(sim_clock.real_time_factor)
+
+    def toggle_run():
+        nonlocal is_running
+        is_running = not is_running
+        if is_running:
+            btn_run.text = "暂停"
+            sim_clock.start()
+            if worker is not None:
+                worker.start()
+        else:
+            btn_run.text = "开始"
+            sim_clock.pause()
+            if worker is not None:
+                worker.pause()
+
+    def reset_all():
+        nonlocal is_running
+        is_running = False
+        btn_run.text = "开始"
+        sim_clock.pause()
+        if worker is not None:
+            worker.pause()
+        for i, ball in enumerate(balls):
+            ball.reset(slider_theta.value if i == current_ball_index else ball.theta, 
+                      slider_omega.value if i == current_ball_index else ball.omega)
+            push_ball(ball)
+        stop_stream()
+        recorder.clear()
+        if recording:
+            start_stream()
+        sim_clock.reset()
+        energy_monitor.clear()
+        if worker is not None:
+            worker.reset_clock()
+        readouts.invalidate()
+        if show_energy_graph:
+            for curve in energy_curves:
+                curve.clear()
+
+    def toggle_recording():
+        nonlocal recording
+        recording = not recording
         if recording:
-            for i, ball in enumerate(balls):
-                if ball.ball.visible:
-                    data_records.append([
-                        round(sim_time, 3), ball.name, round(ball.theta, 4), 
-                        round(ball.omega, 4), round(ball.speed, 4),
-                        round(ball.kinetic_energy, 6), round(ball.potential_energy, 6),
-                        round(ball.total_energy, 6), round(ball.centripetal_acc, 4)
-                    ]) 
+            btn_record.text = "停止记录"
+            recorder.clear()
+            start_stream()
+        else:
+            btn_record.text = "开始记录"
+            stop_stream()
+
+    def start_stream():
+        # 开始记录时打开流式导出文件
+        nonlocal stream_writer
+        if ExperimentConfig.STREAM_EXPORT:
+            filename = f"physics_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            stream_writer = StreamingCSVWriter(filename, recorder.ball_names)
+            print(f"数据将实时写入 {filename}")
+
+    def stop_stream():
+        # 把尚未写出的数据交给后台线程，等待写完并关闭文件
+        nonlocal stream_writer
+        if stream_writer is not None:
+            stream_writer.submit(recorder.take_new())
+            rows = stream_writer.close()
+            if stream_writer.error is not None:
+                print(f"流式导出中途失败，{stream_writer.filename} 只包含前 {rows} 行")
+            else:
+                print(f"数据已导出到 {stream_writer.filename}（{rows} 行）")
+            stream_writer = None
+
+    def export_data():
+        if ExperimentConfig.STREAM_EXPORT:
+            print("流式导出已开启，数据在记录过程中已写入文件")
+        elif len(recorder):
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            if ExperimentConfig.EXPORT_FORMAT == 'trajectory':
+                filename = recorder.export_trajectory(f"physics_data_{timestamp}.pbt")
+            else:
+                filename = recorder.export_csv(f"physics_data_{timestamp}.csv")
+            print(f"数据已导出到 {filename}")
+
+    def switch_ball():
+        nonlocal current_ball_index
+        current_ball_index = (current_ball_index + 1) % len(balls)
+        current_ball = balls[current_ball_index]
+        slider_theta.value = current_ball.theta
+        slider_omega.value = current_ball.omega
+        slider_mass.value = current_ball.mass
+        label_current_ball.text = f"当前小球: {current_ball.name}"
+        readouts.invalidate()
+
+    def toggle_vectors():
+        nonlocal show_vectors
+        show_vectors = not show_vectors
+        visuals.show_vectors = show_vectors
+        visuals.invalidate()
+        for ball in balls:
+            ball.arrow_v.visible = show_vectors
+            ball.arrow_c.visible = show_vectors
+            ball.arrow_g.visible = show_vectors
+
+    def toggle_ball_visibility(ball_index):
+        balls[ball_index].ball.visible = not balls[ball_index].ball.visible
+        balls[ball_index].active = balls[ball_index].ball.visible
+        visuals.set_visible(balls[ball_index].index, balls[ball_index].ball.visible)
+        balls[ball_index].arrow_v.visible = balls[ball_index].ball.visible and show_vectors
+        balls[ball_index].arrow_c.visible = balls[ball_index].ball.visible and show_vectors
+        balls[ball_index].arrow_g.visible = balls[ball_index].ball.visible and show_vectors
+        push_ball(balls[ball_index])
+
+    def toggle_profiling():
+        profiler.enabled = not profiler.enabled
+        btn_profile.text = "关闭性能分析" if profiler.enabled else "性能分析"
+        profile_panel.invalidate()
+        if not profiler.enabled:
+            profile_panel.set_text('profile', "")
+
+    def energy_report():
+        # 在线能量统计直接生成实验报告，不需要记录数据
+        if energy_monitor.count.any():
+            from experiments import PhysicsExperiments
+            PhysicsExperiments().generate_experiment_report(
+                "实时运行（在线能量统计）", energy_monitor.report(recorder.ball_names))
+        else:
+            print("尚无能量统计，请先运行")
+
+    def export_profile():
+        if profiler.frames:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = profiler.export(f"profile_{timestamp}.json")
+            print(f"性能数据已导出到 {filename}")
+        else:
+            print("尚无性能数据，请先开启性能分析并运行")
+
+    # 控制面板
+    scene.append_to_caption("\n<b>控制面板</b>\n")
+
+    # 当前小球选择
+    scene.append_to_caption("当前小球: ")
+    label_current_ball = wtext(text=f"当前小球: {balls[0].name}")
+    scene.append_to_caption("    ")
+    button(text="切换小球", bind=switch_ball)
+    scene.append_to_caption("\n")
+
+    # 基本参数控制
+    scene.append_to_caption("初始角度(弧度): ")
+    slider_theta = slider(min=-pi, max=pi, value=0.5, length=200, bind=set_theta, right=15)
+    scene.append_to_caption("\n初始角速度(rad/s): ")
+    slider_omega = slider(min=-5, max=5, value=0, length=200, bind=set_omega, right=15)
+    scene.append_to_caption("\n小球质量(kg): ")
+    slider_mass = slider(min=0.05, max=0.5, value=0.1, length=200, bind=set_mass, right=15)
+    scene.append_to_caption("\n重力加速度(m/s²): ")
+    slider(min=5, max=15, value=9.8, length=200, bind=set_gravity, right=15)
+    scene.append_to_caption("\n积分方法: ")
+    menu(choices=[info[0] for info in INTEGRATORS.values()],
+         selected=INTEGRATORS[engine.integrator][0], bind=set_integrator)
+    scene.append_to_caption("\n播放倍速: ")
+    menu(choices=[f"{factor:g}x" for factor in ExperimentConfig.REAL_TIME_FACTORS],
+         selected=f"{ExperimentConfig.REAL_TIME_FACTOR:g}x", bind=set_speed)
+    scene.append_to_caption("\n")
+
+    # 控制按钮
+    btn_run = button(text="开始", bind=toggle_run)
+    scene.append_to_caption("    ")
+    button(text="重置", bind=reset_all)
+    scene.append_to_caption("    ")
+    btn_record = button(text="开始记录", bind=toggle_recording)
+    scene.append_to_caption("    ")
+    button(text="导出数据", bind=export_data)
+    scene.append_to_caption("    ")
+    button(text="能量报告", bind=energy_report)
+    scene.append_to_caption("\n")
+
+    # 显示选项
+    button(text="切换矢量显示", bind=toggle_vectors)
+    scene.append_to_caption("    小球显示: ")
+    button(text="小球1", bind=lambda: toggle_ball_visibility(0))
+    scene.append_to_caption(" ")
+    button(text="小球2", bind=lambda: toggle_ball_visibility(1))
+    scene.append_to_caption(" ")
+    button(text="小球3", bind=lambda: toggle_ball_visibility(2))
+    scene.append_to_caption("\n\n")
+
+    # 实时数据显示
+    scene.append_to_caption("<b>实时数据</b>\n")
+    label_time = wtext(text="时间: 0.00 s")
+    scene.append_to_caption("\n")
+    label_speed = wtext(text="速度: 0.00 m/s")
+    scene.append_to_caption("\n")
+    label_ke = wtext(text="动能: 0.00 J")
+    scene.append_to_caption("\n")
+    label_pe = wtext(text="势能: 0.00 J")
+    scene.append_to_caption("\n")
+    label_te = wtext(text="总能量: 0.00 J")
+    scene.append_to_caption("\n")
+    label_acc = wtext(text="向心加速度: 0.00 m/s²")
+    scene.append_to_caption("\n")
+    label_speed_factor = wtext(text="实际倍速: 0.0x")
+    scene.append_to_caption("\n")
+    label_drift = wtext(text="能量漂移: 0.0000%")
+    scene.append_to_caption("\n")
+    label_max_drift = wtext(text="最大能量漂移: 0.0000%")
+    scene.append_to_caption("\n")
+    label_period_drift = wtext(text="每周期能量漂移: 无完整周期")
+    scene.append_to_caption("\n\n")
+
+    # 实时数据按 UI_REFRESH_RATE 刷新，且只发送变化了的文本
+    readouts = ReadoutPanel()
+    readouts.add('time', label_time, "时间: {:.2f} s")
+    readouts.add('speed', label_speed, "速度: {:.2f} m/s")
+    readouts.add('kinetic_energy', label_ke, "动能: {:.3f} J")
+    readouts.add('potential_energy', label_pe, "势能: {:.3f} J")
+    readouts.add('total_energy', label_te, "总能量: {:.3f} J")
+    readouts.add('centripetal_acc', label_acc, "向心加速度: {:.2f} m/s²")
+    readouts.add('speed_factor', label_speed_factor, "实际倍速: {:.1f}x")
+    readouts.add('energy_drift', label_drift, "能量漂移: {:.4f}%")
+    readouts.add('max_energy_drift', label_max_drift, "最大能量漂移: {:.4f}%")
+    readouts.add('period_drift', label_period_drift, "每周期能量漂移: {}")
+
+    # 图例
+    scene.append_to_caption("<b>图例</b>\n")
+    scene.append_to_caption("🔴 小球1 (质量: 0.10 kg)\n")
+    scene.append_to_caption("🔵 小球2 (质量: 0.15 kg)\n") 
+    scene.append_to_caption("🟢 小球3 (质量: 0.20 kg)\n")
+    scene.append_to_caption("🔵 速度矢量\n")
+    scene.append_to_caption("🟢 向心力矢量\n")
+    scene.append_to_caption("🟠 重力矢量\n")
+
+    # 性能分析面板（开启后按 PROFILE_REFRESH_RATE 刷新各阶段耗时的分位数）
+    scene.append_to_caption("\n")
+    btn_profile = button(text="性能分析", bind=toggle_profiling)
+    scene.append_to_caption("    ")
+    button(text="导出性能数据", bind=export_profile)
+    scene.append_to_caption("\n<pre>")
+    label_profile = wtext(text="")
+    scene.append_to_caption("</pre>\n")
+    profile_panel = ReadoutPanel(refresh_rate=ExperimentConfig.PROFILE_REFRESH_RATE)
+    profile_panel.add('profile', label_profile, "{}")
+    if profiler.enabled:
+        btn_profile.text = "关闭性能分析"
+
+    # 主循环：渲染按 FRAME_RATE 刷新，物理按固定步长 dt 在每帧内执行若干子步（步数由仿真时钟按倍速决定）
+    sim_time = 0
+
+    while True:
+        rate(ExperimentConfig.FRAME_RATE)
+
+        if is_running:
+            frame_start = time.perf_counter()
+            current_index = balls[current_ball_index].index
+            if worker is not None:
+                # 物理在工作进程中推进：读取最新快照，图表、记录与能量统计按帧采样
+                previous_theta, previous_omega = engine.theta.copy(), engine.omega.copy()
+                with profiler.phase('physics'):
+                    if not worker.read():
+                        continue
+                active = engine.active
+                energy_monitor.observe(active, previous_theta[active], previous_omega[active],
+                                       engine.theta[active], engine.omega[active],
+                                       engine.mass[active], engine.g[active], engine.radius[active])
+                sim_time = worker.time
+                speed_factor = worker.effective_factor
+                if show_energy_graph and engine.active[current_index]:
+                    with profiler.phase('energy_graph'):
+                        energy_curves[0].add(sim_time, engine.kinetic_energy[current_index])
+                        energy_curves[1].add(sim_time, engine.potential_energy[current_index])
+                        energy_curves[2].add(sim_time, engine.total_energy[current_index])
+                if recording:
+                    with profiler.phase('recording'):
+                        recorder.record_engine(sim_time, engine)
+            else:
+                steps = sim_clock.advance()
+                if steps == 0:
+                    continue
+
+                # 批量推进所有可见小球；需要画图或记录时取回每一步的状态
+                need_history = show_energy_graph or recording
+                with profiler.phase('physics'):
+                    history = engine.step_many(steps, dt, history=need_history)
+                sim_time = sim_clock.time
+                speed_factor = sim_clock.effective_factor
+                if need_history:
+                    step_times = sim_clock.step_times(steps)
+                    active_rows = history['rows'].tolist()
+
+                # 能量图表：每个物理步的数值都交给降采样层，保证尖峰不丢失
+                if show_energy_graph and current_index in active_rows:
+                    with profiler.phase('energy_graph'):
+                        column = active_rows.index(current_index)
+                        energy_curves[0].add_many(step_times, history['kinetic_energy'][:, column])
+                        energy_curves[1].add_many(step_times, history['potential_energy'][:, column])
+                        energy_curves[2].add_many(step_times, history['total_energy'][:, column])
+
+                # 记录数据（每个物理步记录一次所有可见小球，按 RECORD_SAMPLE_EVERY 抽样）
+                if recording:
+                    with profiler.phase('recording'):
+                        recorder.record_history(step_times, history)
+
+            # 把本帧新记录的数据交给后台线程写入文件
+            if stream_writer is not None:
+                with profiler.phase('recording'):
+                    stream_writer.submit(recorder.take_new())
+
+            # 每帧同步一次可视化对象（只写可见且变化超过阈值的部分）
+            with profiler.phase('visual_sync'):
+                visuals.sync()
+
+            # 更新实时数据显示（当前选中的小球）
+            if readouts.due():
+                with profiler.phase('readouts'):
+                    current_ball = balls[current_ball_index]
+                    readouts.update({
+                        'time': sim_time,
+                        'speed': current_ball.speed,
+                        'kinetic_energy': current_ball.kinetic_energy,
+                        'potential_energy': current_ball.potential_energy,
+                        'total_energy': current_ball.total_energy,
+                        'centripetal_acc': current_ball.centripetal_acc,
+                        'speed_factor': speed_factor,
+                    })
+                    energy = energy_monitor.ball_summary(current_index)
+                    if energy['n_points']:
+                        readouts.update({
+                            'energy_drift': energy['relative_drift'] * 100,
+                            'max_energy_drift': energy['max_relative_drift'] * 100,
+                            'period_drift': f"{energy['period_drift_mean'] * 100:.2e}%"
+                                            if energy['periods'] else "无完整周期",
+                        }, force=True)
+
+            # 性能分析：结束本帧计时（不含 rate() 的等待）并按需刷新面板
+            if profiler.enabled:
+                profiler.record('frame_total', time.perf_counter() - frame_start)
+                profiler.end_frame()
+                if profile_panel.due():
+                    profile_panel.update({'profile': profiler.format_table()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# 实验数据加载与统计
+# 按列读取导出的 CSV（有 pandas 时使用 pandas，否则使用 csv + NumPy）或二进制轨迹文件（.pbt），
+# 大文件按块读取并用可合并的流式统计量汇总，内存占用与文件大小无关
+
+import csv
+import os
+
+import numpy as np
+
+from config import ExperimentConfig
+from recorder import CSV_HEADER
+from trajectory_format import TrajectoryReader, is_trajectory_file
+
+_pandas = None  # pandas 模块（可选依赖）；首次读取 CSV 时才导入，导入约需 0.3 s
+
+
+def _load_pandas():
+    """返回 pandas 模块，未安装时返回 False"""
+    global _pandas
+    if _pandas is None:
+        try:
+            import pandas
+            _pandas = pandas
+        except ImportError:
+            _pandas = False
+    return _pandas
+
+# CSV 列名 -> 数组名
+COLUMN_KEYS = dict(zip(CSV_HEADER, [
+    'time', 'ball', 'theta', 'omega', 'speed',
+    'kinetic_energy', 'potential_energy', 'total_energy', 'centripetal_acc',
+]))
+NUMERIC_KEYS = [key for key in COLUMN_KEYS.values() if key != 'ball']
+
+
+def _chunk_from_rows(header, rows):
+    """把 csv.reader 读出的若干行转换为列数组"""
+    columns = list(zip(*rows)) if rows else [()] * len(header)
+    chunk = {}
+    for name, values in zip(header, columns):
+        key = COLUMN_KEYS.get(name)
+        if key == 'ball':
+            chunk[key] = np.array(values, dtype=object)
+        elif key is not None:
+            chunk[key] = np.array(values, dtype=np.float64)
+    return chunk
+
+
+def _with_ball_names(reader, chunk):
+    """把轨迹文件中的小球编号换成名称，与 CSV 读取结果保持一致"""
+    ball_ids = chunk.pop('ball_id')
+    names = np.array([reader.ball_name(i) for i in range(int(ball_ids.max(initial=-1)) + 1)],
+                     dtype=object)
+    chunk['ball'] = names[ball_ids]
+    return chunk
+
+
+def iter_chunks(filename, chunksize=None):
+    """按块读取导出文件，每块为 {数组名: 数组} 字典
+
+    轨迹文件按其自身的块读取（chunksize 不起作用）。
+    """
+    chunksize = chunksize or ExperimentConfig.ANALYSIS_CHUNK_ROWS
+    if is_trajectory_file(filename):
+        reader = TrajectoryReader(filename)
+        for chunk in reader.iter_chunks():
+            yield _with_ball_names(reader, chunk)
+        return
+
+    pd = _load_pandas()
+    if pd:
+        reader = pd.read_csv(filename, encoding='utf-8', chunksize=chunksize,
+                             dtype={name: np.float64 for name, key in COLUMN_KEYS.items()
+                                    if key != 'ball'})
+        for frame in reader:
+            chunk = {}
+            for name in frame.columns:
+                key = COLUMN_KEYS.get(name)
+                if key is not None:
+                    chunk[key] = frame[name].to_numpy()
+            yield chunk
+        return
+
+    with open(filename, 'r', encoding='utf-8', newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        rows = []
+        for row in reader:
+            rows.append(row)
+            if len(rows) >= chunksize:
+                yield _chunk_from_rows(header, rows)
+                rows = []
+        if rows:
+            yield _chunk_from_rows(header, rows)
+
+
+def load_recording(filename):
+    """把整个导出文件读为列数组字典"""
+    if is_trajectory_file(filename):
+        reader = TrajectoryReader(filename)
+        data = reader.read()
+        return _with_ball_names(reader, data) if data else {}
+    chunks = list(iter_chunks(filename))
+    if not chunks:
+        return {}
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+
+def split_by_ball(data):
+    """按小球名称拆分列数组，返回 {小球名称: 列数组字典}（保持首次出现的顺序）"""
+    names, first_index = np.unique(data['ball'], return_index=True)
+    result = {}
+    for name in names[np.argsort(first_index)]:
+        mask = data['ball'] == name
+        result[name] = {key: values[mask] for key, values in data.items()}
+    return result
+
+
+class ColumnStats:
+    """单列的流式统计量（数量、均值、方差、最值），按块更新，可相互合并"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # 离差平方和
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        n = len(values)
+        if n == 0:
+            return
+        mean = float(np.mean(values))
+        m2 = float(np.sum((values - mean) ** 2))
+        self._merge(n, mean, m2, float(np.min(values)), float(np.max(values)))
+
+    def merge(self, other):
+        if other.count:
+            self._merge(other.count, other.mean, other.m2, other.min, other.max)
+
+    def _merge(self, n, mean, m2, minimum, maximum):
+        # Chan 等人的并行方差合并公式，数值稳定
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta**2 * self.count * n / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+
+class PeriodStats:
+    """由单个小球的采样轨迹按块估计周期
+
+    同方向相邻两次经过最低点（θ = π + 2πj）的间隔即一个周期（摆动为一次往返，转动为一圈），
+    经过时刻在相邻两个采样点之间线性插值；块与块之间保留上一个采样点，跨块的经过不会漏掉。
+    """
+
+    def __init__(self):
+        self.intervals = ColumnStats()
+        self.last_sample = None                  # 上一块最后的 (时刻, θ)
+        self.last_crossing = [np.nan, np.nan]    # 上次向 -/+ 方向经过最低点的时刻
+
+    def update(self, times, theta):
+        if len(times) == 0:
+            return
+        if self.last_sample is not None:
+            times = np.concatenate([[self.last_sample[0]], times])
+            theta = np.concatenate([[self.last_sample[1]], theta])
+        self.last_sample = (times[-1], theta[-1])
+        turn = np.floor((theta - np.pi) / (2 * np.pi))
+        index = np.flatnonzero(turn[1:] != turn[:-1])
+        if not len(index):
+            return
+        level = np.pi + 2 * np.pi * np.maximum(turn[index], turn[index + 1])
+        t0, t1, y0, y1 = times[index], times[index + 1], theta[index], theta[index + 1]
+        crossing = t0 + (level - y0) / (y1 - y0) * (t1 - t0)
+        rising = y1 > y0
+        for side in (0, 1):
+            moments = crossing[rising == bool(side)]
+            if not len(moments):
+                continue
+            periods = np.diff(np.concatenate([[self.last_crossing[side]], moments]))
+            self.intervals.update(periods[~np.isnan(periods)])
+            self.last_crossing[side] = moments[-1]
+
+    def summary(self):
+        """{'period', 'period_std', 'periods'}，尚无完整周期时周期为 NaN"""
+        count = self.intervals.count
+        return {
+            'period': self.intervals.mean if count else float('nan'),
+            'period_std': self.intervals.variance ** 0.5 if count else float('nan'),
+            'periods': count,
+        }
+
+
+class RecordingStats:
+    """整个文件（或单个小球）的流式统计
+
+    periods 为真时还由 time、theta 列估计周期（只对单个小球有意义，数据须按时间排列）。
+    """
+
+    def __init__(self, periods=False):
+        self.columns = {key: ColumnStats() for key in NUMERIC_KEYS}
+        self.periods = PeriodStats() if periods else None
+
+    def update(self, chunk):
+        for key, stats in self.columns.items():
+            if key in chunk:
+                stats.update(chunk[key])
+        if self.periods is not None and 'time' in chunk and 'theta' in chunk:
+            self.periods.update(chunk['time'], chunk['theta'])
+
+    def summary(self):
+        """汇总为与 analyze_exported_data 相同键名的统计字典"""
+        c = self.columns
+        te = c['total_energy']
+        avg_total_energy = te.mean
+        energy_variation = te.max - te.min if te.count else 0.0
+        summary = {
+            'n_points': te.count,
+            'time_min': c['time'].min,
+            'time_max': c['time'].max,
+            'angle_min': c['theta'].min,
+            'angle_max': c['theta'].max,
+            'max_speed': c['speed'].max,
+            'max_kinetic_energy': c['kinetic_energy'].max,
+            'max_potential_energy': c['potential_energy'].max,
+            'avg_total_energy': avg_total_energy,
+            'energy_std': te.variance ** 0.5,
+            'energy_variation': energy_variation,
+            'energy_stability': (energy_variation / avg_total_energy) * 100
+                                if avg_total_energy else 0.0,
+        }
+        if self.periods is not None:
+            summary.update(self.periods.summary())
+        return summary
+
+
+def compute_stats(chunks, by_ball=False, periods=False):
+    """遍历数据块计算统计量
+
+    返回 (总体统计, {小球名称: 统计})，by_ball 为假时第二项为空字典；
+    periods 为真时各小球的统计还包含周期估计（见 PeriodStats）。
+    """
+    overall = RecordingStats()
+    per_ball = {}
+    for chunk in chunks:
+        overall.update(chunk)
+        if by_ball:
+            for name, part in split_by_ball(chunk).items():
+                per_ball.setdefault(name, RecordingStats(periods)).update(part)
+    return overall.summary(), {name: stats.summary() for name, stats in per_ball.items()}
+
+
+def should_stream(filename, chunksize=None):
+    """文件超过 ANALYSIS_STREAM_BYTES 或指定了块大小时按块流式处理"""
+    return chunksize is not None or os.path.getsize(filename) > ExperimentConfig.ANALYSIS_STREAM_BYTES
@@ -0,0 +1,309 @@
+# 单摆精确解（Jacobi 椭圆函数）
+# 无阻尼圆周运动 d²θ/dt² = (g/r)·sin(θ) 有闭式解，可在 O(1) 时间内给出任意时刻的 θ、ω，
+# 以及精确周期与分界线（刚好能转到最高点）的能量；用作无摩擦模式的快速路径和积分误差的基准
+#
+# 记 φ = θ - π（从最低点起算），ω₀² = g/r，k² = E / E_分界：
+#   摆动（k < 1）：sin(φ/2) = k·sn(u, k²)，        φ' = 2kω₀·cn(u, k²)，  u = u₀ + ω₀t
+#   转动（k > 1）：φ/2 = am(u, 1/k²)，              φ' = ±2kω₀·dn(u, 1/k²)，u = u₀ ± kω₀t
+
+import numpy as np
+
+from config import ExperimentConfig
+
+# 运动类型
+LIBRATION = 0   # 来回摆动
+ROTATION = 1    # 完整圆周运动
+SEPARATRIX = 2  # 恰好位于分界线（趋向最高点，周期无穷大）
+EQUILIBRIUM = 3  # 静止于平衡位置
+REGIME_NAMES = {LIBRATION: '摆动', ROTATION: '圆周运动', SEPARATRIX: '临界', EQUILIBRIUM: '静止'}
+
+_AGM_ITERATIONS = 16
+_RF_ITERATIONS = 12
+
+
+def ellipk(m):
+    """第一类完全椭圆积分 K(m)（算术几何平均法），m = 1 时为无穷大"""
+    a = np.ones_like(np.asarray(m, dtype=float))
+    b = np.sqrt(1.0 - np.asarray(m, dtype=float))
+    for _ in range(_AGM_ITERATIONS):
+        a, b = (a + b) / 2, np.sqrt(a * b)
+    with np.errstate(divide='ignore'):
+        return np.pi / (2 * a)
+
+
+def _carlson_rf(x, y, z):
+    """Carlson 对称椭圆积分 R_F(x, y, z)"""
+    for _ in range(_RF_ITERATIONS):
+        sx, sy, sz = np.sqrt(x), np.sqrt(y), np.sqrt(z)
+        lam = sx * sy + sy * sz + sz * sx
+        x, y, z = (x + lam) / 4, (y + lam) / 4, (z + lam) / 4
+    a = (x + y + z) / 3
+    dx, dy = 1 - x / a, 1 - y / a
+    dz = -(dx + dy)
+    e2 = dx * dy - dz * dz
+    e3 = dx * dy * dz
+    return (1 - e2 / 10 + e3 / 14 + e2 * e2 / 24 - 3 * e2 * e3 / 44) / np.sqrt(a)
+
+
+def ellipf(phi, m):
+    """第一类不完全椭圆积分 F(φ, m)，φ 可为任意实数（按 F(φ + nπ) = F(φ) + 2nK 延拓）"""
+    phi = np.asarray(phi, dtype=float)
+    m = np.asarray(m, dtype=float)
+    n = np.round(phi / np.pi)
+    reduced = phi - n * np.pi
+    s, c = np.sin(reduced), np.cos(reduced)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f = s * _carlson_rf(c * c, 1 - m * s * s, np.ones_like(s))
+        f = np.where(np.abs(s) == 1, np.where(m >= 1, np.sign(s) * np.inf, f), f)
+        k = ellipk(m)
+        return np.where(n == 0, f, f + 2 * n * k)
+
+
+def ellipj(u, m):
+    """Jacobi 椭圆函数 (sn, cn, dn, am)，0 ≤ m ≤ 1，am 为连续（不折回）的振幅
+
+    先按半周期 2K 约化 u，再用算术几何平均的降阶 Landen 变换（m 接近 1 时用双曲函数近似）。
+    """
+    u, m = np.broadcast_arrays(np.asarray(u, dtype=float), np.asarray(m, dtype=float))
+    k = ellipk(m)
+    with np.errstate(invalid='ignore'):
+        n = np.where(np.isfinite(k), np.round(u / (2 * k)), 0.0)
+    u = u - 2 * n * np.where(np.isfinite(k), k, 0.0)
+
+    # 算术几何平均序列
+    a = np.ones_like(u)
+    b = np.sqrt(1.0 - m)
+    c = [np.sqrt(m)]
+    a_list = [a]
+    for _ in range(_AGM_ITERATIONS):
+        c.append((a - b) / 2)
+        a, b = (a + b) / 2, np.sqrt(a * b)
+        a_list.append(a)
+    phi = (2.0 ** _AGM_ITERATIONS) * a * u
+    previous = phi
+    for i in range(_AGM_ITERATIONS, 0, -1):
+        previous = phi
+        phi = (np.arcsin(np.clip(c[i] * np.sin(phi) / a_list[i], -1, 1)) + phi) / 2
+    sn, cn = np.sin(phi), np.cos(phi)
+    dn = cn / np.cos(previous - phi)
+    am = phi
+
+    # m 接近 1 时的近似（AGM 收敛过慢）
+    near_one = m >= 1 - 1e-10
+    if np.any(near_one):
+        v = np.clip(u, -350, 350)
+        ai = 0.25 * (1.0 - m)
+        ch, th = np.cosh(v), np.tanh(v)
+        sech = 1.0 / ch
+        twon = ch * np.sinh(v)
+        sn = np.where(near_one, th + ai * (twon - v) / (ch * ch), sn)
+        am = np.where(near_one, 2 * np.arctan(np.exp(v)) - np.pi / 2 + ai * (twon - v) / ch, am)
+        ai = ai * th * sech
+        cn = np.where(near_one, sech - ai * (twon - v), cn)
+        dn = np.where(near_one, sech + ai * (twon + v), dn)
+
+    sign = np.where(n % 2 == 0, 1.0, -1.0)
+    return sign * sn, sign * cn, dn, am + n * np.pi
+
+
+def is_frictionless(mode):
+    """实验模式（ExperimentConfig.EXPERIMENT_MODES 的键）是否无阻尼，即能否使用精确解"""
+    settings = ExperimentConfig.EXPERIMENT_MODES[mode]
+    return not settings['air_resistance'] and not settings['friction']
+
+
+def separatrix_energy(mass, g, radius):
+    """分界线能量：小球恰好能静止到达最高点时的总能量（以最低点为势能零点）"""
+    return 2 * np.asarray(mass) * np.asarray(g) * np.asarray(radius)
+
+
+class AnalyticPendulum:
+    """一组小球的精确解
+
+    初始化时计算每个小球的运动类型、模数和初始相位，之后 state(t) 对任意时刻 O(1) 求值。
+    """
+
+    def __init__(self, theta0, omega0, g=9.8, radius=2.0):
+        theta0 = np.atleast_1d(np.asarray(theta0, dtype=float))
+        omega0, g, radius = np.broadcast_arrays(np.asarray(omega0, dtype=float),
+                                                np.asarray(g, dtype=float),
+                                                np.asarray(radius, dtype=float))
+        theta0, omega0, g, radius = np.broadcast_arrays(theta0, omega0, g, radius)
+        self.theta0, self.omega0 = theta0.astype(float), omega0.astype(float)
+        self.g, self.radius = g.astype(float), radius.astype(float)
+        self.natural_frequency = np.sqrt(self.g / self.radius)  # ω₀
+        w0 = self.natural_frequency
+
+        phi0 = self.theta0 - np.pi
+        # 单位质量、单位 r² 的能量：½φ'² + ω₀²(1 - cos φ)
+        energy = 0.5 * self.omega0**2 + w0**2 * (1 - np.cos(phi0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k2 = np.where(w0 > 0, energy / (2 * w0**2), np.inf)
+        self.k2 = k2
+        self.direction = np.where(self.omega0 < 0, -1.0, 1.0)
+
+        rotating = k2 >= 1
+        libration = ~rotating
+        equilibrium = (self.omega0 == 0) & (np.abs(np.sin(self.theta0)) < 1e-12)
+        self.regime = np.where(rotating, ROTATION, LIBRATION)
+        self.regime = np.where(k2 == 1, SEPARATRIX, self.regime)
+        self.regime = np.where(equilibrium, EQUILIBRIUM, self.regime)
+        self._free = (w0 == 0)  # 无重力：匀速转动
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k = np.sqrt(k2)
+            # 摆动：模数 m = k²
+            m_lib = np.where(libration, k2, 0.0)
+            # 摆动中心所在的分支（θ 可能已经转过若干圈）
+            self._branch = 2 * np.pi * np.round(phi0 / (2 * np.pi))
+            # 初始相位 am(u₀) 由 sn = sin(φ/2)/k 与 cn = φ'/(2kω₀) 共同确定（atan2 在转折点处仍然精确）
+            sn0 = np.where(libration & (k > 0), np.sin((phi0 - self._branch) / 2) / k, 0.0)
+            cn0 = np.where(libration & (k > 0), self.omega0 / (2 * k * w0), 1.0)
+            u_lib = ellipf(np.arctan2(sn0, cn0), m_lib)
+            # 转动：模数 m = 1/k²
+            m_rot = np.where(rotating & np.isfinite(k2), 1 / k2, 0.0)
+            u_rot = ellipf(phi0 / 2, m_rot)
+        self.k = k
+        self.m = np.where(libration, m_lib, m_rot)
+        self.u0 = np.where(libration, u_lib, u_rot)
+
+    @property
+    def period(self):
+        """精确周期：摆动为完整往返，转动为转一圈所需时间；临界与静止为无穷大"""
+        w0 = self.natural_frequency
+        with np.errstate(divide='ignore', invalid='ignore'):
+            libration = 4 * ellipk(self.m) / w0
+            rotation = 2 * ellipk(self.m) / (self.k * w0)
+            free = 2 * np.pi / np.abs(self.omega0)
+        period = np.where(self.regime == LIBRATION, libration, rotation)
+        period = np.where(self._free, free, period)
+        return np.where((self.regime == SEPARATRIX) | (self.regime == EQUILIBRIUM), np.inf, period)
+
+    @property
+    def amplitude(self):
+        """摆动振幅（相对最低点的最大偏角，弧度）；转动时为 π，静止时为所在平衡位置的偏角（0 或 π）"""
+        with np.errstate(invalid='ignore'):
+            amplitude = 2 * np.arcsin(np.clip(self.k, 0, 1))
+        return np.where((self.regime == LIBRATION) | (self.regime == EQUILIBRIUM), amplitude, np.pi)
+
+    @property
+    def max_angular_speed(self):
+        """最大角速度（经过最低点时）"""
+        speed = np.where(self._free, np.abs(self.omega0),
+                         2 * np.sqrt(np.where(np.isfinite(self.k2), self.k2, 0)) * self.natural_frequency)
+        return np.where(self.regime == EQUILIBRIUM, 0.0, speed)
+
+    def extremes(self, duration):
+        """[0, duration] 内的 (θ 最小值, θ 最大值, 最大角速度)
+
+        极值只可能出现在区间端点、转折点（u = 奇数倍 K）或最低点（u = 偶数倍 K），
+        因此只需判断这些相位是否落在区间内，无需逐步求值。
+        """
+        theta_start, omega_start = self.state(0.0)
+        theta_end, omega_end = self.state(duration)
+        theta_min = np.minimum(theta_start, theta_end)
+        theta_max = np.maximum(theta_start, theta_end)
+        max_omega = np.maximum(np.abs(omega_start), np.abs(omega_end))
+
+        k = np.where(np.isfinite(self.k), self.k, 0.0)
+        quarter = ellipk(self.m)
+        libration = self.regime == LIBRATION
+        with np.errstate(invalid='ignore'):
+            u_end = np.where(libration, self.u0 + self.natural_frequency * duration,
+                             self.u0 + self.direction * k * self.natural_frequency * duration)
+        u_low, u_high = np.minimum(self.u0, u_end), np.maximum(self.u0, u_end)
+
+        # 摆动：u = (4j+1)K 为正向转折点，(4j+3)K 为负向转折点
+        amplitude = self.amplitude
+        theta_max = np.where(libration & _contains(u_low, u_high, quarter, 4 * quarter),
+                             self._branch + np.pi + amplitude, theta_max)
+        theta_min = np.where(libration & _contains(u_low, u_high, 3 * quarter, 4 * quarter),
+                             self._branch + np.pi - amplitude, theta_min)
+        # 摆动与转动都在 u = 2jK 处经过最低点，角速度最大
+        through_bottom = (self.regime != EQUILIBRIUM) & ~self._free & \
+            _contains(u_low, u_high, 0.0, 2 * quarter)
+        max_omega = np.where(through_bottom, self.max_angular_speed, max_omega)
+        return theta_min, theta_max, max_omega
+
+    def event_counts(self, duration):
+        """[0, duration] 内的事件次数，与 events.EventDetector 的三类事件对应"""
+        k = np.where(np.isfinite(self.k), self.k, 0.0)
+        quarter = ellipk(self.m)
+        libration = self.regime == LIBRATION
+        moving = (self.regime == LIBRATION) | (self.regime == ROTATION)
+        with np.errstate(invalid='ignore'):
+            u_end = np.where(libration, self.u0 + self.natural_frequency * duration,
+                             self.u0 + self.direction * k * self.natural_frequency * duration)
+        u_low, u_high = np.minimum(self.u0, u_end), np.maximum(self.u0, u_end)
+        # 不计起点本身（例如静止释放时起点就是转折点），与事件检测器一致
+        u_low = np.where(self.u0 <= u_end, u_low + 1e-9 * quarter, u_low)
+        u_high = np.where(self.u0 > u_end, u_high - 1e-9 * quarter, u_high)
+        # 摆动的转折点与转动的最高点都在 u = 奇数倍 K，最低点在 u = 偶数倍 K
+        odd = np.where(moving, _count(u_low, u_high, quarter, 2 * quarter), 0)
+        even = np.where(moving, _count(u_low, u_high, 0.0, 2 * quarter), 0)
+
+        # 无重力时匀速转动，直接按角度计数
+        theta_end = self.theta0 + self.omega0 * duration
+        theta_low, theta_high = np.minimum(self.theta0, theta_end), np.maximum(self.theta0, theta_end)
+        free_bottom = _count(theta_low, theta_high, np.pi, 2 * np.pi)
+        free_top = _count(theta_low, theta_high, 0.0, 2 * np.pi)
+        return {
+            'turning_points': np.where(libration, odd, 0),
+            'bottom_crossings': np.where(self._free, free_bottom, even),
+            'loops': np.where(self._free, free_top, np.where(libration, 0, odd)),
+        }
+
+    def state(self, t):
+        """任意时刻的 (θ, ω)；t 可为标量或与小球数可广播的数组（例如形状 (采样数, 1)）"""
+        t = np.asarray(t, dtype=float)
+        w0 = self.natural_frequency
+        k = np.where(np.isfinite(self.k), self.k, 0.0)
+        libration = self.regime == LIBRATION
+
+        with np.errstate(invalid='ignore'):
+            u = np.where(libration, self.u0 + w0 * t, self.u0 + self.direction * k * w0 * t)
+            sn, cn, dn, am = ellipj(u, self.m)
+            phi = np.where(libration, self._branch + 2 * np.arcsin(np.clip(k * sn, -1, 1)), 2 * am)
+            omega = np.where(libration, 2 * k * w0 * cn, self.direction * 2 * k * w0 * dn)
+
+        # 无重力时匀速转动；静止于平衡位置时保持不变
+        theta = np.where(self._free, self.theta0 + self.omega0 * t, phi + np.pi)
+        omega = np.where(self._free, self.omega0, omega)
+        still = self.regime == EQUILIBRIUM
+        theta = np.where(still, self.theta0, theta)
+        omega = np.where(still, 0.0, omega)
+        return theta, omega
+
+
+def _count(u_start, u_end, offset, spacing):
+    """区间 (u_start, u_end] 内 offset + j·spacing 的个数"""
+    with np.errstate(invalid='ignore'):
+        count = np.floor((u_end - offset) / spacing) - np.floor((u_start - offset) / spacing)
+    return np.where(np.isfinite(count), count, 0).astype(np.int64)
+
+
+def _contains(u_start, u_end, offset, spacing):
+    """区间 [u_start, u_end] 内是否存在 offset + j·spacing（j 为整数）"""
+    with np.errstate(invalid='ignore'):
+        return np.floor((u_end - offset) / spacing) >= np.ceil((u_start - offset) / spacing)
+
+
+def integrator_error(integrator, dt, duration, theta0, omega0, g=9.8, radius=2.0):
+    """以精确解为基准，返回固定步长积分器在 duration 内的最大角度误差与最大相对能量误差"""
+    from physics_engine import PendulumEngine
+
+    exact = AnalyticPendulum(theta0, omega0, g, radius)
+    engine = PendulumEngine(integrator)
+    engine.add_balls(mass=1.0, radius=exact.radius, theta=exact.theta0, omega=exact.omega0, g=exact.g)
+    initial_energy = engine.total_energy.copy()
+    n_steps = int(round(duration / dt))
+    max_theta_error = np.zeros(engine.count)
+    max_energy_error = np.zeros(engine.count)
+    for step in range(1, n_steps + 1):
+        engine.step(dt)
+        theta, _ = exact.state(step * dt)
+        np.maximum(max_theta_error, np.abs(engine.theta - theta), out=max_theta_error)
+        np.maximum(max_energy_error, np.abs(engine.total_energy - initial_energy), out=max_energy_error)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.where(initial_energy != 0, max_energy_error / np.abs(initial_energy), 0.0)
+    return {'theta_error': max_theta_error, 'energy_error': relative}
@@ -0,0 +1,252 @@
+# 批量分析导出的记录文件
+# 按通配符找到记录文件（CSV 或 .pbt），在进程池中并行做流式统计（总体与分小球，含周期估计），
+# 为每个文件生成实验报告（可选分析图表），并汇总为一张表（summary.csv）。
+# 输出目录中的清单（manifest.json）记录每个文件分析时的大小与修改时间，
+# 再次运行时未变化的文件直接沿用上次的结果，不再读取
+#
+# 用法：
+#   python -m batch_analysis                                  # 分析当前目录下的 physics_data_*.csv
+#   python -m batch_analysis "sessions/**/physics_data_*.csv" --plot -j 8
+#   python -m batch_analysis --force                          # 忽略清单，全部重新分析
+
+import contextlib
+import csv
+import glob
+import hashlib
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import ExperimentConfig
+
+_MANIFEST_VERSION = 1  # 统计方法或结果格式变化时递增，使旧清单全部失效
+MANIFEST_NAME = 'manifest.json'
+SUMMARY_NAME = 'summary.csv'
+ALL_BALLS = '（全部）'  # 汇总表中文件总体统计一行的小球名
+SUMMARY_FIELDS = ('file', 'ball', 'n_points', 'duration', 'energy_stability', 'max_speed',
+                  'angle_min', 'angle_max', 'period', 'period_std', 'periods')
+
+
+def discover(patterns):
+    """按通配符（支持 **）找到记录文件，去重后按路径排序"""
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    found = set()
+    for pattern in patterns:
+        found.update(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+    return sorted(found)
+
+
+def _output_stems(filenames):
+    """每个文件的输出文件名主干；不同目录下的同名文件加上路径哈希区分"""
+    stems = {name: os.path.splitext(os.path.basename(name))[0] for name in filenames}
+    counts = {}
+    for stem in stems.values():
+        counts[stem] = counts.get(stem, 0) + 1
+    for name, stem in stems.items():
+        if counts[stem] > 1:
+            digest = hashlib.sha1(os.path.abspath(name).encode('utf-8')).hexdigest()[:8]
+            stems[name] = f"{stem}_{digest}"
+    return stems
+
+
+def _row(filename, ball, stats):
+    """汇总表的一行；没有的量（例如文件总体的周期）为 None"""
+    def number(key):
+        value = stats.get(key)
+        return None if value is None or value != value else float(value)  # NaN 记为空
+    return {
+        'file': filename,
+        'ball': ball,
+        'n_points': int(stats['n_points']),
+        'duration': number('time_max') - number('time_min'),
+        'energy_stability': number('energy_stability'),
+        'max_speed': number('max_speed'),
+        'angle_min': number('angle_min'),
+        'angle_max': number('angle_max'),
+        'period': number('period'),
+        'period_std': number('period_std'),
+        'periods': stats.get('periods'),
+    }
+
+
+def analyze_recording(filename, output_dir, stem, plot=False):
+    """分析单个记录文件（在工作进程中运行）
+
+    按块流式统计，内存占用与文件大小无关；报告写入 output_dir/report_<stem>.txt，
+    plot 为真且文件不超过 ANALYSIS_STREAM_BYTES 时另存 analysis_<stem>.png。
+    返回 {'rows', 'report', 'plot', 'plot_requested'}，文件为空时 rows 为空列表。
+    """
+    from analysis import compute_stats, iter_chunks, should_stream
+    from experiments import PhysicsExperiments
+
+    stats, balls = compute_stats(iter_chunks(filename), by_ball=True, periods=True)
+    if not stats['n_points']:
+        return {'rows': [], 'report': None, 'plot': None, 'plot_requested': plot}
+    if len(balls) > 1:
+        # 各小球能量不同，混在一起的极差没有意义：文件总体的能量变化与稳定性取最差的小球
+        worst = max(balls.values(), key=lambda item: item['energy_stability'])
+        stats = dict(stats, energy_variation=worst['energy_variation'],
+                     energy_stability=worst['energy_stability'])
+    report = os.path.join(output_dir, f"report_{stem}.txt")
+    with contextlib.redirect_stdout(io.StringIO()):  # 报告与图表的提示由批量汇总统一输出
+        PhysicsExperiments().generate_experiment_report(
+            os.path.basename(filename), {'stats': stats, 'balls': balls}, report_filename=report)
+    figure = None
+    if plot and not should_stream(filename):
+        from plotting import render_recording
+        figure = render_recording(filename, os.path.join(output_dir, f"analysis_{stem}.png"))
+    rows = [_row(filename, ALL_BALLS, stats)]
+    rows += [_row(filename, str(name), item) for name, item in balls.items()]
+    return {'rows': rows, 'report': report, 'plot': figure, 'plot_requested': plot}
+
+
+def _load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return manifest['files'] if manifest.get('version') == _MANIFEST_VERSION else {}
+
+
+def _save_manifest(path, entries):
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump({'version': _MANIFEST_VERSION, 'files': entries}, file, ensure_ascii=False)
+    os.replace(temporary, path)  # 原子替换，中途中断也不会留下半个清单
+
+
+def _signature(filename):
+    stat = os.stat(filename)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _unchanged(entry, signature, plot):
+    """清单中的结果仍然有效：文件大小与修改时间未变，输出文件仍在，且上次已按需要出图"""
+    if entry is None or entry['size'] != signature['size'] or entry['mtime_ns'] != signature['mtime_ns']:
+        return False
+    if plot and not entry['plot_requested']:
+        return False
+    return all(os.path.exists(path) for path in (entry['report'], entry['plot']) if path)
+
+
+def run_batch(patterns=ExperimentConfig.BATCH_PATTERN, output_dir=ExperimentConfig.BATCH_OUTPUT_DIR,
+              processes=None, plot=False, force=False, progress=print):
+    """批量分析，返回 (汇总表, 计数)
+
+    汇总表每个文件一行总体统计（小球名为 ALL_BALLS）加每个小球一行，按文件排列，
+    同时保存为 output_dir/summary.csv；计数为 {'analyzed', 'skipped', 'failed'}。
+    processes 缺省为 CPU 核心数，为 1 时在当前进程中顺序分析；force 为真时忽略清单。
+    单个文件出错只记录错误，不影响其他文件（出错的文件下次会重新分析）。
+    """
+    filenames = discover(patterns)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = {} if force else _load_manifest(manifest_path)
+    stems = _output_stems(filenames)
+
+    results = {}
+    pending = []
+    for name in filenames:
+        key = os.path.abspath(name)
+        signature = _signature(name)
+        if _unchanged(manifest.get(key), signature, plot):
+            results[name] = manifest[key]['rows']
+        else:
+            pending.append((name, key, signature))
+    counts = {'analyzed': 0, 'skipped': len(results), 'failed': 0}
+    if progress:
+        progress(f"找到 {len(filenames)} 个记录文件：{len(pending)} 个需要分析，"
+                 f"{len(results)} 个未变化（沿用上次结果）")
+
+    def collect(name, key, signature, outcome, error):
+        if error is not None:
+            counts['failed'] += 1
+            manifest.pop(key, None)
+            if progress:
+                progress(f"  ✗ {name}：{type(error).__name__}: {error}")
+            return
+        counts['analyzed'] += 1
+        results[name] = outcome['rows']
+        manifest[key] = dict(signature, **outcome)
+        _save_manifest(manifest_path, manifest)
+        if progress:
+            progress(f"  [{counts['analyzed'] + counts['failed']}/{len(pending)}] {name}"
+                     + ("（文件为空）" if not outcome['rows'] else ""))
+
+    processes = min(processes or os.cpu_count() or 1, max(1, len(pending)))
+    if processes == 1:
+        for name, key, signature in pending:
+            try:
+                outcome, error = analyze_recording(name, output_dir, stems[name], plot), None
+            except Exception as e:
+                outcome, error = None, e
+            collect(name, key, signature, outcome, error)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = {pool.submit(analyze_recording, name, output_dir, stems[name], plot):
+                       (name, key, signature) for name, key, signature in pending}
+            for future in as_completed(futures):
+                error = future.exception()
+                collect(*futures[future], None if error else future.result(), error)
+    _save_manifest(manifest_path, manifest)
+
+    rows = [row for name in filenames for row in results.get(name, [])]
+    save_summary_csv(rows, os.path.join(output_dir, SUMMARY_NAME))
+    return rows, counts
+
+
+def save_summary_csv(rows, filename):
+    """把汇总表保存为 CSV（没有数据时只写表头）"""
+    with open(filename, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def format_summary(rows):
+    """汇总表的文本形式（每行一个小球，文件总体统计行在前）"""
+    def value(number, spec):
+        return format(number, spec) if number is not None else '-'
+    lines = [f"{'文件 / 小球':<34}{'点数':>10}{'能量稳定性%':>12}{'最大速度':>10}"
+             f"{'角度范围 (rad)':>20}{'周期 (s)':>10}"]
+    for row in rows:
+        label = os.path.basename(row['file']) if row['ball'] == ALL_BALLS else f"  {row['ball']}"
+        lines.append(f"{label:<34}{row['n_points']:>10}{value(row['energy_stability'], '.3f'):>12}"
+                     f"{value(row['max_speed'], '.3f'):>10}"
+                     f"{value(row['angle_min'], '.3f'):>10} ~{value(row['angle_max'], '.3f'):>8}"
+                     f"{value(row['period'], '.4f'):>10}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(prog="python -m batch_analysis",
+                                     description="并行批量分析记录文件，生成各文件报告与汇总表")
+    parser.add_argument('patterns', nargs='*', default=[ExperimentConfig.BATCH_PATTERN],
+                        help=f"文件通配符，支持 **（缺省 {ExperimentConfig.BATCH_PATTERN}）")
+    parser.add_argument('-o', '--output-dir', default=ExperimentConfig.BATCH_OUTPUT_DIR,
+                        help="报告、汇总表与清单的输出目录")
+    parser.add_argument('-j', '--processes', type=int, help="并行进程数（缺省为 CPU 核心数）")
+    parser.add_argument('--plot', action='store_true', help="同时为每个文件生成分析图表")
+    parser.add_argument('--force', action='store_true', help="忽略清单，重新分析全部文件")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows, counts = run_batch(args.patterns, args.output_dir, args.processes, args.plot, args.force)
+    if rows:
+        print()
+        print(format_summary(rows))
+    print(f"\n分析 {counts['analyzed']} 个，沿用 {counts['skipped']} 个，失败 {counts['failed']} 个，"
+          f"用时 {time.perf_counter() - start:.2f} s")
+    print(f"汇总表已保存到 {os.path.join(args.output_dir, SUMMARY_NAME)}")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
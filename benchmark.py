@@ -0,0 +1,479 @@
+# 性能基准测试
+# 无界面运行（不导入 VPython），覆盖仿真、记录、导出、分析等热点路径，结果输出为 JSON，
+# 并可与保存的基准结果对比，发现性能退化
+#
+# 用法：
+#   python benchmark.py --quick                       # 快速运行（较小规模）
+#   python benchmark.py -o result.json                # 完整运行并保存结果
+#   python benchmark.py --baseline baseline.json      # 与基准对比，退化时返回非零退出码
+#   python benchmark.py --check-imports               # 检查各模块的导入耗时预算与延迟导入
+
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from config import ExperimentConfig
+from integrators import EVALUATIONS_PER_STEP, INTEGRATORS
+from physics_engine import PendulumEngine
+from recorder import DataRecorder, StreamingCSVWriter
+from simulation import run_simulation
+
+# 指标名后缀决定比较方向：吞吐量越大越好，耗时与内存越小越好
+HIGHER_IS_BETTER = ('_per_second',)
+LOWER_IS_BETTER = ('_seconds', '_bytes')
+# 波动大的指标（逐个小球推进受 Python 调用开销与调度影响，重复运行相差可达 20% 以上），比较时使用更宽的容差
+NOISY_PREFIXES = ('per_ball_',)
+NOISY_TOLERANCE = 0.5
+
+FULL = {
+    'ball_counts': [1, 10, 100, 1000, 10000],
+    'step_seconds': 0.5,        # 每个规模的计时时长
+    'drift_target': 1e-4,       # 积分器对比的目标能量漂移
+    'drift_duration': 10.0,
+    'min_timing_seconds': 1.0,  # 积分器对比中每项计时的最少累计时长
+    'record_rows': 2000000,
+    'analysis_rows': [1000000, 10000000],
+    'repeat': 3,
+}
+QUICK = {
+    'ball_counts': [1, 10, 100, 1000],
+    'step_seconds': 0.1,
+    'drift_target': 1e-3,
+    'drift_duration': 5.0,
+    'min_timing_seconds': 0.5,
+    'record_rows': 200000,
+    'analysis_rows': [100000],
+    'repeat': 3,  # 规模小时单次计时波动大（逐个小球推进可差 20% 以上），仍取 3 次中的最好值
+}
+
+# 导入检查：各模块在新进程中的冷启动导入耗时（含 NumPy）不得超过预算，
+# 且导入时不得加载界面 / 绘图 / 表格库（应在首次渲染、绘图或读取 CSV 时才导入）
+IMPORT_MODULES = ('config', 'integrators', 'physics_engine', 'simulation', 'recorder',
+                  'analysis', 'trajectory_format', 'sim_clock', 'display', 'profiling',
+                  'energy_stats', 'sweep', 'headless', 'plotting', 'phase_map', 'trajectory_cache',
+                  'physics_worker', 'batch_analysis', 'experiments', 'ai', 'ai_enhanced')
+IMPORT_BUDGET_SECONDS = 0.5
+LAZY_DEPENDENCIES = ('vpython', 'matplotlib', 'pandas')
+
+
+def _best_of(repeat, fn, min_seconds=0.0):
+    """重复运行取最短耗时（秒），返回 (耗时, 最后一次的返回值)
+
+    至少运行 repeat 次；给出 min_seconds 时继续重复，直到累计耗时达到 min_seconds（单次很短的计时波动大）。
+    """
+    best, result = float('inf'), None
+    count = total = 0
+    while count < repeat or total < min_seconds:
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        count += 1
+        total += elapsed
+    return best, result
+
+
+def _make_engine(n_balls, integrator='semi_implicit_euler'):
+    rng = np.random.default_rng(0)
+    engine = PendulumEngine(integrator)
+    engine.add_balls(mass=rng.uniform(0.05, 0.5, n_balls), radius=ExperimentConfig.DEFAULT_RADIUS,
+                     theta=rng.uniform(-np.pi, np.pi, n_balls), omega=rng.uniform(-3, 3, n_balls),
+                     g=ExperimentConfig.DEFAULT_GRAVITY)
+    return engine
+
+
+def _steps_for(seconds, fn):
+    """连续调用 fn 约 seconds 秒，返回 (调用次数, 实际耗时)"""
+    fn()  # 预热
+    count = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < seconds:
+        for _ in range(10):
+            fn()
+        count += 10
+        elapsed = time.perf_counter() - start
+    return count, elapsed
+
+
+def _best_rate(repeat, seconds, fn):
+    """_steps_for 重复 repeat 次，返回最高的调用速率（次/秒）"""
+    best = 0.0
+    for _ in range(repeat):
+        gc.collect()
+        count, elapsed = _steps_for(seconds, fn)
+        best = max(best, count / elapsed)
+    return best
+
+
+def bench_steps(params):
+    """逐个小球推进（PhysicsBall.update 的路径）与批量推进的速度随小球数的变化（取 repeat 次中的最好值）"""
+    dt = ExperimentConfig.SIMULATION_DT
+    results = {}
+    for n_balls in params['ball_counts']:
+        engine = _make_engine(n_balls)
+        rows = [[i] for i in range(n_balls)]
+
+        def per_ball():
+            for row in rows:
+                engine.step(dt, active=row)
+
+        if n_balls <= 1000:
+            rate = _best_rate(params['repeat'], params['step_seconds'], per_ball)
+            results[f'per_ball_{n_balls}_ball_steps_per_second'] = rate * n_balls
+        rate = _best_rate(params['repeat'], params['step_seconds'], lambda: engine.step(dt))
+        results[f'batched_{n_balls}_ball_steps_per_second'] = rate * n_balls
+    return results
+
+
+DT_SEARCH_RANGE = (1e-5, 0.5)  # 积分器对比中步长的搜索范围 (s)
+DT_BISECTIONS = 8             # 括住目标后按对数二分的次数（步长精确到约 2^(1/256)，0.3% 以内）
+
+
+def _max_drift(balls, duration, dt, integrator):
+    result = run_simulation(balls, duration, dt=dt, integrator=integrator)
+    return max(row['energy_drift'] for row in result['summary'])
+
+
+def _dt_for_drift(balls, duration, target, integrator):
+    """能量漂移不超过 target 的最大步长，返回 (步长, 漂移)
+
+    从 dt = 0.05 出发向两个方向加倍 / 减半，直到括住目标（在 DT_SEARCH_RANGE 内），再按对数二分。
+    """
+    low, high = DT_SEARCH_RANGE
+    dt = 0.05
+    drift = _max_drift(balls, duration, dt, integrator)
+    if drift <= target:
+        good, good_drift, bad = dt, drift, None
+        while good * 2 <= high:
+            drift = _max_drift(balls, duration, good * 2, integrator)
+            if drift > target:
+                bad = good * 2
+                break
+            good, good_drift = good * 2, drift
+    else:
+        good, bad = None, dt
+        while bad / 2 >= low:
+            drift = _max_drift(balls, duration, bad / 2, integrator)
+            if drift <= target:
+                good, good_drift = bad / 2, drift
+                break
+            bad /= 2
+        if good is None:  # 搜索范围内达不到目标：返回最小步长
+            return bad, drift
+    if bad is not None:
+        for _ in range(DT_BISECTIONS):
+            middle = (good * bad) ** 0.5
+            drift = _max_drift(balls, duration, middle, integrator)
+            if drift <= target:
+                good, good_drift = middle, drift
+            else:
+                bad = middle
+    return good, good_drift
+
+
+def bench_integrators(params):
+    """各积分器在同一能量漂移下的步长与耗时
+
+    先搜索使最大相对能量漂移不超过 drift_target 的最大步长（见 _dt_for_drift），
+    各积分器的漂移因此都接近目标，再以该步长计时（至少 repeat 次、累计 min_timing_seconds，取最好值）。
+    """
+    balls = [{'theta': theta, 'omega': 0.0, 'mass': 0.1} for theta in (0.5, 1.57, 2.5)]
+    duration = params['drift_duration']
+    results = {}
+    for name in INTEGRATORS:
+        dt, drift = _dt_for_drift(balls, duration, params['drift_target'], name)
+        elapsed, _ = _best_of(params['repeat'],
+                              lambda: run_simulation(balls, duration, dt=dt, integrator=name),
+                              params['min_timing_seconds'])
+        results[f'{name}_dt'] = dt
+        results[f'{name}_energy_drift'] = drift
+        results[f'{name}_seconds'] = elapsed
+    return results
+
+
+def bench_adaptive(params):
+    """分界线附近（initial_velocity_study 的高角速度情形）自适应步长与固定步长的代价对比
+
+    自适应积分使用 config 中的容差；固定步长为缺省积分器与 SIMULATION_DT。
+    """
+    from phase_map import critical_omega
+    from simulation import ADAPTIVE
+
+    gravity, radius = ExperimentConfig.DEFAULT_GRAVITY, ExperimentConfig.DEFAULT_RADIUS
+    omega_c = float(critical_omega(np.pi / 2, gravity, radius))
+    balls = [{'theta': np.pi / 2, 'omega': omega_c * factor, 'mass': 0.1} for factor in (0.99, 1.01)]
+    duration = params['drift_duration']
+    results = {}
+    for label, integrator in (('adaptive', ADAPTIVE), ('fixed', ExperimentConfig.INTEGRATOR)):
+        elapsed, result = _best_of(params['repeat'], lambda: run_simulation(
+            balls, duration, gravity=gravity, radius=radius, integrator=integrator),
+            params['min_timing_seconds'])
+        results[f'{label}_seconds'] = elapsed
+        results[f'{label}_energy_drift'] = max(row['energy_drift'] for row in result['summary'])
+        results[f'{label}_n_steps'] = result['n_steps']
+        results[f'{label}_n_evals'] = (result['n_evals'] if label == 'adaptive'
+                                       else result['n_steps'] * EVALUATIONS_PER_STEP[integrator])
+        if label == 'adaptive':
+            results['adaptive_n_rejected'] = result['n_rejected']
+    return results
+
+
+def bench_recorder(params):
+    """记录器追加吞吐量与导出速度（CSV、二进制轨迹、流式 CSV）"""
+    n_balls = 10
+    n_records = params['record_rows'] // n_balls
+    engine = _make_engine(n_balls)
+    names = [f"小球{i + 1}" for i in range(n_balls)]
+    dt = ExperimentConfig.SIMULATION_DT
+    results = {}
+
+    def record():
+        recorder = DataRecorder(names, capacity=params['record_rows'])
+        for step in range(n_records):
+            recorder.record_engine(step * dt, engine)
+        return recorder
+
+    elapsed, recorder = _best_of(params['repeat'], record)
+    results['record_rows_per_second'] = n_records * n_balls / elapsed
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file = os.path.join(directory, 'export.csv')
+        elapsed, _ = _best_of(params['repeat'], lambda: recorder.export_csv(csv_file))
+        results['export_csv_rows_per_second'] = len(recorder) / elapsed
+        results['export_csv_bytes'] = os.path.getsize(csv_file)
+
+        pbt_file = os.path.join(directory, 'export.pbt')
+        elapsed, _ = _best_of(params['repeat'], lambda: recorder.export_trajectory(pbt_file))
+        results['export_trajectory_rows_per_second'] = len(recorder) / elapsed
+        results['export_trajectory_bytes'] = os.path.getsize(pbt_file)
+
+        def stream():
+            writer = StreamingCSVWriter(os.path.join(directory, 'stream.csv'), names)
+            arrays = recorder.to_arrays()
+            batch = n_balls * 100
+            for start in range(0, len(recorder), batch):
+                writer.submit({key: values[start:start + batch] for key, values in arrays.items()})
+            return writer.close()
+
+        elapsed, _ = _best_of(params['repeat'], stream)
+        results['stream_csv_rows_per_second'] = len(recorder) / elapsed
+    return results
+
+
+def write_synthetic_recording(filename, n_rows, n_balls=10):
+    """生成 n_rows 行的合成导出文件（格式与 export_data 相同），分批写出，内存占用固定"""
+    names = [f"小球{i + 1}" for i in range(n_balls)]
+    engine = _make_engine(n_balls)
+    dt = ExperimentConfig.SIMULATION_DT
+    batch_steps = max(1, 100000 // n_balls)
+    n_steps = -(-n_rows // n_balls)
+    writer = StreamingCSVWriter(filename, names)
+    recorder = DataRecorder(names, capacity=batch_steps * n_balls)
+    for start in range(0, n_steps, batch_steps):
+        for step in range(start, min(start + batch_steps, n_steps)):
+            engine.step(dt)
+            recorder.record_engine(step * dt, engine)
+        writer.submit(recorder.take_new())
+        recorder.clear()
+    writer.close()
+    return filename
+
+
+def _measure(fn):
+    """返回 (耗时, Python 堆内存峰值字节数)；NumPy 与 pandas 的数组分配同样计入
+
+    tracemalloc 会拖慢内存分配，因此耗时与内存峰值分两次运行测量。
+    """
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_analysis(params, data_dir=None):
+    """analyze_exported_data 使用的整文件加载与分块流式统计的耗时和内存峰值"""
+    from analysis import compute_stats, iter_chunks, load_recording
+
+    results = {}
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = data_dir or temporary
+        for n_rows in params['analysis_rows']:
+            filename = os.path.join(directory, f'synthetic_{n_rows}.csv')
+            if not os.path.exists(filename):
+                write_synthetic_recording(filename, n_rows)
+            label = f'{n_rows // 1000000}m' if n_rows >= 1000000 else f'{n_rows // 1000}k'
+            elapsed, peak = _measure(lambda: load_recording(filename))
+            results[f'load_{label}_seconds'] = elapsed
+            results[f'load_{label}_peak_bytes'] = peak
+            elapsed, peak = _measure(lambda: compute_stats(iter_chunks(filename), by_ball=True))
+            results[f'stream_stats_{label}_seconds'] = elapsed
+            results[f'stream_stats_{label}_peak_bytes'] = peak
+    return results
+
+
+def measure_import(module, repeat=3):
+    """在新进程中导入 module，返回 (最短导入耗时, 导入时被加载的 LAZY_DEPENDENCIES)
+
+    耗时取自 python -X importtime 报告的累计时间，不含解释器自身的启动。
+    """
+    code = (f"import sys, {module}; "
+            f"print(','.join(name for name in {LAZY_DEPENDENCIES!r} if name in sys.modules))")
+    best, loaded = float('inf'), []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                                capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        if result.returncode != 0:
+            raise RuntimeError(f"导入 {module} 失败：{result.stderr.strip().splitlines()[-1]}")
+        for line in result.stderr.splitlines():
+            parts = line.split('|')
+            if len(parts) == 3 and parts[2].strip() == module:
+                best = min(best, int(parts[1]) / 1e6)
+        loaded = [name for name in result.stdout.strip().split(',') if name]
+    return best, loaded
+
+
+def bench_imports(params):
+    """各模块的冷启动导入耗时"""
+    return {f'import_{module}_seconds': measure_import(module, params['repeat'])[0]
+            for module in IMPORT_MODULES}
+
+
+def check_imports(budget=IMPORT_BUDGET_SECONDS, modules=IMPORT_MODULES):
+    """检查导入预算，返回问题列表 [(模块, 说明)]"""
+    problems = []
+    for module in modules:
+        seconds, loaded = measure_import(module)
+        if seconds > budget:
+            problems.append((module, f"导入耗时 {seconds * 1000:.0f} ms，超过预算 {budget * 1000:.0f} ms"))
+        if loaded:
+            problems.append((module, f"导入时加载了 {', '.join(loaded)}"))
+    return problems
+
+
+BENCHMARKS = {
+    'steps': bench_steps,
+    'integrators': bench_integrators,
+    'adaptive': bench_adaptive,
+    'recorder': bench_recorder,
+    'analysis': bench_analysis,
+    'imports': bench_imports,
+}
+
+
+def run_benchmarks(names=None, quick=False, data_dir=None, progress=print):
+    """运行所选基准（缺省为全部），返回可序列化为 JSON 的结果字典"""
+    params = QUICK if quick else FULL
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'quick': quick,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': {},
+    }
+    for name in names or BENCHMARKS:
+        if progress:
+            progress(f"运行基准：{name}")
+        if name == 'analysis':
+            report['results'][name] = bench_analysis(params, data_dir)
+        else:
+            report['results'][name] = BENCHMARKS[name](params)
+    return report
+
+
+def compare(report, baseline, tolerance=0.2, noisy_tolerance=NOISY_TOLERANCE):
+    """与基准结果对比，返回退化项列表 [(基准名, 指标, 基准值, 当前值, 变化比例)]
+
+    只比较带方向后缀的指标；变化超过 tolerance（相对值）且方向变差时视为退化，
+    NOISY_PREFIXES 开头的指标使用 noisy_tolerance 与 tolerance 中较大的一个。
+    """
+    regressions = []
+    for group, metrics in report['results'].items():
+        base_metrics = baseline.get('results', {}).get(group, {})
+        for metric, value in metrics.items():
+            base = base_metrics.get(metric)
+            if not base:
+                continue
+            change = (value - base) / base
+            allowed = max(tolerance, noisy_tolerance) if metric.startswith(NOISY_PREFIXES) else tolerance
+            if metric.endswith(HIGHER_IS_BETTER) and change < -allowed:
+                regressions.append((group, metric, base, value, change))
+            elif metric.endswith(LOWER_IS_BETTER) and change > allowed:
+                regressions.append((group, metric, base, value, change))
+    return regressions
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="物理仿真性能基准测试（无界面）")
+    parser.add_argument('benchmarks', nargs='*',
+                        help=f"要运行的基准（{' / '.join(BENCHMARKS)}），缺省为全部")
+    parser.add_argument('--quick', action='store_true', help="使用较小的规模快速运行")
+    parser.add_argument('-o', '--output', help="结果 JSON 文件")
+    parser.add_argument('--baseline', help="用于对比的基准 JSON 文件")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="允许的相对退化（缺省 0.2）")
+    parser.add_argument('--noisy-tolerance', type=float, default=NOISY_TOLERANCE,
+                        help=f"逐个小球推进等波动大的指标允许的相对退化（缺省 {NOISY_TOLERANCE}）")
+    parser.add_argument('--data-dir', help="合成数据文件目录（保留以便重复运行）")
+    parser.add_argument('--check-imports', action='store_true',
+                        help=f"只检查导入预算（{IMPORT_BUDGET_SECONDS * 1000:.0f} ms）与延迟导入，失败时返回非零退出码")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知的基准：{', '.join(unknown)}")
+
+    if args.check_imports:
+        problems = check_imports()
+        for module, message in problems:
+            print(f"  {module}: {message}")
+        if problems:
+            print(f"导入检查未通过：{len(problems)} 项问题")
+            return 1
+        print(f"导入检查通过：{len(IMPORT_MODULES)} 个模块")
+        return 0
+
+    report = run_benchmarks(args.benchmarks or None, quick=args.quick, data_dir=args.data_dir)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+        print(f"结果已保存到 {args.output}")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare(report, baseline, args.tolerance, args.noisy_tolerance)
+        if regressions:
+            print(f"\n发现 {len(regressions)} 项性能退化（容差 {args.tolerance:.0%}）：")
+            for group, metric, base, value, change in regressions:
+                print(f"  {group}.{metric}: {base:.4g} -> {value:.4g} ({change:+.1%})")
+            return 1
+        print(f"\n与基准相比没有超过 {args.tolerance:.0%} 的退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
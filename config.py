@@ -22,6 +22,7 @@ class ExperimentConfig:
     # 小球参数
     BALL_RADIUS = 0.08     # 小球显示半径 (m)
     TRAIL_RETAIN = 300     # 轨迹保留点数
+    TRAIL_INTERVAL = 2     # 每更新几次画面位置取一个轨迹点（与物理步长无关）
     
     # 默认小球配置
     DEFAULT_BALLS = [
@@ -55,19 +56,63 @@ class ExperimentConfig:
     
     # 仿真参数
     SIMULATION_DT = 0.002     # 时间步长 (s)
-    FRAME_RATE = 500          # 帧率
+    FRAME_RATE = 60           # 渲染/界面刷新帧率，与物理步长无关
+    UI_REFRESH_RATE = 10      # 实时数据文本的刷新频率 (Hz)，只发送变化了的文本
+    MAX_SUBSTEPS_PER_FRAME = 100  # 单帧最多执行的物理步数（按倍速放大；渲染卡顿时丢弃多余时间）
+    REAL_TIME_FACTOR = 1.0    # 播放倍速：仿真时间 / 真实时间（<1 慢放，>1 快进）
+    REAL_TIME_FACTORS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 100]  # 界面上可选的倍速
+    PHYSICS_WORKER = False    # 在独立进程中运行物理（通过共享内存读取最新状态，记录按帧采样）
+    # 数值积分器，可选：semi_implicit_euler / velocity_verlet / yoshida4 / rk4
+    # 高阶辛积分器在相同能量漂移下可使用大得多的 SIMULATION_DT
+    INTEGRATOR = 'semi_implicit_euler'
+    # 无界面运行（simulation / sweep）还可以使用 'analytic'：无阻尼模式下直接用精确解求值，
+    # 以及 'adaptive'（simulation / sweep / headless）：自适应步长积分，下面是缺省的相对/绝对容差
+    ADAPTIVE_RTOL = 1e-8
+    ADAPTIVE_ATOL = 1e-10
+    # 相空间运动类型图（phase_map.py）：每批计算的初始条件数与结果缓存目录
+    PHASE_MAP_CHUNK = 262144
+    PHASE_MAP_CACHE_DIR = 'phase_map_cache'
+    # 仿真结果缓存（trajectory_cache.py）：相同输入的无界面仿真直接读取上次的结果
+    TRAJECTORY_CACHE_ENABLED = False  # 参数扫描缺省是否使用结果缓存（开启后在当前目录建立缓存目录）
+    TRAJECTORY_CACHE_DIR = 'trajectory_cache'
+    TRAJECTORY_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 超出时按最近最少使用淘汰
     
     # 图表设置
     ENABLE_ENERGY_GRAPH = True
     GRAPH_WIDTH = 400
     GRAPH_HEIGHT = 200
+    GRAPH_WINDOW = 30.0              # 能量图表显示的时间窗口 (s)
+    GRAPH_MAX_POINTS = 1000          # 每条曲线最多显示的点数（保留极值的降采样）
     
     # 矢量显示设置
     VELOCITY_ARROW_SCALE = 0.15      # 速度箭头缩放
     FORCE_ARROW_SCALE = 0.05         # 力箭头缩放
     ARROW_SHAFT_WIDTH = 0.03         # 箭头轴宽度
+    VISUAL_EPSILON = 0.005           # 位置/箭头变化小于此值 (m) 时不更新画面（默认视角下约半个像素）
+    
+    # 性能分析设置
+    PROFILE_ENABLED = False          # 启动时即开启主循环分阶段计时（也可在界面上切换）
+    PROFILE_WINDOW = 600             # 每个阶段保留最近多少帧的耗时用于计算分位数
+    PROFILE_REFRESH_RATE = 1         # 性能面板的刷新频率 (Hz)
     
     # 数据记录设置
+    RECORD_CAPACITY = 100000          # 记录器预分配行数
+    RECORD_RING_BUFFER = False        # 为 True 时只保留最近 RECORD_CAPACITY 行
+    RECORD_SAMPLE_EVERY = 1           # 每隔多少个物理步记录一次
+    STREAM_EXPORT = False             # 记录时由后台线程边记录边写入 CSV（可配合环形缓冲使用）
+    STREAM_QUEUE_SIZE = 64            # 流式导出队列最多积压的批次数
+    EXPORT_FORMAT = 'csv'             # 导出格式：'csv' 或 'trajectory'（二进制 .pbt，分块压缩带索引）
+    TRAJECTORY_COMPRESSION = 'zlib'   # 轨迹文件块压缩方式：'zlib' 或 None（不压缩时可内存映射读取）
+    TRAJECTORY_CHUNK_ROWS = 65536     # 轨迹文件每块（单个小球）的行数
+    # 数据分析设置
+    ANALYSIS_CHUNK_ROWS = 1000000     # 按块读取时每块的行数
+    ANALYSIS_STREAM_BYTES = 512 * 1024 * 1024  # 超过此大小的文件只做流式统计，不整体载入内存
+    PLOT_INTERACTIVE = True           # 分析图表保存后弹出窗口；为 False 时用 Agg 画布只保存（无显示器时使用）
+    PLOT_DPI = 300                    # 分析图表保存分辨率；每条曲线按此分辨率下的像素宽度降采样
+    PLOT_RASTERIZE_POINTS = 5000      # 降采样后仍多于此点数的曲线层栅格化（PDF / SVG 输出不随点数膨胀）
+    BATCH_PATTERN = 'physics_data_*.csv'  # 批量分析缺省查找的记录文件（通配符，支持 **）
+    BATCH_OUTPUT_DIR = 'batch_analysis'   # 批量分析的报告、汇总表与清单目录
+    # 导出时的小数位数（记录时保存原始数值）
     DATA_PRECISION = {
         'time': 3,
         'angle': 4,
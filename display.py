@@ -0,0 +1,275 @@
+# 界面显示辅助
+# 位于仿真与 VPython 控件之间，减少发送到浏览器的数据量；本模块不导入 VPython，
+# 所操作的图表、文本等对象由调用方传入
+
+import time
+from collections import deque
+
+import numpy as np
+
+from config import ExperimentConfig
+
+
+class DownsampledCurve:
+    """对 gcurve 做保留极值的降采样，并限制时间窗口与点数上限
+
+    时间轴按固定宽度分桶，每个桶只输出该桶内的最小值点和最大值点（按时间先后），
+    因此无论采样多密，能量漂移的尖峰都会保留下来。
+    已完成的桶以增量 plot() 追加到图上；窗口外的旧点累积到一定数量后整体重设 data，
+    图上的点数始终不超过 max_points。
+    """
+
+    def __init__(self, curve, window=ExperimentConfig.GRAPH_WINDOW,
+                 max_points=ExperimentConfig.GRAPH_MAX_POINTS):
+        self.curve = curve
+        self.window = window
+        self.max_points = max_points
+        # 每桶最多 2 点，另为窗口外尚未清除的旧点留出 1/4 余量
+        self.bucket_width = window / max(1, max_points * 2 // 5)
+        self.clear()
+
+    def clear(self):
+        """清空图表"""
+        self.points = deque()  # 已显示的点
+        self.stale = 0         # 已滑出窗口但仍显示在图上的点数
+        self._bucket = None    # 当前桶：[桶号, 最小值时间, 最小值, 最大值时间, 最大值]
+        self.curve.data = []
+
+    def add(self, t, y):
+        """加入一个采样点"""
+        index = int(t // self.bucket_width)
+        bucket = self._bucket
+        if bucket is None or index != bucket[0]:
+            if bucket is not None:
+                self._emit(bucket)
+            self._bucket = [index, t, y, t, y]
+            return
+        if y < bucket[2]:
+            bucket[1], bucket[2] = t, y
+        if y > bucket[4]:
+            bucket[3], bucket[4] = t, y
+
+    def add_many(self, times, values):
+        """批量加入采样点（时间递增），结果与逐点调用 add() 相同
+
+        按桶切分后每段只做一次 argmin/argmax，快进时每帧上千个点也只需少量 Python 操作。
+        """
+        times = np.asarray(times, dtype=float)
+        values = np.asarray(values, dtype=float)
+        if len(times) == 0:
+            return
+        index = (times // self.bucket_width).astype(np.int64)
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(index)) + 1]).tolist()
+        ends = starts[1:] + [len(times)]
+        for start, end in zip(starts, ends):
+            segment = values[start:end]
+            i_min = start + int(np.argmin(segment))
+            i_max = start + int(np.argmax(segment))
+            self._merge(int(index[start]), float(times[i_min]), float(values[i_min]),
+                        float(times[i_max]), float(values[i_max]))
+
+    def _merge(self, index, t_min, y_min, t_max, y_max):
+        """把一段同桶数据的最小值点与最大值点并入当前桶"""
+        bucket = self._bucket
+        if bucket is None or index != bucket[0]:
+            if bucket is not None:
+                self._emit(bucket)
+            self._bucket = [index, t_min, y_min, t_max, y_max]
+            return
+        if y_min < bucket[2]:
+            bucket[1], bucket[2] = t_min, y_min
+        if y_max > bucket[4]:
+            bucket[3], bucket[4] = t_max, y_max
+
+    def _emit(self, bucket):
+        _, t_min, y_min, t_max, y_max = bucket
+        if t_min == t_max:
+            new_points = [[t_min, y_min]]
+        elif t_min < t_max:
+            new_points = [[t_min, y_min], [t_max, y_max]]
+        else:
+            new_points = [[t_max, y_max], [t_min, y_min]]
+        self.points.extend(new_points)
+        self.curve.plot(new_points)
+
+        # 去掉滑出时间窗口的点
+        start = new_points[-1][0] - self.window
+        while self.points and self.points[0][0] < start:
+            self.points.popleft()
+            self.stale += 1
+        if self.stale + len(self.points) > self.max_points:
+            self.curve.data = list(self.points)
+            self.stale = 0
+
+
+class ReadoutPanel:
+    """实时数据面板
+
+    每个读数由 (控件, 格式模板) 组成，update() 按 refresh_rate 节流：
+    只有到了刷新时间才格式化，且只有显示文本真正变化时才赋值给控件（每次赋值都要与浏览器通信）。
+    读数键名任意，可以为每个小球单独添加读数。
+    """
+
+    def __init__(self, refresh_rate=ExperimentConfig.UI_REFRESH_RATE, clock=time.perf_counter):
+        self.interval = 1.0 / refresh_rate if refresh_rate else 0.0
+        self.clock = clock
+        self.readouts = {}  # 键 -> [控件, 模板, 上次显示的文本]
+        self.last_refresh = None
+        self.sent = 0       # 实际发送的文本更新次数
+        self.skipped = 0    # 文本未变化而省去的次数
+
+    def add(self, key, widget, template):
+        """添加读数，template 为 str.format 模板，例如 "速度: {:.2f} m/s" """
+        self.readouts[key] = [widget, template, widget.text]
+
+    def remove(self, key):
+        self.readouts.pop(key, None)
+
+    def due(self, now=None):
+        """是否到了刷新时间"""
+        if self.last_refresh is None:
+            return True
+        now = self.clock() if now is None else now
+        return now - self.last_refresh >= self.interval
+
+    def invalidate(self):
+        """下一次 update() 立即刷新（例如切换小球、重置之后）"""
+        self.last_refresh = None
+
+    def update(self, values, force=False):
+        """values 为 {键: 数值}；未到刷新时间时直接返回 False"""
+        now = self.clock()
+        if not force and not self.due(now):
+            return False
+        self.last_refresh = now
+        for key, value in values.items():
+            readout = self.readouts.get(key)
+            if readout is None:
+                continue
+            self.set_text(key, readout[1].format(value))
+        return True
+
+    def set_text(self, key, text):
+        """直接设置已格式化的文本（同样只在变化时发送）"""
+        readout = self.readouts[key]
+        if text == readout[2]:
+            self.skipped += 1
+            return
+        readout[0].text = text
+        readout[2] = text
+        self.sent += 1
+
+
+class VisualSync:
+    """把引擎状态同步到小球与箭头对象，尽量少写 VPython 属性
+
+    - 位置、箭头方向全部用 NumPy 一次算出；
+    - 隐藏的小球、隐藏的箭头不写；
+    - 变化小于 epsilon（亚像素）的位置与箭头不写；
+    - 重力箭头方向只在质量或重力改变时才写，其余时间只跟随小球移动。
+    vector 为 VPython 的 vector 构造函数，由调用方传入。
+    """
+
+    def __init__(self, engine, vector, epsilon=ExperimentConfig.VISUAL_EPSILON,
+                 velocity_scale=ExperimentConfig.VELOCITY_ARROW_SCALE,
+                 force_scale=ExperimentConfig.FORCE_ARROW_SCALE):
+        self.engine = engine
+        self.vector = vector
+        self.epsilon = epsilon
+        self.velocity_scale = velocity_scale
+        self.force_scale = force_scale
+        self.show_vectors = True
+        self.objects = {}  # 行号 -> (小球, 速度箭头, 向心力箭头, 重力箭头)
+        self.visible = np.zeros(0, dtype=bool)
+        self.writes = 0    # 实际写入的属性数
+        self._last = np.zeros((0, 4, 2))  # 每行上次写入的 位置 / 速度轴 / 向心力轴 / 重力轴
+        self.invalidate()
+
+    def add(self, row, sphere, arrow_v, arrow_c, arrow_g):
+        """登记某一行对应的可视化对象"""
+        self.objects[row] = (sphere, arrow_v, arrow_c, arrow_g)
+        if row >= len(self.visible):
+            grow = row + 1 - len(self.visible)
+            self.visible = np.concatenate([self.visible, np.zeros(grow, dtype=bool)])
+            self._last = np.concatenate([self._last, np.full((grow, 4, 2), np.nan)])
+        self.visible[row] = sphere.visible
+
+    def set_visible(self, row, visible):
+        self.visible[row] = visible
+        self.invalidate(row)
+
+    def invalidate(self, rows=None):
+        """清除缓存，下次 sync() 时全部重写（切换显示、改参数、重置后调用）"""
+        if rows is None:
+            self._last[:] = np.nan
+        else:
+            self._last[rows] = np.nan
+
+    def _targets(self, rows):
+        """计算各行的位置和三个箭头的轴，形状 (行数, 4, 2)"""
+        e = self.engine
+        theta, omega = e.theta[rows], e.omega[rows]
+        mass, radius, g = e.mass[rows], e.radius[rows], e.g[rows]
+        sin_t, cos_t = np.sin(theta), np.cos(theta)
+        targets = np.empty((len(theta), 4, 2))
+        # 位置
+        targets[:, 0, 0] = radius * sin_t
+        targets[:, 0, 1] = radius * cos_t
+        # 速度箭头（切向）
+        v = omega * radius * self.velocity_scale
+        targets[:, 1, 0] = v * cos_t
+        targets[:, 1, 1] = -v * sin_t  # 负号因为角度定义
+        # 向心力箭头（指向圆心）
+        centripetal = mass * omega**2 * radius * self.force_scale
+        targets[:, 2, 0] = -sin_t * centripetal
+        targets[:, 2, 1] = -cos_t * centripetal
+        # 重力箭头（竖直向下，只随质量和重力变化）
+        targets[:, 3, 0] = 0.0
+        targets[:, 3, 1] = -mass * g * self.force_scale
+        return targets
+
+    def sync(self, rows=None, force=False):
+        """同步指定行（缺省为所有可见行）；force 为真时忽略阈值"""
+        if rows is None:
+            rows = np.flatnonzero(self.visible)
+        else:
+            rows = np.asarray(rows, dtype=int)
+        if len(rows) == 0:
+            return 0
+
+        targets = self._targets(rows)
+        delta = np.abs(targets - self._last[rows]).max(axis=2)
+        # 缓存为 NaN 时比较结果为 False，需要单独视为已变化
+        changed = ~(delta <= self.epsilon) if not force else np.ones(delta.shape, dtype=bool)
+        if not self.show_vectors:
+            changed[:, 1:] = False
+
+        vector = self.vector
+        writes = 0
+        for i in np.flatnonzero(changed.any(axis=1)).tolist():
+            row = int(rows[i])
+            sphere, arrow_v, arrow_c, arrow_g = self.objects[row]
+            (x, y), (vx, vy), (cx, cy), (gx, gy) = targets[i].tolist()
+            moved = changed[i, 0]
+            if moved:
+                pos = vector(x, y, 0)
+                sphere.pos = pos
+                writes += 1
+                if self.show_vectors:
+                    arrow_v.pos = arrow_c.pos = arrow_g.pos = pos
+                    writes += 3
+                self._last[row, 0] = targets[i, 0]
+            if changed[i, 1]:
+                arrow_v.axis = vector(vx, vy, 0)
+                self._last[row, 1] = targets[i, 1]
+                writes += 1
+            if changed[i, 2]:
+                arrow_c.axis = vector(cx, cy, 0)
+                self._last[row, 2] = targets[i, 2]
+                writes += 1
+            if changed[i, 3]:
+                arrow_g.axis = vector(gx, gy, 0)
+                self._last[row, 3] = targets[i, 3]
+                writes += 1
+        self.writes += writes
+        return writes
@@ -0,0 +1,205 @@
+# 在线能量统计
+# 在引擎逐步推进时维护每个小球总能量的流式统计量：均值与方差（Welford）、最值、相对初始值的漂移，
+# 以及每个周期（同方向相邻两次经过最低点之间）的能量漂移。内存占用只与小球数有关，
+# 不需要记录完整轨迹就能得到能量守恒精度，结果可直接交给 generate_experiment_report
+
+import numpy as np
+
+BLOCK_STEPS = 1024  # PendulumEngine.step_many 每攒够这么多步提交一次统计
+
+
+def total_energy(theta, omega, mass, g, radius):
+    """总能量（与 physics_engine.derived_quantities 中的定义相同）"""
+    return 0.5 * mass * (omega * radius)**2 + mass * g * radius * (np.cos(theta) + 1)
+
+
+class EnergyMonitor:
+    """每个小球总能量的在线统计
+
+    由 PendulumEngine.attach_energy_monitor() 挂到引擎上，每步由引擎调用 observe()；
+    也可以在只有采样状态的场合（例如读取工作进程的快照）直接调用 observe()。
+    """
+
+    def __init__(self):
+        self.count = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)             # 离差平方和
+        self.min = np.zeros(0)
+        self.max = np.zeros(0)
+        self.initial = np.zeros(0)        # 第一次观测的步前能量（初始能量）
+        self.last = np.zeros(0)           # 最近一次观测到的能量
+        self.max_deviation = np.zeros(0)  # max |E - E0|
+        # 每周期漂移：上次向 -/+ 方向经过最低点时的能量，及周期漂移 (E - E_上次) 的统计
+        self.crossing_energy = np.zeros((0, 2))
+        self.period_count = np.zeros(0, dtype=np.int64)
+        self.period_drift_mean = np.zeros(0)
+        self.period_drift_max = np.zeros(0)  # max |ΔE|
+
+    def _ensure(self, count):
+        grow = count - len(self.count)
+        if grow <= 0:
+            return
+        self.count = np.concatenate([self.count, np.zeros(grow, dtype=np.int64)])
+        for name in ('mean', 'm2', 'initial', 'last', 'max_deviation',
+                     'period_drift_mean', 'period_drift_max'):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(grow)]))
+        self.min = np.concatenate([self.min, np.full(grow, np.inf)])
+        self.max = np.concatenate([self.max, np.full(grow, -np.inf)])
+        self.crossing_energy = np.concatenate([self.crossing_energy, np.full((grow, 2), np.nan)])
+        self.period_count = np.concatenate([self.period_count, np.zeros(grow, dtype=np.int64)])
+
+    def clear(self):
+        """清空统计（例如重置实验后），下一次观测重新作为初始能量"""
+        self.count[:] = 0
+        self.mean[:] = 0
+        self.m2[:] = 0
+        self.min[:] = np.inf
+        self.max[:] = -np.inf
+        self.initial[:] = 0
+        self.last[:] = 0
+        self.max_deviation[:] = 0
+        self.crossing_energy[:] = np.nan
+        self.period_count[:] = 0
+        self.period_drift_mean[:] = 0
+        self.period_drift_max[:] = 0
+
+    def observe(self, rows, theta0, omega0, theta1, omega1, mass, g, radius):
+        """记录一步结束时的状态
+
+        rows 为行号数组或布尔掩码；theta0、omega0 为步前状态（用于初始能量与判断是否经过最低点），
+        其余数组为步后状态与参数，与 rows 选出的行一一对应。
+        """
+        self.observe_steps(rows, theta0, omega0, np.asarray(theta1)[None], np.asarray(omega1)[None],
+                           mass, g, radius)
+
+    def observe_steps(self, rows, theta0, omega0, theta, omega, mass, g, radius):
+        """一次记录连续多步：theta、omega 形状为 (步数, 行数)，依次为每一步结束时的状态
+
+        整块先算出块内均值与离差平方和，再按 Chan 公式并入已有统计，
+        结果与逐步调用 observe() 相同（舍入误差以内），但每块只有固定次数的数组运算。
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            self._ensure(len(rows))
+            rows = np.flatnonzero(rows)
+        elif len(rows):
+            self._ensure(int(rows.max()) + 1)
+        steps = len(theta)
+        if not len(rows) or not steps:
+            return
+        energy = total_energy(theta, omega, mass, g, radius)
+
+        first = self.count[rows] == 0
+        if first.any():
+            self.initial[rows[first]] = total_energy(theta0[first], omega0[first], mass[first],
+                                                     g[first], radius[first])
+        # 块内统计量按 Chan 公式合并
+        count = self.count[rows]
+        block_mean = energy.mean(axis=0)
+        block_m2 = ((energy - block_mean)**2).sum(axis=0)
+        delta = block_mean - self.mean[rows]
+        merged = count + steps
+        self.mean[rows] += delta * steps / merged
+        self.m2[rows] += block_m2 + delta**2 * count * steps / merged
+        self.count[rows] = merged
+        self.min[rows] = np.minimum(self.min[rows], energy.min(axis=0))
+        self.max[rows] = np.maximum(self.max[rows], energy.max(axis=0))
+        self.last[rows] = energy[-1]
+        self.max_deviation[rows] = np.maximum(self.max_deviation[rows],
+                                              np.abs(energy - self.initial[rows]).max(axis=0))
+
+        # 经过最低点（θ 越过 π + 2πj）：同方向相邻两次之间为一个周期
+        path = np.concatenate([np.asarray(theta0)[None], theta])
+        turn = np.floor((path - np.pi) / (2 * np.pi))
+        step_index, column = np.nonzero(turn[1:] != turn[:-1])
+        if len(step_index):
+            side = (path[step_index + 1, column] > path[step_index, column]).astype(int)
+            self._update_periods(rows[column], side, step_index, energy[step_index, column])
+
+    def _update_periods(self, balls, side, step_index, energy):
+        # 按 (小球, 方向, 步) 排序，同组相邻两次经过之差即一个周期的能量变化
+        order = np.lexsort((step_index, side, balls))
+        balls, side, energy = balls[order], side[order], energy[order]
+        same = (balls[1:] == balls[:-1]) & (side[1:] == side[:-1])
+        first_in_group = np.concatenate([[True], ~same])
+        last_in_group = np.concatenate([~same, [True]])
+        previous = np.concatenate([[np.nan], energy[:-1]])
+        previous[first_in_group] = self.crossing_energy[balls[first_in_group], side[first_in_group]]
+        self.crossing_energy[balls[last_in_group], side[last_in_group]] = energy[last_in_group]
+
+        valid = ~np.isnan(previous)
+        if not valid.any():
+            return
+        balls, change = balls[valid], (energy - previous)[valid]
+        size = len(self.period_count)
+        added = np.bincount(balls, minlength=size)
+        total = np.bincount(balls, weights=change, minlength=size)
+        changed = added > 0
+        count = self.period_count[changed] + added[changed]
+        self.period_drift_mean[changed] += ((total[changed] - added[changed] * self.period_drift_mean[changed])
+                                            / count)
+        self.period_count[changed] = count
+        np.maximum.at(self.period_drift_max, balls, np.abs(change))
+
+    def ball_summary(self, row):
+        """单个小球的统计字典（键名与 analysis.RecordingStats.summary 的能量部分一致）"""
+        n = int(self.count[row]) if row < len(self.count) else 0
+        if not n:
+            return {'n_points': 0}
+        mean = float(self.mean[row])
+        initial = float(self.initial[row])
+        scale = abs(initial) if initial else 1.0  # 初始能量为 0 时给出绝对漂移
+        variation = float(self.max[row] - self.min[row])
+        periods = int(self.period_count[row])
+        return {
+            'n_points': n,
+            'avg_total_energy': mean,
+            'energy_std': float(np.sqrt(self.m2[row] / n)),
+            'energy_min': float(self.min[row]),
+            'energy_max': float(self.max[row]),
+            'energy_variation': variation,
+            'energy_stability': variation / mean * 100 if mean else 0.0,
+            'initial_energy': initial,
+            'relative_drift': float(self.last[row] - initial) / scale,
+            'max_relative_drift': float(self.max_deviation[row]) / scale,
+            'periods': periods,
+            # 还没有完整周期时没有测到每周期漂移，记为 NaN（而不是看起来完美守恒的 0）
+            'period_drift_mean': float(self.period_drift_mean[row]) / scale if periods else float('nan'),
+            'period_drift_max': float(self.period_drift_max[row]) / scale if periods else float('nan'),
+        }
+
+    def summary(self):
+        """全部小球的总体统计
+
+        平均能量与标准差按 Chan 公式合并全部样本；各小球能量不同，合并后的极差没有意义，
+        因此能量变化、稳定性与漂移取各小球中最差的一个；每周期漂移只在已完成周期的小球中取，
+        'periods' 为各小球完成的周期数之和，为 0 时 period_drift_max 为 NaN。
+        """
+        observed = np.flatnonzero(self.count)
+        if not len(observed):
+            return {'n_points': 0}
+        counts = self.count[observed]
+        total = int(counts.sum())
+        mean = float(np.sum(self.mean[observed] * counts) / total)
+        m2 = float(np.sum(self.m2[observed]) + np.sum(counts * (self.mean[observed] - mean)**2))
+        balls = [self.ball_summary(row) for row in observed]
+        return {
+            'n_points': total,
+            'avg_total_energy': mean,
+            'energy_std': (m2 / total) ** 0.5,
+            'energy_variation': max(ball['energy_variation'] for ball in balls),
+            'energy_stability': max(ball['energy_stability'] for ball in balls),
+            'max_relative_drift': max(ball['max_relative_drift'] for ball in balls),
+            'periods': sum(ball['periods'] for ball in balls),
+            'period_drift_max': max((ball['period_drift_max'] for ball in balls if ball['periods']),
+                                    default=float('nan')),
+        }
+
+    def report(self, ball_names=()):
+        """与 analyze_exported_data 返回值相同结构的 {'stats', 'balls'}，可直接生成实验报告"""
+        names = list(ball_names)
+        balls = {}
+        for row in np.flatnonzero(self.count):
+            name = names[row] if row < len(names) else f"小球{row + 1}"
+            balls[name] = self.ball_summary(row)
+        return {'stats': self.summary(), 'balls': balls, 'source': 'online'}
@@ -0,0 +1,194 @@
+# 运动事件检测
+# 在引擎逐步推进时在线检测转折点（ω 变号）、经过最低点（平衡位置）和转过最高点（完成一圈），
+# 用三次 Hermite 插值在步内精确定位事件时刻，并由同方向经过最低点的间隔估计每个小球的周期
+#
+# 注意 θ 从最高点起算：θ = π + 2πj 为最低点（相对平衡位置的"零点"），θ = 2πj 为最高点
+
+import numpy as np
+
+from integrators import angular_acceleration
+
+# 事件类型
+TURNING_POINT = 0    # 转折点（角速度变号）
+BOTTOM_CROSSING = 1  # 经过最低点
+LOOP = 2             # 经过最高点（完成一圈）
+EVENT_NAMES = {TURNING_POINT: '转折点', BOTTOM_CROSSING: '经过最低点', LOOP: '完成一圈'}
+
+# 事件记录：时刻、小球行号、类型、方向（+1 / -1）、数值
+# 数值：转折点为该处的 θ，经过最低点 / 最高点时为该处的 ω
+EVENT_DTYPE = np.dtype([('time', 'f8'), ('ball', 'i4'), ('kind', 'i1'),
+                        ('direction', 'i1'), ('value', 'f8')])
+
+_BISECTION_STEPS = 40
+
+
+def _hermite(y0, y1, d0, d1, h, s):
+    """三次 Hermite 插值，s ∈ [0, 1] 为步内位置，h 为步长"""
+    s2, s3 = s * s, s * s * s
+    return ((2 * s3 - 3 * s2 + 1) * y0 + (s3 - 2 * s2 + s) * h * d0
+            + (-2 * s3 + 3 * s2) * y1 + (s3 - s2) * h * d1)
+
+
+def _locate(y0, y1, d0, d1, h, level):
+    """在 [0, 1] 内二分求 Hermite 插值曲线穿过 level 的位置（端点两侧须异号）"""
+    low = np.zeros_like(y0)
+    high = np.ones_like(y0)
+    rising = y1 > y0
+    for _ in range(_BISECTION_STEPS):
+        mid = (low + high) / 2
+        above = _hermite(y0, y1, d0, d1, h, mid) > level
+        # 上升时越过 level 说明根在左侧，下降时相反
+        left = above == rising
+        high = np.where(left, mid, high)
+        low = np.where(left, low, mid)
+    return (low + high) / 2
+
+
+class EventDetector:
+    """在线事件检测器
+
+    由 PendulumEngine.attach_events() 挂到引擎上，每步由引擎调用 observe()。
+    事件以结构数组（EVENT_DTYPE）保存，内存占用只与事件数有关，不需要记录完整轨迹。
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._log = None
+        self.count = 0
+        # 每个小球的统计，随引擎新增小球自动扩展
+        self.last_crossing = np.zeros((0, 2))  # 上次向 -/+ 方向经过最低点的时刻
+        self.period_count = np.zeros(0, dtype=np.int64)
+        self.period_mean = np.zeros(0)
+        self.period_m2 = np.zeros(0)
+        self.kind_counts = np.zeros((0, len(EVENT_NAMES)), dtype=np.int64)
+
+    def _ensure(self, count):
+        grow = count - len(self.period_count)
+        if grow <= 0:
+            return
+        self.last_crossing = np.concatenate([self.last_crossing, np.full((grow, 2), np.nan)])
+        self.period_count = np.concatenate([self.period_count, np.zeros(grow, dtype=np.int64)])
+        self.period_mean = np.concatenate([self.period_mean, np.zeros(grow)])
+        self.period_m2 = np.concatenate([self.period_m2, np.zeros(grow)])
+        self.kind_counts = np.concatenate(
+            [self.kind_counts, np.zeros((grow, len(EVENT_NAMES)), dtype=np.int64)])
+
+    def clear(self):
+        """清空事件与周期统计（例如重置实验后）"""
+        self._chunks = []
+        self._log = None
+        self.count = 0
+        self.last_crossing[:] = np.nan
+        self.period_count[:] = 0
+        self.period_mean[:] = 0
+        self.period_m2[:] = 0
+        self.kind_counts[:] = 0
+
+    def observe(self, time, dt, rows, theta0, omega0, theta1, omega1, g, radius):
+        """检测 [time, time + dt] 内各行的事件
+
+        rows 为行号数组或布尔掩码，其余数组与 rows 选出的行一一对应。
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            self._ensure(len(rows))
+            rows = np.flatnonzero(rows)
+        elif len(rows):
+            self._ensure(int(rows.max()) + 1)
+
+        # 转折点：ω 严格变号，或恰好落到 0
+        turning = (np.sign(omega0) * np.sign(omega1) < 0) | ((omega1 == 0) & (omega0 != 0))
+        # 经过最低点 / 最高点：θ 越过 π + 2πj / 2πj（每步最多越过一次）
+        bottom_j0 = np.floor((theta0 - np.pi) / (2 * np.pi))
+        bottom_j1 = np.floor((theta1 - np.pi) / (2 * np.pi))
+        top_j0 = np.floor(theta0 / (2 * np.pi))
+        top_j1 = np.floor(theta1 / (2 * np.pi))
+        bottom = bottom_j0 != bottom_j1
+        top = top_j0 != top_j1
+        if not (turning.any() or bottom.any() or top.any()):
+            return
+
+        parts = []
+        idx = np.flatnonzero(turning)
+        if len(idx):
+            alpha0 = angular_acceleration(theta0[idx], g[idx], radius[idx])
+            alpha1 = angular_acceleration(theta1[idx], g[idx], radius[idx])
+            s = _locate(omega0[idx], omega1[idx], alpha0, alpha1, dt, 0.0)
+            value = _hermite(theta0[idx], theta1[idx], omega0[idx], omega1[idx], dt, s)
+            parts.append((idx, s, TURNING_POINT, -np.sign(omega0[idx]), value))
+
+        for kind, mask, j0, j1, offset in ((BOTTOM_CROSSING, bottom, bottom_j0, bottom_j1, np.pi),
+                                           (LOOP, top, top_j0, top_j1, 0.0)):
+            idx = np.flatnonzero(mask)
+            if not len(idx):
+                continue
+            level = offset + 2 * np.pi * np.maximum(j0[idx], j1[idx])
+            alpha0 = angular_acceleration(theta0[idx], g[idx], radius[idx])
+            alpha1 = angular_acceleration(theta1[idx], g[idx], radius[idx])
+            s = _locate(theta0[idx], theta1[idx], omega0[idx], omega1[idx], dt, level)
+            value = _hermite(omega0[idx], omega1[idx], alpha0, alpha1, dt, s)
+            parts.append((idx, s, kind, np.sign(theta1[idx] - theta0[idx]), value))
+
+        for idx, s, kind, direction, value in parts:
+            events = np.empty(len(idx), dtype=EVENT_DTYPE)
+            events['time'] = time + s * dt
+            events['ball'] = rows[idx]
+            events['kind'] = kind
+            events['direction'] = direction
+            events['value'] = value
+            self._chunks.append(events)
+            self.count += len(events)
+            np.add.at(self.kind_counts, (events['ball'], kind), 1)
+            if kind == BOTTOM_CROSSING:
+                self._update_periods(events)
+        self._log = None
+
+    def _update_periods(self, events):
+        """同方向相邻两次经过最低点的间隔即一个周期（摆动为一次往返，转动为一圈）"""
+        balls = events['ball']
+        side = (events['direction'] > 0).astype(int)
+        previous = self.last_crossing[balls, side]
+        self.last_crossing[balls, side] = events['time']
+        valid = ~np.isnan(previous)
+        if not valid.any():
+            return
+        balls, period = balls[valid], (events['time'] - previous)[valid]
+        # Welford 增量更新
+        count = self.period_count[balls] + 1
+        delta = period - self.period_mean[balls]
+        mean = self.period_mean[balls] + delta / count
+        self.period_m2[balls] += delta * (period - mean)
+        self.period_mean[balls] = mean
+        self.period_count[balls] = count
+
+    @property
+    def log(self):
+        """按时间排序的全部事件（结构数组）"""
+        if self._log is None:
+            if self._chunks:
+                log = np.concatenate(self._chunks)
+                self._chunks = [log[np.argsort(log['time'], kind='stable')]]
+            self._log = self._chunks[0] if self._chunks else np.empty(0, dtype=EVENT_DTYPE)
+        return self._log
+
+    def events(self, kind=None, ball=None):
+        """筛选事件"""
+        log = self.log
+        mask = np.ones(len(log), dtype=bool)
+        if kind is not None:
+            mask &= log['kind'] == kind
+        if ball is not None:
+            mask &= log['ball'] == ball
+        return log[mask]
+
+    def counts(self, kind):
+        """每个小球某类事件的次数"""
+        return self.kind_counts[:, kind].copy()
+
+    def periods(self):
+        """每个小球的周期估计：{'mean', 'std', 'count'}，尚无完整周期的小球为 NaN"""
+        count = self.period_count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, self.period_mean, np.nan)
+            std = np.where(count > 1, np.sqrt(self.period_m2 / count), np.where(count > 0, 0.0, np.nan))
+        return {'mean': mean, 'std': std, 'count': count.copy()}
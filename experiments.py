@@ -1,9 +1,7 @@
 # 物理实验示例脚本
 # 展示如何使用增强版圆周运动项目进行各种实验
 
-import csv
-import matplotlib.pyplot as plt
-import numpy as np
+import math
 from datetime import datetime
 
 class PhysicsExperiments:
@@ -60,8 +58,17 @@ class PhysicsExperiments:
             
         return experiments
     
-    def initial_velocity_study(self):
-        """初始速度影响研究"""
+    def initial_velocity_study(self, theta0=math.pi / 2, gravity=9.8, radius=2.0,
+                               heatmap_filename=None, cache_dir=None):
+        """初始速度影响研究
+
+        用相空间运动类型图（phase_map.py）在整张 (θ0, ω0) 网格上区分摆动与完整圆周运动，
+        给出释放角 θ0 处的临界角速度；heatmap_filename 不为空时保存热力图。
+        cache_dir 缺省不缓存相空间图（不在当前目录写文件），给出目录时读写该目录中的缓存。
+        """
+        from analytic import AnalyticPendulum, REGIME_NAMES
+        from phase_map import critical_omega, phase_map, regime_fractions, render_heatmap
+
         print("=== 初始速度影响研究 ===")
         print("实验目的：分析初始角速度对运动的影响")
         print("实验步骤：")
@@ -70,16 +77,33 @@ class PhysicsExperiments:
         print("3. 观察运动轨迹差异")
         print("4. 分析临界速度条件")
         
-        # 不同初始速度的实验
+        # 整张相空间图：每个初始条件的运动类型、振幅与周期
+        result = phase_map(n_theta=400, n_omega=400, gravity=gravity, radius=radius,
+                           cache_dir=cache_dir)
+        fractions = regime_fractions(result)
+        print(f"\n相空间图（{result['regime'].size} 个初始条件）：" + "，".join(
+            f"{name} {fraction:.1%}" for name, fraction in fractions.items() if fraction))
+        omega_c = float(critical_omega(theta0, gravity, radius))
+        print(f"临界角速度：θ0 = {theta0:.2f} rad 处 |ω0| > {omega_c:.3f} rad/s 时做完整圆周运动")
+        
+        # 临界速度两侧的代表性初始速度
         velocity_tests = [
-            {'name': '低速', 'omega': 0.5, 'description': '摆动运动'},
-            {'name': '中速', 'omega': 2.0, 'description': '过渡状态'},
-            {'name': '高速', 'omega': 4.0, 'description': '完整圆周运动'}
+            {'name': '低速', 'omega': round(0.5 * omega_c, 2)},
+            {'name': '中速', 'omega': round(0.95 * omega_c, 2)},
+            {'name': '高速', 'omega': round(1.5 * omega_c, 2)},
         ]
-        
+        exact = AnalyticPendulum(theta0, [test['omega'] for test in velocity_tests], gravity, radius)
         print(f"\n速度测试：")
-        for test in velocity_tests:
-            print(f"  {test['name']}: ω={test['omega']}rad/s - {test['description']}")
+        for i, test in enumerate(velocity_tests):
+            test['description'] = REGIME_NAMES[int(exact.regime[i])]
+            test['period'] = float(exact.period[i])
+            test['amplitude'] = float(exact.amplitude[i])
+            print(f"  {test['name']}: ω={test['omega']}rad/s - {test['description']}，"
+                  f"周期 {test['period']:.3f} s")
+        
+        if heatmap_filename:
+            render_heatmap(result, heatmap_filename)
+            print(f"相空间图已保存：{heatmap_filename}")
             
         return velocity_tests
     
@@ -105,65 +129,101 @@ class PhysicsExperiments:
             print(f"  {env['name']}: g={env['gravity']}m/s² - {env['description']}")
             
         return environments
-    
-    def analyze_exported_data(self, csv_filename):
-        """分析导出的实验数据"""
+
+    def run_headless_sweep(self, definitions, duration=20.0, processes=None, **params):
+        """无界面批量运行实验配置（各实验方法的返回值或 sweep.expand_grid 的任务）"""
+        from sweep import jobs_from_experiment, run_sweep
+
+        if definitions and 'balls' in definitions[0]:
+            jobs = definitions
+        else:
+            params.setdefault('detect_events', True)  # 顺带测量周期，便于对比
+            jobs = jobs_from_experiment(definitions, duration=duration, **params)
+        cache_stats = {}
+        rows, _ = run_sweep(jobs, processes=processes, cache_stats=cache_stats)
+
+        cache_note = ""
+        if cache_stats['hits'] + cache_stats['misses']:
+            cache_note = f"，缓存命中 {cache_stats['hits']} 个 / 未命中 {cache_stats['misses']} 个"
+        print(f"\n无界面运行结果（{len(jobs)} 个任务{cache_note}）：")
+        for row in rows:
+            print(f"  {row['name']}: 最大速度={row['max_speed']:.3f}m/s, "
+                  f"角度范围={row['theta_min']:.3f}~{row['theta_max']:.3f}rad, "
+                  f"能量漂移={row['energy_drift'] * 100:.4f}%"
+                  + (f", 周期={row['period']:.4f}s"
+                     if not math.isnan(row.get('period', math.nan)) else ""))
+
+        self.data_storage['sweep'] = rows
+        return rows
+
+    def analyze_exported_data(self, csv_filename, by_ball=False, chunksize=None, plot=True,
+                              interactive=None):
+        """分析导出的实验数据
+
+        by_ball     —— 同时按小球分别统计
+        chunksize   —— 指定时按块流式统计（超大文件自动启用），不载入全部数据也不绘图
+        interactive —— 为假时图表只保存不显示（见 plot_analysis）
+        """
+        from analysis import compute_stats, iter_chunks, load_recording, should_stream
+
         print(f"=== 数据分析：{csv_filename} ===")
         
         try:
-            # 读取CSV数据
-            data = []
-            with open(csv_filename, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    data.append(row)
+            streaming = should_stream(csv_filename, chunksize)
+            if streaming:
+                # 按块读取，只保留流式统计量
+                stats, ball_stats = compute_stats(iter_chunks(csv_filename, chunksize), by_ball)
+                data = None
+            else:
+                # 按列整体读取
+                data = load_recording(csv_filename)
+                stats, ball_stats = compute_stats([data] if data else [], by_ball)
             
-            if not data:
+            if not stats['n_points']:
                 print("错误：文件为空或格式不正确")
                 return
             
-            # 提取数据
-            times = [float(row['时间(s)']) for row in data]
-            angles = [float(row['角度(rad)']) for row in data]
-            velocities = [float(row['速度(m/s)']) for row in data]
-            kinetic_energies = [float(row['动能(J)']) for row in data]
-            potential_energies = [float(row['势能(J)']) for row in data]
-            total_energies = [float(row['总能量(J)']) for row in data]
-            
             # 基本统计
-            print(f"数据点数：{len(data)}")
-            print(f"时间范围：{min(times):.2f}s - {max(times):.2f}s")
-            print(f"角度范围：{min(angles):.3f}rad - {max(angles):.3f}rad")
-            print(f"最大速度：{max(velocities):.3f}m/s")
+            print(f"数据点数：{stats['n_points']}")
+            print(f"时间范围：{stats['time_min']:.2f}s - {stats['time_max']:.2f}s")
+            print(f"角度范围：{stats['angle_min']:.3f}rad - {stats['angle_max']:.3f}rad")
+            print(f"最大速度：{stats['max_speed']:.3f}m/s")
             
             # 能量分析
-            avg_total_energy = sum(total_energies) / len(total_energies)
-            energy_variation = max(total_energies) - min(total_energies)
-            energy_stability = (energy_variation / avg_total_energy) * 100
-            
             print(f"\n能量分析：")
-            print(f"平均总能量：{avg_total_energy:.6f}J")
-            print(f"能量变化：{energy_variation:.6f}J")
-            print(f"能量稳定性：{energy_stability:.3f}%")
+            print(f"平均总能量：{stats['avg_total_energy']:.6f}J")
+            print(f"能量变化：{stats['energy_variation']:.6f}J")
+            print(f"能量稳定性：{stats['energy_stability']:.3f}%")
+            
+            if ball_stats:
+                print("\n分小球统计：")
+                for name, item in ball_stats.items():
+                    print(f"  {name}: 数据点数={item['n_points']}, 最大速度={item['max_speed']:.3f}m/s, "
+                          f"能量稳定性={item['energy_stability']:.3f}%")
+            
+            if streaming:
+                return {'stats': stats, 'balls': ball_stats}
             
             # 绘制图表
-            self.plot_analysis(times, angles, velocities, kinetic_energies, 
-                             potential_energies, total_energies, csv_filename)
+            if plot:
+                self.plot_analysis(data['time'], data['theta'], data['speed'],
+                                   data['kinetic_energy'], data['potential_energy'],
+                                   data['total_energy'], csv_filename,
+                                   angular_velocities=data.get('omega'), interactive=interactive)
             
             return {
-                'times': times,
-                'angles': angles,
-                'velocities': velocities,
+                'times': data['time'],
+                'angles': data['theta'],
+                'angular_velocities': data.get('omega'),
+                'velocities': data['speed'],
+                'ball_names': data['ball'],
                 'energies': {
-                    'kinetic': kinetic_energies,
-                    'potential': potential_energies,
-                    'total': total_energies
+                    'kinetic': data['kinetic_energy'],
+                    'potential': data['potential_energy'],
+                    'total': data['total_energy']
                 },
-                'stats': {
-                    'avg_total_energy': avg_total_energy,
-                    'energy_variation': energy_variation,
-                    'energy_stability': energy_stability
-                }
+                'stats': stats,
+                'balls': ball_stats
             }
             
         except FileNotFoundError:
@@ -173,65 +233,60 @@ class PhysicsExperiments:
             print(f"错误：数据分析失败 - {e}")
             return None
     
-    def plot_analysis(self, times, angles, velocities, ke, pe, te, filename):
-        """绘制分析图表"""
-        
-        # 创建子图
-        fig, axes = plt.subplots(2, 2, figsize=(12, 10))
-        fig.suptitle(f'实验数据分析 - {filename}', fontsize=14)
-        
-        # 角度随时间变化
-        axes[0, 0].plot(times, angles, 'b-', linewidth=2)
-        axes[0, 0].set_title('角度变化')
-        axes[0, 0].set_xlabel('时间 (s)')
-        axes[0, 0].set_ylabel('角度 (rad)')
-        axes[0, 0].grid(True, alpha=0.3)
-        
-        # 速度随时间变化
-        axes[0, 1].plot(times, velocities, 'r-', linewidth=2)
-        axes[0, 1].set_title('速度变化')
-        axes[0, 1].set_xlabel('时间 (s)')
-        axes[0, 1].set_ylabel('速度 (m/s)')
-        axes[0, 1].grid(True, alpha=0.3)
-        
-        # 能量随时间变化
-        axes[1, 0].plot(times, ke, 'r-', label='动能', linewidth=2)
-        axes[1, 0].plot(times, pe, 'b-', label='势能', linewidth=2)
-        axes[1, 0].plot(times, te, 'g-', label='总能量', linewidth=2)
-        axes[1, 0].set_title('能量变化')
-        axes[1, 0].set_xlabel('时间 (s)')
-        axes[1, 0].set_ylabel('能量 (J)')
-        axes[1, 0].legend()
-        axes[1, 0].grid(True, alpha=0.3)
-        
-        # 相位图（角度 vs 角速度）
-        # 计算角速度（数值微分）
-        angular_velocities = []
-        for i in range(1, len(angles)):
-            dt = times[i] - times[i-1]
-            dtheta = angles[i] - angles[i-1]
-            angular_velocities.append(dtheta / dt if dt > 0 else 0)
-        
-        if angular_velocities:
-            axes[1, 1].plot(angles[1:], angular_velocities, 'purple', linewidth=1, alpha=0.7)
-            axes[1, 1].set_title('相位图')
-            axes[1, 1].set_xlabel('角度 (rad)')
-            axes[1, 1].set_ylabel('角速度 (rad/s)')
-            axes[1, 1].grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        
-        # 保存图片
-        plot_filename = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-        plt.savefig(plot_filename, dpi=300, bbox_inches='tight')
-        print(f"分析图表已保存为：{plot_filename}")
+    def analyze_batch(self, patterns=None, output_dir=None, processes=None, plot=False, force=False):
+        """并行批量分析记录文件，为每个文件生成报告并打印汇总表（见 batch_analysis.py）
+
+        未变化的文件沿用上次的结果；force 为真时全部重新分析。
+        """
+        from batch_analysis import format_summary, run_batch
+        from config import ExperimentConfig
+
+        rows, counts = run_batch(patterns or ExperimentConfig.BATCH_PATTERN,
+                                 output_dir or ExperimentConfig.BATCH_OUTPUT_DIR,
+                                 processes=processes, plot=plot, force=force)
+        if rows:
+            print(f"\n{format_summary(rows)}")
+        print(f"\n分析 {counts['analyzed']} 个文件，沿用 {counts['skipped']} 个，失败 {counts['failed']} 个")
+        self.data_storage['batch'] = rows
+        return rows
+    
+    def plot_analysis(self, times, angles, velocities, ke, pe, te, filename,
+                      angular_velocities=None, interactive=None, plot_filename=None):
+        """绘制分析图表
+
+        angular_velocities 为记录的角速度列；缺省时才由角度数值微分得到。
+        interactive 缺省取 config.PLOT_INTERACTIVE；为假时用 Agg 画布出图，只保存不显示
+        （没有显示器时也可用）。各曲线按图片像素宽度降采样，见 plotting.py。
+        返回保存的图片文件名。
+        """
+        # 只有绘图时才导入 matplotlib（导入较慢，打印实验说明与统计不需要）
+        from config import ExperimentConfig
+        from plotting import draw_analysis, render_analysis
+
+        if interactive is None:
+            interactive = ExperimentConfig.PLOT_INTERACTIVE
+        if plot_filename is None:
+            plot_filename = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
         
-        plt.show()
+        if interactive:
+            import matplotlib.pyplot as plt
+            fig = plt.figure(figsize=(12, 10))
+            draw_analysis(fig, times, angles, velocities, ke, pe, te, filename,
+                          angular_velocities, ExperimentConfig.PLOT_DPI)
+            fig.savefig(plot_filename, dpi=ExperimentConfig.PLOT_DPI, bbox_inches='tight')
+            print(f"分析图表已保存为：{plot_filename}")
+            plt.show()
+        else:
+            render_analysis(times, angles, velocities, ke, pe, te, filename, plot_filename,
+                            angular_velocities)
+            print(f"分析图表已保存为：{plot_filename}")
+        return plot_filename
     
-    def generate_experiment_report(self, experiment_name, data_analysis):
-        """生成实验报告"""
+    def generate_experiment_report(self, experiment_name, data_analysis, report_filename=None):
+        """生成实验报告（report_filename 缺省按时间戳命名）"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        report_filename = f"experiment_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        if report_filename is None:
+            report_filename = f"experiment_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
         
         with open(report_filename, 'w', encoding='utf-8') as f:
             f.write("=" * 50 + "\n")
@@ -239,24 +294,65 @@ class PhysicsExperiments:
             f.write("=" * 50 + "\n")
             f.write(f"实验名称：{experiment_name}\n")
             f.write(f"实验时间：{timestamp}\n")
-            f.write(f"数据点数：{len(data_analysis['times'])}\n")
+            stats = data_analysis['stats']
+            f.write(f"数据点数：{stats.get('n_points', len(data_analysis.get('times', [])))}\n")
             f.write("\n")
             
             f.write("实验结果分析：\n")
             f.write("-" * 30 + "\n")
-            stats = data_analysis['stats']
             f.write(f"平均总能量：{stats['avg_total_energy']:.6f} J\n")
             f.write(f"能量变化幅度：{stats['energy_variation']:.6f} J\n")
             f.write(f"能量守恒精度：{100-stats['energy_stability']:.3f}%\n")
             f.write("\n")
             
-            f.write("物理量统计：\n")
-            f.write("-" * 30 + "\n")
-            f.write(f"最大动能：{max(data_analysis['energies']['kinetic']):.6f} J\n")
-            f.write(f"最大势能：{max(data_analysis['energies']['potential']):.6f} J\n")
-            f.write(f"最大速度：{max(data_analysis['velocities']):.3f} m/s\n")
-            f.write(f"角度范围：{min(data_analysis['angles']):.3f} - {max(data_analysis['angles']):.3f} rad\n")
-            f.write("\n")
+            # 在线能量统计（energy_stats.EnergyMonitor.report()）：逐步统计，不需要记录数据
+            if data_analysis.get('source') == 'online':
+                f.write("在线能量统计：\n")
+                f.write("-" * 30 + "\n")
+                f.write(f"最大相对漂移：{stats['max_relative_drift'] * 100:.6f}%\n")
+                f.write("每周期最大漂移：" + (f"{stats['period_drift_max'] * 100:.6f}%" if stats['periods']
+                                             else "无完整周期") + "\n")
+                for name, item in data_analysis['balls'].items():
+                    f.write(f"  {name}: 平均总能量={item['avg_total_energy']:.6f} J, "
+                            f"标准差={item['energy_std']:.3e} J, "
+                            f"最终漂移={item['relative_drift'] * 100:.6f}%, "
+                            f"最大漂移={item['max_relative_drift'] * 100:.6f}%, "
+                            f"周期数={item['periods']}, 平均每周期漂移="
+                            + (f"{item['period_drift_mean'] * 100:.3e}%" if item['periods'] else "-")
+                            + "\n")
+                f.write("\n")
+            
+            # 优先使用统计量（流式分析时没有完整数据），在线统计时没有这些物理量
+            if 'max_kinetic_energy' in stats or 'energies' in data_analysis:
+                f.write("物理量统计：\n")
+                f.write("-" * 30 + "\n")
+                if 'max_kinetic_energy' in stats:
+                    max_ke, max_pe = stats['max_kinetic_energy'], stats['max_potential_energy']
+                    max_speed = stats['max_speed']
+                    angle_min, angle_max = stats['angle_min'], stats['angle_max']
+                else:
+                    max_ke = max(data_analysis['energies']['kinetic'])
+                    max_pe = max(data_analysis['energies']['potential'])
+                    max_speed = max(data_analysis['velocities'])
+                    angle_min, angle_max = min(data_analysis['angles']), max(data_analysis['angles'])
+                f.write(f"最大动能：{max_ke:.6f} J\n")
+                f.write(f"最大势能：{max_pe:.6f} J\n")
+                f.write(f"最大速度：{max_speed:.3f} m/s\n")
+                f.write(f"角度范围：{angle_min:.3f} - {angle_max:.3f} rad\n")
+                f.write("\n")
+            
+            # 记录文件的分小球统计（analyze_exported_data(by_ball=True) 或批量分析）
+            if data_analysis.get('source') != 'online' and data_analysis.get('balls'):
+                f.write("分小球统计：\n")
+                f.write("-" * 30 + "\n")
+                for name, item in data_analysis['balls'].items():
+                    line = (f"  {name}: 数据点数={item['n_points']}, 最大速度={item['max_speed']:.3f} m/s, "
+                            f"角度范围={item['angle_min']:.3f} - {item['angle_max']:.3f} rad, "
+                            f"能量稳定性={item['energy_stability']:.3f}%")
+                    if item.get('periods'):
+                        line += f", 周期={item['period']:.4f} s（{item['periods']} 个）"
+                    f.write(line + "\n")
+                f.write("\n")
             
             f.write("结论：\n")
             f.write("-" * 30 + "\n")
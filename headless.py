@@ -0,0 +1,230 @@
+# 无界面命令行运行
+# 不导入 VPython：加载预设场景（config.PRESET_SCENARIOS）或参数文件，推进指定时长，
+# 按导出格式（CSV 或 .pbt 轨迹文件）边算边写出结果，并打印吞吐量统计
+#
+# 用法：
+#   python -m headless --list                              # 列出预设场景
+#   python -m headless energy_conservation -d 60           # 运行预设场景 60 秒
+#   python -m headless --params my_scenario.json -f trajectory -o out.pbt
+#
+# 参数文件为 JSON，格式与 PRESET_SCENARIOS 中的一项相同（至少包含 'balls'），
+# 还可以包含 duration、dt、gravity、radius、integrator、sample_every、rtol、atol，命令行参数优先
+# integrator 为 adaptive 时按容差 rtol / atol 自适应步长积分，数据仍按 dt 的等间隔网格记录
+
+import json
+import os
+import sys
+import time
+
+_START = time.perf_counter()
+
+import numpy as np
+
+from config import ExperimentConfig, PRESET_SCENARIOS
+
+# 可由参数文件或命令行指定的运行参数
+DEFAULT_RUN = {
+    'duration': 20.0,
+    'dt': ExperimentConfig.SIMULATION_DT,
+    'gravity': ExperimentConfig.DEFAULT_GRAVITY,
+    'radius': ExperimentConfig.DEFAULT_RADIUS,
+    'integrator': ExperimentConfig.INTEGRATOR,
+    'sample_every': ExperimentConfig.RECORD_SAMPLE_EVERY,
+    'rtol': ExperimentConfig.ADAPTIVE_RTOL,
+    'atol': ExperimentConfig.ADAPTIVE_ATOL,
+}
+BATCH_STEPS = 2000  # 每批推进的步数；每批结束后把新记录的数据交给写出器，内存占用与时长无关
+
+
+def load_scenario(name=None, params_file=None):
+    """返回场景字典：预设场景名或 JSON 参数文件（二者取其一）"""
+    if params_file:
+        with open(params_file, 'r', encoding='utf-8') as file:
+            scenario = json.load(file)
+        if not scenario.get('balls'):
+            raise ValueError(f"参数文件中没有小球：{params_file}")
+        scenario.setdefault('name', os.path.splitext(os.path.basename(params_file))[0])
+        return scenario
+    if name not in PRESET_SCENARIOS:
+        raise ValueError(f"未知的场景：{name}（可选：{', '.join(PRESET_SCENARIOS)}）")
+    return dict(PRESET_SCENARIOS[name])
+
+
+def run_headless(scenario, output=None, export_format=ExperimentConfig.EXPORT_FORMAT,
+                 progress=print, **overrides):
+    """运行一个场景并把逐步数据写入 output（为 None 时只计算不写出）
+
+    overrides 中不为 None 的项覆盖场景与 DEFAULT_RUN 中的运行参数。
+    返回统计字典：步数、小球数、记录行数、各阶段耗时，以及在线能量统计（'energy'，EnergyMonitor）。
+    自适应积分时 'steps' 为记录网格的步数，另含 'adaptive'：接受步数、拒绝步数与加速度求值次数，
+    以及缺省积分器以固定步长 dt 跑完同样时长的代价（'fixed_step_cost'）。
+    """
+    from recorder import DataRecorder, StreamingCSVWriter
+    from simulation import ADAPTIVE, build_engine
+
+    params = {key: scenario.get(key, default) for key, default in DEFAULT_RUN.items()}
+    params.update({key: value for key, value in overrides.items() if value is not None})
+    setup_start = time.perf_counter()
+    adaptive = params['integrator'] == ADAPTIVE
+    engine = build_engine(scenario['balls'], params['gravity'], params['radius'],
+                          ExperimentConfig.INTEGRATOR if adaptive else params['integrator'])
+    monitor = engine.attach_energy_monitor()
+    dt = params['dt']
+    n_steps = int(round(params['duration'] / dt))
+    names = [ball.get('name', f"小球{i + 1}") for i, ball in enumerate(scenario['balls'])]
+
+    writer = None
+    if output is not None:
+        # 环形缓冲只需容纳一批；抽样计数跨批连续
+        recorder = DataRecorder(names, capacity=(BATCH_STEPS + 1) * engine.count,
+                                ring_buffer=True, sample_every=params['sample_every'])
+        if export_format == 'trajectory':
+            from trajectory_format import TrajectoryWriter
+            writer = TrajectoryWriter(output, names)
+        else:
+            writer = StreamingCSVWriter(output, names)
+        recorder.record_engine(0.0, engine)
+    setup_seconds = time.perf_counter() - setup_start
+
+    if progress:
+        method = (f"自适应步长，rtol = {params['rtol']}，atol = {params['atol']}" if adaptive
+                  else f"积分器 {engine.integrator}")
+        progress(f"场景：{scenario.get('name', '')}，{engine.count} 个小球，"
+                 f"{n_steps} 步（dt = {dt}，{method}）")
+    physics_seconds = write_seconds = 0.0
+    rows = 0
+    adaptive_stats = {'n_steps': 0, 'n_rejected': 0, 'n_evals': 0}
+    for start in range(0, n_steps, BATCH_STEPS):
+        steps = min(BATCH_STEPS, n_steps - start)
+        tick = time.perf_counter()
+        if adaptive:
+            # 稠密输出在 dt 网格上采样；去掉第 0 个采样点（本批起点），与 step_many 的 history 对齐
+            result = engine.run_adaptive(steps * dt, dt, rtol=params['rtol'], atol=params['atol'])
+            for key in adaptive_stats:
+                adaptive_stats[key] += result[key]
+            history = {key: value[1:] for key, value in result.items()
+                       if isinstance(value, np.ndarray) and value.ndim == 2}
+            history['rows'] = result['rows']
+        else:
+            history = engine.step_many(steps, dt, history=writer is not None)
+        physics_seconds += time.perf_counter() - tick
+        if writer is None:
+            continue
+        tick = time.perf_counter()
+        recorder.record_history(np.arange(start + 1, start + steps + 1) * dt, history)
+        batch = recorder.take_new()
+        rows += len(batch['ball_id'])
+        if export_format == 'trajectory':
+            writer.write(batch)
+        else:
+            writer.submit(batch)
+        write_seconds += time.perf_counter() - tick
+
+    if writer is not None:
+        tick = time.perf_counter()
+        writer.close()
+        write_seconds += time.perf_counter() - tick
+    return {
+        'scenario': scenario.get('name', ''),
+        'balls': engine.count,
+        'steps': n_steps,
+        'rows': rows,
+        'setup_seconds': setup_seconds,
+        'physics_seconds': physics_seconds,
+        'write_seconds': write_seconds,
+        'ball_steps_per_second': n_steps * engine.count / physics_seconds
+                                 if physics_seconds > 0 else float('inf'),
+        'output': output,
+        'error': getattr(writer, 'error', None),  # 流式写出失败时的异常
+        'energy': monitor,
+        'ball_names': names,
+        'adaptive': dict(adaptive_stats, fixed_step_cost=engine.fixed_step_cost(n_steps * dt, dt))
+                    if adaptive else None,
+    }
+
+
+def main(argv=None):
+    import argparse
+
+    from integrators import INTEGRATORS
+    from simulation import ADAPTIVE
+
+    parser = argparse.ArgumentParser(prog="python -m headless",
+                                     description="无界面运行预设场景或参数文件（不需要 VPython）")
+    parser.add_argument('scenario', nargs='?', help="预设场景名（见 --list）")
+    parser.add_argument('--params', help="JSON 参数文件（代替预设场景）")
+    parser.add_argument('--list', action='store_true', help="列出预设场景后退出")
+    parser.add_argument('-d', '--duration', type=float, help="仿真时长 (s)")
+    parser.add_argument('--dt', type=float, help="时间步长 (s)")
+    parser.add_argument('--gravity', type=float, help="重力加速度 (m/s²)")
+    parser.add_argument('--integrator', help=f"积分器（{' / '.join(INTEGRATORS)} / {ADAPTIVE}）")
+    parser.add_argument('--rtol', type=float, help="自适应积分的相对容差")
+    parser.add_argument('--atol', type=float, help="自适应积分的绝对容差")
+    parser.add_argument('--sample-every', type=int, help="每隔多少步记录一次")
+    parser.add_argument('-f', '--format', choices=('csv', 'trajectory'),
+                        default=ExperimentConfig.EXPORT_FORMAT, help="导出格式")
+    parser.add_argument('-o', '--output', help="输出文件（缺省按时间戳命名）")
+    parser.add_argument('--no-output', action='store_true', help="只计算，不写出数据")
+    parser.add_argument('--report', action='store_true', help="用在线能量统计生成实验报告")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, scenario in PRESET_SCENARIOS.items():
+            print(f"{name:<22}{scenario['name']}（{len(scenario['balls'])} 个小球）- {scenario['description']}")
+        return 0
+    if bool(args.scenario) == bool(args.params):
+        parser.error("需要指定一个预设场景名或 --params 参数文件（二者取其一）")
+    if args.integrator is not None and args.integrator not in INTEGRATORS and args.integrator != ADAPTIVE:
+        parser.error(f"未知的积分器：{args.integrator}")
+    try:
+        scenario = load_scenario(args.scenario, args.params)
+    except (OSError, ValueError) as e:
+        print(f"错误：{e}")
+        return 2
+
+    output = None
+    if not args.no_output:
+        output = args.output
+        if output is None:
+            extension = 'pbt' if args.format == 'trajectory' else 'csv'
+            output = f"physics_data_{time.strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+    try:
+        stats = run_headless(scenario, output, args.format, duration=args.duration, dt=args.dt,
+                             gravity=args.gravity, integrator=args.integrator,
+                             sample_every=args.sample_every, rtol=args.rtol, atol=args.atol)
+    except (ValueError, RuntimeError) as e:  # 例如自适应积分的容差无效或达不到
+        print(f"错误：{e}")
+        return 2
+    print(f"物理计算：{stats['physics_seconds']:.3f} s，"
+          f"{stats['ball_steps_per_second']:,.0f} 小球·步/秒")
+    if stats['adaptive'] is not None:
+        cost = stats['adaptive']
+        fixed = cost['fixed_step_cost']
+        print(f"自适应步长：接受 {cost['n_steps']} 步，拒绝 {cost['n_rejected']} 步，"
+              f"{cost['n_evals']} 次求值（{ExperimentConfig.INTEGRATOR} 固定步长：{fixed['n_steps']} 步，"
+              f"{fixed['n_evals']} 次求值）")
+    energy = stats['energy'].summary()
+    if energy['n_points']:
+        print(f"能量守恒：最大相对漂移 {energy['max_relative_drift']:.3e}，"
+              + (f"每周期最大漂移 {energy['period_drift_max']:.3e}" if energy['periods']
+                 else "无完整周期"))
+    if args.report:
+        from experiments import PhysicsExperiments
+        PhysicsExperiments().generate_experiment_report(
+            scenario.get('name', '无界面运行'), stats['energy'].report(stats['ball_names']))
+    if stats['error'] is not None:
+        print(f"错误：写出 {output} 失败 - {stats['error']}")
+        return 1
+    if output is not None:
+        size = os.path.getsize(output)
+        print(f"写出：{stats['rows']} 行，{size / 1024 / 1024:.2f} MB，{stats['write_seconds']:.3f} s"
+              f"（{stats['rows'] / max(stats['write_seconds'], 1e-9):,.0f} 行/秒）")
+        print(f"数据已导出到 {output}")
+    print(f"准备：{stats['setup_seconds'] * 1000:.1f} ms，"
+          f"启动至今：{time.perf_counter() - _START:.3f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
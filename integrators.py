@@ -0,0 +1,83 @@
+# 数值积分器
+# 所有积分器都作用于 NumPy 数组（也可作用于标量），签名统一为
+#     step(theta, omega, g, radius, dt) -> (theta, omega)
+# 运动方程：d²θ/dt² = g·sin(θ)/r （θ 从最高点起算）
+
+import numpy as np
+
+
+def angular_acceleration(theta, g, radius):
+    """重力切向分量产生的角加速度"""
+    return g * np.sin(theta) / radius
+
+
+def semi_implicit_euler(theta, omega, g, radius, dt):
+    """半隐式欧拉法（一阶，辛）——原版程序使用的方法"""
+    omega = omega + angular_acceleration(theta, g, radius) * dt
+    theta = theta + omega * dt
+    return theta, omega
+
+
+def velocity_verlet(theta, omega, g, radius, dt):
+    """速度 Verlet / 蛙跳法（二阶，辛，每步两次加速度求值）"""
+    omega_half = omega + 0.5 * dt * angular_acceleration(theta, g, radius)
+    theta = theta + omega_half * dt
+    omega = omega_half + 0.5 * dt * angular_acceleration(theta, g, radius)
+    return theta, omega
+
+
+# Yoshida 四阶系数：由三个蛙跳步组合而成
+_CBRT2 = 2.0 ** (1.0 / 3.0)
+_W1 = 1.0 / (2.0 - _CBRT2)
+_W0 = -_CBRT2 / (2.0 - _CBRT2)
+_YOSHIDA_C = (_W1 / 2, (_W0 + _W1) / 2, (_W0 + _W1) / 2, _W1 / 2)
+_YOSHIDA_D = (_W1, _W0, _W1)
+
+
+def yoshida4(theta, omega, g, radius, dt):
+    """Yoshida 四阶辛积分器（每步三次加速度求值）"""
+    for c, d in zip(_YOSHIDA_C, _YOSHIDA_D):
+        theta = theta + c * omega * dt
+        omega = omega + d * angular_acceleration(theta, g, radius) * dt
+    theta = theta + _YOSHIDA_C[3] * omega * dt
+    return theta, omega
+
+
+def rk4(theta, omega, g, radius, dt):
+    """经典四阶龙格-库塔法（非辛，长时间运行能量会缓慢漂移）"""
+    k1_theta = omega
+    k1_omega = angular_acceleration(theta, g, radius)
+    k2_theta = omega + 0.5 * dt * k1_omega
+    k2_omega = angular_acceleration(theta + 0.5 * dt * k1_theta, g, radius)
+    k3_theta = omega + 0.5 * dt * k2_omega
+    k3_omega = angular_acceleration(theta + 0.5 * dt * k2_theta, g, radius)
+    k4_theta = omega + dt * k3_omega
+    k4_omega = angular_acceleration(theta + dt * k3_theta, g, radius)
+    theta = theta + dt / 6 * (k1_theta + 2 * k2_theta + 2 * k3_theta + k4_theta)
+    omega = omega + dt / 6 * (k1_omega + 2 * k2_omega + 2 * k3_omega + k4_omega)
+    return theta, omega
+
+
+# 可选积分器：名称 -> (显示名称, 函数, 阶数)
+INTEGRATORS = {
+    'semi_implicit_euler': ('半隐式欧拉 (1阶)', semi_implicit_euler, 1),
+    'velocity_verlet': ('速度Verlet (2阶)', velocity_verlet, 2),
+    'yoshida4': ('Yoshida (4阶辛)', yoshida4, 4),
+    'rk4': ('龙格-库塔 RK4 (4阶)', rk4, 4),
+}
+
+# 每步的加速度求值次数，用于与自适应步长积分比较计算量
+EVALUATIONS_PER_STEP = {
+    'semi_implicit_euler': 1,
+    'velocity_verlet': 2,
+    'yoshida4': 3,
+    'rk4': 4,
+}
+
+
+def get_integrator(name):
+    """按名称取得积分函数"""
+    try:
+        return INTEGRATORS[name][1]
+    except KeyError:
+        raise ValueError(f"未知的积分器：{name}，可选：{', '.join(INTEGRATORS)}")
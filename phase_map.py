@@ -0,0 +1,221 @@
+# 相空间运动类型图
+# 在 (θ0, ω0) 网格上（可再叠加若干重力加速度与半径）批量分类初始条件：摆动 / 圆周运动 / 临界 / 静止，
+# 并给出每个点的振幅与精确周期。用 Jacobi 椭圆函数精确解（analytic.py）按块向量化计算，
+# 百万级网格只需一次批量计算；结果按参数缓存为 .npz，可渲染为热力图（只在渲染时导入 matplotlib）
+#
+# 适用于无空气阻力、无摩擦的模型（与 analytic.is_frictionless 相同的前提）
+#
+# 用法：
+#   python -m phase_map -o phase_map.png                  # 1000 × 1000 网格的运动类型图
+#   python -m phase_map --quantity period --gravity 9.8 24.8 -o period.png
+
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from analytic import EQUILIBRIUM, LIBRATION, REGIME_NAMES, ROTATION, SEPARATRIX, AnalyticPendulum
+from config import ExperimentConfig
+
+QUANTITIES = ('regime', 'amplitude', 'period')
+_CACHE_VERSION = 1  # 计算方法或结果格式变化时递增，使旧缓存失效
+
+# 运动类型的显示颜色（RGB）
+REGIME_COLORS = {
+    LIBRATION: (0.35, 0.55, 0.85),
+    ROTATION: (0.90, 0.45, 0.25),
+    SEPARATRIX: (0.0, 0.0, 0.0),
+    EQUILIBRIUM: (0.5, 0.5, 0.5),
+}
+
+
+def critical_omega(theta0, g=ExperimentConfig.DEFAULT_GRAVITY, radius=ExperimentConfig.DEFAULT_RADIUS):
+    """在 θ0 处释放时恰好能转过最高点的角速度大小（分界线）
+
+    由能量守恒：½ω² + (g/r)(1 + cos θ0) = 2g/r，即 ω_c = √(2(g/r)(1 - cos θ0))。
+    """
+    return np.sqrt(2 * np.asarray(g) / np.asarray(radius) * (1 - np.cos(theta0)))
+
+
+def _axis(values):
+    return np.atleast_1d(np.asarray(values, dtype=float))
+
+
+def _cache_key(params):
+    text = json.dumps(dict(params, version=_CACHE_VERSION), sort_keys=True)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def compute_phase_map(theta_range=(-np.pi, np.pi), omega_range=ExperimentConfig.OMEGA_RANGE,
+                      n_theta=1000, n_omega=1000, gravity=ExperimentConfig.DEFAULT_GRAVITY,
+                      radius=ExperimentConfig.DEFAULT_RADIUS, chunk=ExperimentConfig.PHASE_MAP_CHUNK):
+    """计算运动类型图（不使用缓存）
+
+    gravity、radius 可以是标量或数值序列。返回字典：
+      'theta'、'omega'、'gravity'、'radius'：各轴坐标；
+      'regime'（int8）、'amplitude'、'period'：形状为 (重力数, 半径数, n_omega, n_theta) 的数组；
+      'elapsed'：计算耗时（秒）。
+    """
+    theta = np.linspace(theta_range[0], theta_range[1], n_theta)
+    omega = np.linspace(omega_range[0], omega_range[1], n_omega)
+    gravity, radius = _axis(gravity), _axis(radius)
+    shape = (len(gravity), len(radius), n_omega, n_theta)
+    regime = np.empty(shape, dtype=np.int8)
+    amplitude = np.empty(shape)
+    period = np.empty(shape)
+
+    start = time.perf_counter()
+    flat_regime, flat_amplitude, flat_period = regime.reshape(-1), amplitude.reshape(-1), period.reshape(-1)
+    total = flat_regime.size
+    # 按块计算：AnalyticPendulum 的中间数组只占用 chunk 个点的内存
+    for begin in range(0, total, chunk):
+        index = np.unravel_index(np.arange(begin, min(begin + chunk, total)), shape)
+        exact = AnalyticPendulum(theta[index[3]], omega[index[2]], gravity[index[0]], radius[index[1]])
+        end = begin + len(index[0])
+        flat_regime[begin:end] = exact.regime
+        flat_amplitude[begin:end] = exact.amplitude
+        flat_period[begin:end] = exact.period
+    return {
+        'theta': theta, 'omega': omega, 'gravity': gravity, 'radius': radius,
+        'regime': regime, 'amplitude': amplitude, 'period': period,
+        'elapsed': time.perf_counter() - start,
+    }
+
+
+def phase_map(theta_range=(-np.pi, np.pi), omega_range=ExperimentConfig.OMEGA_RANGE,
+              n_theta=1000, n_omega=1000, gravity=ExperimentConfig.DEFAULT_GRAVITY,
+              radius=ExperimentConfig.DEFAULT_RADIUS, cache_dir=ExperimentConfig.PHASE_MAP_CACHE_DIR):
+    """带缓存的 compute_phase_map：参数相同时直接读取缓存（cache_dir 为 None 时不缓存）
+
+    返回字典额外包含 'cached'（是否来自缓存）。
+    """
+    params = {
+        'theta_range': [float(v) for v in theta_range],
+        'omega_range': [float(v) for v in omega_range],
+        'n_theta': int(n_theta), 'n_omega': int(n_omega),
+        'gravity': _axis(gravity).tolist(), 'radius': _axis(radius).tolist(),
+    }
+    filename = None
+    if cache_dir:
+        filename = os.path.join(cache_dir, f"phase_map_{_cache_key(params)}.npz")
+        if os.path.exists(filename):
+            with np.load(filename) as data:
+                result = {name: data[name] for name in data.files}
+            result['elapsed'] = float(result['elapsed'])
+            result['cached'] = True
+            return result
+
+    result = compute_phase_map(theta_range, omega_range, n_theta, n_omega, gravity, radius)
+    if filename:
+        os.makedirs(cache_dir, exist_ok=True)
+        temporary = filename + '.tmp.npz'
+        np.savez_compressed(temporary, **result)
+        os.replace(temporary, filename)  # 原子替换，避免并发运行读到写了一半的文件
+    result['cached'] = False
+    return result
+
+
+def regime_fractions(result, g_index=0, radius_index=0):
+    """某一切片中各运动类型所占比例 {类型名: 比例}"""
+    regime = result['regime'][g_index, radius_index]
+    return {REGIME_NAMES[kind]: float(np.mean(regime == kind)) for kind in REGIME_NAMES}
+
+
+def render_heatmap(result, filename, quantity='regime', g_index=0, radius_index=0, dpi=150):
+    """把某一 (重力, 半径) 切片渲染为热力图图片，叠加解析分界线 ±ω_c(θ0)
+
+    quantity：'regime'（运动类型）、'amplitude'（振幅，度）或 'period'（周期，对数色标）。
+    """
+    if quantity not in QUANTITIES:
+        raise ValueError(f"未知的物理量：{quantity}（可选：{' / '.join(QUANTITIES)}）")
+    # 直接使用 Agg 画布，不经过 pyplot，不依赖也不改变全局后端
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.colors import ListedColormap, LogNorm
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Patch
+
+    theta, omega = result['theta'], result['omega']
+    g, r = float(result['gravity'][g_index]), float(result['radius'][radius_index])
+    data = result[quantity][g_index, radius_index]
+    extent = (theta[0], theta[-1], omega[0], omega[-1])
+
+    fig = Figure(figsize=(9, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    if quantity == 'regime':
+        kinds = sorted(REGIME_COLORS)
+        cmap = ListedColormap([REGIME_COLORS[kind] for kind in kinds])
+        ax.imshow(data, origin='lower', extent=extent, aspect='auto', cmap=cmap,
+                  vmin=-0.5, vmax=len(kinds) - 0.5, interpolation='nearest')
+        ax.legend(handles=[Patch(color=REGIME_COLORS[kind], label=REGIME_NAMES[kind]) for kind in kinds],
+                  loc='upper right', fontsize=8)
+    elif quantity == 'amplitude':
+        image = ax.imshow(np.degrees(data), origin='lower', extent=extent, aspect='auto',
+                          cmap='viridis', interpolation='nearest')
+        fig.colorbar(image, ax=ax, label='振幅 (°)')
+    else:
+        finite = data[np.isfinite(data) & (data > 0)]
+        norm = LogNorm(vmin=finite.min(), vmax=finite.max()) if len(finite) else None
+        image = ax.imshow(np.where(np.isfinite(data), data, np.nan), origin='lower', extent=extent,
+                          aspect='auto', cmap='magma', norm=norm, interpolation='nearest')
+        fig.colorbar(image, ax=ax, label='周期 (s)')
+
+    boundary = critical_omega(theta, g, r)
+    ax.plot(theta, boundary, color='white', linewidth=1, linestyle='--')
+    ax.plot(theta, -boundary, color='white', linewidth=1, linestyle='--')
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    ax.set_xlabel('初始角度 θ0 (rad，0 为最高点)')
+    ax.set_ylabel('初始角速度 ω0 (rad/s)')
+    ax.set_title(f'相空间运动类型图 - g = {g:g} m/s², r = {r:g} m（虚线为临界角速度）')
+    fig.savefig(filename, dpi=dpi, bbox_inches='tight')
+    return filename
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m phase_map",
+                                     description="相空间运动类型图（摆动 / 圆周运动），结果自动缓存")
+    parser.add_argument('--n-theta', type=int, default=1000, help="θ0 方向的网格点数")
+    parser.add_argument('--n-omega', type=int, default=1000, help="ω0 方向的网格点数")
+    parser.add_argument('--omega-max', type=float, default=ExperimentConfig.OMEGA_RANGE[1],
+                        help="ω0 范围 [-ω_max, ω_max] (rad/s)")
+    parser.add_argument('--gravity', type=float, nargs='+', default=[ExperimentConfig.DEFAULT_GRAVITY],
+                        help="重力加速度（可给多个值）")
+    parser.add_argument('--radius', type=float, nargs='+', default=[ExperimentConfig.DEFAULT_RADIUS],
+                        help="圆周半径（可给多个值）")
+    parser.add_argument('--quantity', choices=QUANTITIES, default='regime', help="热力图显示的物理量")
+    parser.add_argument('-o', '--output', help="热力图图片文件（多个重力 / 半径时每个切片一张）")
+    parser.add_argument('--no-cache', action='store_true', help="不读写缓存")
+    args = parser.parse_args(argv)
+
+    result = phase_map(omega_range=(-args.omega_max, args.omega_max), n_theta=args.n_theta,
+                       n_omega=args.n_omega, gravity=args.gravity, radius=args.radius,
+                       cache_dir=None if args.no_cache else ExperimentConfig.PHASE_MAP_CACHE_DIR)
+    points = result['regime'].size
+    if result['cached']:
+        print(f"{points} 个初始条件，读取缓存（原计算耗时 {result['elapsed']:.3f} s）")
+    else:
+        print(f"{points} 个初始条件，计算耗时 {result['elapsed']:.3f} s"
+              f"（{points / result['elapsed']:,.0f} 点/秒）")
+    for i, g in enumerate(result['gravity']):
+        for j, r in enumerate(result['radius']):
+            fractions = regime_fractions(result, i, j)
+            print(f"g = {g:g}, r = {r:g}: " + "，".join(
+                f"{name} {fraction:.1%}" for name, fraction in fractions.items() if fraction))
+            if args.output:
+                filename = args.output
+                if result['regime'].shape[0] * result['regime'].shape[1] > 1:
+                    stem, extension = os.path.splitext(args.output)
+                    filename = f"{stem}_g{g:g}_r{r:g}{extension}"
+                render_heatmap(result, filename, args.quantity, i, j)
+                print(f"热力图已保存到 {filename}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+# 批量物理引擎（无界面）
+# 以结构数组（struct-of-arrays）形式保存所有小球的状态，一次批量推进全部小球
+
+import numpy as np
+
+from adaptive_solver import solve_adaptive
+from analytic import AnalyticPendulum
+from config import ExperimentConfig
+from energy_stats import BLOCK_STEPS as ENERGY_BLOCK_STEPS, EnergyMonitor
+from events import EventDetector
+from integrators import EVALUATIONS_PER_STEP, get_integrator
+
+
+def derived_quantities(theta, omega, mass, radius, g):
+    """由状态计算速度、能量与向心加速度（数组可广播，例如 (步数, 小球数) 的历史）"""
+    speed = np.abs(omega * radius)
+    kinetic_energy = 0.5 * mass * speed**2
+    height = radius * np.cos(theta) + radius  # 相对于最低点的高度
+    potential_energy = mass * g * height
+    return {
+        'speed': speed,
+        'kinetic_energy': kinetic_energy,
+        'potential_energy': potential_energy,
+        'total_energy': kinetic_energy + potential_energy,
+        'centripetal_acc': omega**2 * radius,
+    }
+
+
+class PendulumEngine:
+    """批量圆周运动物理引擎
+
+    每个小球占据各数组中的一行：theta、omega、mass、radius、g 等均为 NumPy 数组，
+    step() 一次完成全部（激活的）小球的积分，不依赖 VPython。
+    积分方法由 integrator 指定（见 integrators.INTEGRATORS）。
+    """
+
+    # 状态数组（可写）
+    STATE_FIELDS = ('theta', 'omega', 'mass', 'radius', 'g', 'active')
+    # 派生物理量数组（由 update_derived 计算）
+    DERIVED_FIELDS = ('speed', 'kinetic_energy', 'potential_energy',
+                      'total_energy', 'centripetal_acc')
+
+    def __init__(self, integrator='semi_implicit_euler'):
+        self.integrator = integrator
+        self.theta = np.zeros(0)
+        self.omega = np.zeros(0)
+        self.mass = np.zeros(0)
+        self.radius = np.zeros(0)
+        self.g = np.zeros(0)
+        self.active = np.zeros(0, dtype=bool)  # 参与积分的小球（例如可见的小球）
+        self.time = 0.0     # step() 累计推进的时间
+        self.events = None  # 可选的 EventDetector（见 attach_events）
+        self.energy_monitor = None  # 可选的 EnergyMonitor（见 attach_energy_monitor）
+
+        for name in self.DERIVED_FIELDS:
+            setattr(self, name, np.zeros(0))
+
+    @property
+    def integrator(self):
+        return self._integrator_name
+
+    @integrator.setter
+    def integrator(self, name):
+        self._step_fn = get_integrator(name)
+        self._integrator_name = name
+
+    @property
+    def count(self):
+        return len(self.theta)
+
+    def add_ball(self, mass=0.1, radius=2.0, theta=0.5, omega=0.0, g=9.8):
+        """添加一个小球，返回其行号"""
+        return int(self.add_balls(mass=[mass], radius=[radius], theta=[theta],
+                                  omega=[omega], g=[g])[0])
+
+    def add_balls(self, mass, radius, theta, omega, g=9.8):
+        """批量添加小球（参数可为标量或等长数组），返回新小球的行号数组"""
+        theta = np.atleast_1d(np.asarray(theta, dtype=float))
+        n = len(theta)
+        new_rows = {
+            'theta': theta,
+            'omega': np.broadcast_to(np.asarray(omega, dtype=float), n),
+            'mass': np.broadcast_to(np.asarray(mass, dtype=float), n),
+            'radius': np.broadcast_to(np.asarray(radius, dtype=float), n),
+            'g': np.broadcast_to(np.asarray(g, dtype=float), n),
+            'active': np.ones(n, dtype=bool),
+        }
+        start = self.count
+        for name, values in new_rows.items():
+            setattr(self, name, np.concatenate([getattr(self, name), values]))
+        for name in self.DERIVED_FIELDS:
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(n)]))
+        rows = np.arange(start, start + n)
+        self.update_derived(rows)
+        return rows
+
+    def step(self, dt, active=None):
+        """用当前积分器推进一步
+
+        active 为布尔掩码或行号数组；缺省时使用 self.active。
+        默认的半隐式欧拉法与原 PhysicsBall.update 的计算顺序完全一致。
+        """
+        rows = self.active if active is None else active
+        theta0, omega0 = self.theta[rows], self.omega[rows]
+        theta, omega = self._step_fn(theta0, omega0, self.g[rows], self.radius[rows], dt)
+        self.omega[rows] = omega
+        self.theta[rows] = theta
+        if self.events is not None:
+            self.events.observe(self.time, dt, rows, theta0, omega0, theta, omega,
+                                self.g[rows], self.radius[rows])
+        if self.energy_monitor is not None:
+            self.energy_monitor.observe(rows, theta0, omega0, theta, omega, self.mass[rows],
+                                        self.g[rows], self.radius[rows])
+        self.time += dt
+        self.update_derived(rows)
+
+    def step_many(self, n_steps, dt, active=None, history=False):
+        """连续推进 n_steps 步，结果与调用 n_steps 次 step() 完全相同
+
+        状态在局部数组中推进，结束时才写回并计算派生量，省去每步的索引与写回开销。
+        history 为真时返回每一步结束时的 theta、omega 与各派生量（形状 (n_steps, 行数)），
+        以及对应的行号 'rows'；否则返回 None。
+        """
+        rows = np.asarray(self.active if active is None else active)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        theta, omega = self.theta[rows], self.omega[rows]
+        g, radius = self.g[rows], self.radius[rows]
+        if history:
+            theta_history = np.empty((n_steps, len(rows)))
+            omega_history = np.empty((n_steps, len(rows)))
+        step_fn, events, monitor = self._step_fn, self.events, self.energy_monitor
+        if monitor is not None:
+            # 能量统计按块提交：有 history 时整段一次提交，否则攒满 BLOCK_STEPS 步提交一次
+            mass = self.mass[rows]
+            block_theta0, block_omega0, filled = theta, omega, 0
+            if not history:
+                block = min(n_steps, ENERGY_BLOCK_STEPS)
+                theta_block, omega_block = np.empty((block, len(rows))), np.empty((block, len(rows)))
+        for i in range(n_steps):
+            new_theta, new_omega = step_fn(theta, omega, g, radius, dt)
+            if events is not None:
+                events.observe(self.time, dt, rows, theta, omega, new_theta, new_omega, g, radius)
+            self.time += dt
+            theta, omega = new_theta, new_omega
+            if history:
+                theta_history[i] = theta
+                omega_history[i] = omega
+            elif monitor is not None:
+                theta_block[filled] = theta
+                omega_block[filled] = omega
+                filled += 1
+                if filled == block:
+                    monitor.observe_steps(rows, block_theta0, block_omega0, theta_block, omega_block,
+                                          mass, g, radius)
+                    block_theta0, block_omega0, filled = theta, omega, 0
+        if monitor is not None:
+            if history:
+                monitor.observe_steps(rows, block_theta0, block_omega0, theta_history, omega_history,
+                                      mass, g, radius)
+            elif filled:
+                monitor.observe_steps(rows, block_theta0, block_omega0, theta_block[:filled],
+                                      omega_block[:filled], mass, g, radius)
+        self.theta[rows] = theta
+        self.omega[rows] = omega
+        self.update_derived(rows)
+        if not history:
+            return None
+        result = derived_quantities(theta_history, omega_history, self.mass[rows], radius, g)
+        result.update(theta=theta_history, omega=omega_history, rows=rows)
+        return result
+
+    def attach_events(self, detector=None):
+        """挂上事件检测器（缺省新建一个），之后每次 step() 都会检测转折点、经过最低点等事件"""
+        self.events = detector if detector is not None else EventDetector()
+        return self.events
+
+    def attach_energy_monitor(self, monitor=None):
+        """挂上在线能量统计（缺省新建一个），之后每步都会更新各小球的能量统计量"""
+        self.energy_monitor = monitor if monitor is not None else EnergyMonitor()
+        return self.energy_monitor
+
+    def run_adaptive(self, duration, sample_dt, rtol=ExperimentConfig.ADAPTIVE_RTOL,
+                     atol=ExperimentConfig.ADAPTIVE_ATOL, active=None):
+        """自适应步长推进 duration 秒（无界面离线计算用）
+
+        结果在 sample_dt 的等间隔网格上采样，引擎状态更新为终点状态。
+        挂上的事件检测器与能量统计按相邻采样点之间的区间更新（duration 宜为 sample_dt 的整数倍）。
+        返回值见 adaptive_solver.solve_adaptive，另含各采样点的派生量（与 step_many 的 history 相同的键）
+        以及 'rows' 表示对应的行号。
+        """
+        rows = np.asarray(self.active if active is None else active)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        g, radius, mass = self.g[rows], self.radius[rows], self.mass[rows]
+        result = solve_adaptive(self.theta[rows], self.omega[rows], g, radius, duration, sample_dt,
+                                rtol=rtol, atol=atol)
+        theta, omega = result['theta'], result['omega']
+        if self.events is not None:
+            for i in range(1, len(theta)):
+                self.events.observe(self.time + result['times'][i - 1], sample_dt, rows, theta[i - 1],
+                                    omega[i - 1], theta[i], omega[i], g, radius)
+        if self.energy_monitor is not None and len(theta) > 1:
+            self.energy_monitor.observe_steps(rows, theta[0], omega[0], theta[1:], omega[1:],
+                                              mass, g, radius)
+        self.time += duration
+        self.theta[rows] = result['final_theta']
+        self.omega[rows] = result['final_omega']
+        self.update_derived(rows)
+        result.update(derived_quantities(theta, omega, mass, radius, g))
+        result['rows'] = rows
+        return result
+
+    def advance_analytic(self, duration, active=None):
+        """按精确解直接推进 duration 秒（只适用于无阻尼运动），耗时与 duration 无关
+
+        返回所用的 analytic.AnalyticPendulum，可继续对 [0, duration] 内任意时刻求值。
+        """
+        rows = np.asarray(self.active if active is None else active)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        exact = AnalyticPendulum(self.theta[rows], self.omega[rows], self.g[rows], self.radius[rows])
+        self.theta[rows], self.omega[rows] = exact.state(duration)
+        self.update_derived(rows)
+        return exact
+
+    def fixed_step_cost(self, duration, dt):
+        """当前积分器以固定步长 dt 运行 duration 秒的步数与加速度求值次数"""
+        n_steps = int(round(duration / dt))
+        return {'n_steps': n_steps,
+                'n_evals': n_steps * EVALUATIONS_PER_STEP[self.integrator]}
+
+    def update_derived(self, rows=None):
+        """计算速度、能量与向心加速度等派生物理量"""
+        if rows is None:
+            rows = slice(None)
+        derived = derived_quantities(self.theta[rows], self.omega[rows], self.mass[rows],
+                                     self.radius[rows], self.g[rows])
+        for name, values in derived.items():
+            getattr(self, name)[rows] = values
+
+    def positions(self, rows=None):
+        """返回 (x, y) 坐标数组"""
+        if rows is None:
+            rows = slice(None)
+        radius = self.radius[rows]
+        theta = self.theta[rows]
+        return radius * np.sin(theta), radius * np.cos(theta)
+
+
+def engine_field(name):
+    """生成把属性映射到引擎数组中某一行的 property，用于小球视图类
+
+    视图类需要提供 self.engine 与 self.index 两个属性。
+    """
+    def getter(self):
+        value = getattr(self.engine, name)[self.index]
+        return bool(value) if name == 'active' else float(value)
+
+    def setter(self, value):
+        getattr(self.engine, name)[self.index] = value
+
+    return property(getter, setter)
@@ -0,0 +1,219 @@
+# 独立进程中的物理计算
+# 物理引擎在单独的进程中按仿真时钟推进，把最新状态写入共享内存（带序号的顺序锁），
+# 界面进程每帧只读取最新快照；控制操作（改参数、开始/暂停、重置）通过命令队列发送
+#
+# 共享内存布局（小端）：
+#   int64 序号（写入期间为奇数） | int64 已执行步数 | float64 仿真时间 | float64 [字段数, 小球数]
+
+import atexit
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from config import ExperimentConfig
+from physics_engine import PendulumEngine
+from sim_clock import SimulationClock
+
+# 快照中的字段（每个小球一份）
+SNAPSHOT_FIELDS = ('theta', 'omega') + PendulumEngine.DERIVED_FIELDS
+_HEADER_BYTES = 24
+_IDLE_SLEEP = 0.0005  # 没有可执行的步时休眠的时间（秒）
+
+
+def _views(buffer, n_balls):
+    """把共享内存切分为 (头部整数, 仿真时间, 字段数组) 三个视图"""
+    header = np.ndarray((2,), dtype=np.int64, buffer=buffer, offset=0)
+    sim_time = np.ndarray((1,), dtype=np.float64, buffer=buffer, offset=16)
+    fields = np.ndarray((len(SNAPSHOT_FIELDS), n_balls), dtype=np.float64,
+                        buffer=buffer, offset=_HEADER_BYTES)
+    return header, sim_time, fields
+
+
+def _publish(views, engine, clock):
+    """写入一份快照：写入前后各把序号加一，读方据此判断快照是否完整"""
+    header, sim_time, fields = views
+    header[0] += 1
+    for i, name in enumerate(SNAPSHOT_FIELDS):
+        fields[i] = getattr(engine, name)
+    header[1] = clock.steps
+    sim_time[0] = clock.time
+    header[0] += 1
+
+
+def _apply(command, engine, clock):
+    """执行一条命令，返回是否需要停止"""
+    kind = command[0]
+    if kind == 'row':
+        _, row, values = command
+        for name, value in values.items():
+            getattr(engine, name)[row] = value
+        engine.update_derived([row])
+    elif kind == 'start':
+        clock.start()
+    elif kind == 'pause':
+        clock.pause()
+    elif kind == 'reset_clock':
+        clock.reset()
+        engine.time = 0.0
+    elif kind == 'integrator':
+        engine.integrator = command[1]
+    elif kind == 'speed':
+        clock.real_time_factor = command[1]
+    elif kind == 'stop':
+        return True
+    return False
+
+
+def _worker_main(shm_name, state, dt, integrator, real_time_factor, commands):
+    """工作进程入口：按仿真时钟推进引擎，每批步数执行完后发布快照"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    views = None
+    try:
+        engine = PendulumEngine(integrator)
+        engine.add_balls(mass=state['mass'], radius=state['radius'], theta=state['theta'],
+                         omega=state['omega'], g=state['g'])
+        engine.active[:] = state['active']
+        clock = SimulationClock(dt, real_time_factor)
+        views = _views(shm.buf, engine.count)
+        _publish(views, engine, clock)
+
+        while True:
+            # 暂停时阻塞等待命令，运行时只取出已到达的命令
+            try:
+                command = commands.get(timeout=0.05) if not clock.running else commands.get_nowait()
+            except queue.Empty:
+                command = None
+            stop, changed = False, command is not None
+            while command is not None:
+                stop = _apply(command, engine, clock) or stop
+                try:
+                    command = commands.get_nowait()
+                except queue.Empty:
+                    command = None
+            if stop:
+                break
+            if not clock.running:
+                if changed:
+                    _publish(views, engine, clock)
+                continue
+
+            steps = clock.advance()
+            if steps:
+                engine.step_many(steps, dt)
+                _publish(views, engine, clock)
+            else:
+                time.sleep(_IDLE_SLEEP)
+    finally:
+        del views
+        shm.close()
+
+
+class PhysicsWorker:
+    """在独立进程中运行物理引擎
+
+    以界面进程中的 engine 作为初始状态启动工作进程；之后 engine 成为只读镜像，
+    由 read() 用最新快照更新（theta、omega 与派生量），可视化与读数代码无需改动。
+    修改小球参数后调用 push_row() 把该行同步给工作进程。
+    """
+
+    def __init__(self, engine, dt=ExperimentConfig.SIMULATION_DT,
+                 real_time_factor=ExperimentConfig.REAL_TIME_FACTOR):
+        self.engine = engine
+        n_balls = engine.count
+        size = _HEADER_BYTES + 8 * len(SNAPSHOT_FIELDS) * n_balls
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._views = _views(self._shm.buf, n_balls)
+        self._views[0][:] = 0
+        self.last_sequence = 0
+        self.time = 0.0
+        self.steps = 0
+        self.torn_reads = 0  # 读到写入中的快照而重试的次数
+        self.effective_factor = 0.0  # 实测倍速（仿真时间 / 真实时间）
+        self._mark = None
+
+        # 使用 spawn：子进程只导入物理模块（ai_enhanced.py 导入时不建立场景），
+        # 不会继承界面进程中 VPython 服务器的线程与套接字
+        context = multiprocessing.get_context('spawn')
+        self._commands = context.Queue()
+        state = {name: getattr(engine, name).copy()
+                 for name in ('theta', 'omega', 'mass', 'radius', 'g', 'active')}
+        self._process = context.Process(
+            target=_worker_main, daemon=True,
+            args=(self._shm.name, state, dt, engine.integrator, real_time_factor, self._commands))
+        self._process.start()
+        atexit.register(self.close)
+
+    # 控制命令
+    def start(self):
+        self._commands.put(('start',))
+
+    def pause(self):
+        self._commands.put(('pause',))
+
+    def reset_clock(self):
+        self._commands.put(('reset_clock',))
+
+    def set_integrator(self, name):
+        self._commands.put(('integrator', name))
+
+    def set_speed(self, real_time_factor):
+        self._commands.put(('speed', real_time_factor))
+
+    def push_row(self, row):
+        """把本地 engine 中某一行的状态与参数发送给工作进程"""
+        engine = self.engine
+        self._commands.put(('row', row, {
+            name: getattr(engine, name)[row].item()
+            for name in ('theta', 'omega', 'mass', 'radius', 'g', 'active')}))
+
+    def read(self, max_retries=1000):
+        """读取最新快照并写入本地 engine；没有新快照时返回 False"""
+        header, sim_time, fields = self._views
+        for _ in range(max_retries):
+            sequence = int(header[0])
+            if sequence % 2:
+                self.torn_reads += 1
+                continue
+            if sequence == self.last_sequence:
+                return False
+            values = fields.copy()
+            steps, snapshot_time = int(header[1]), float(sim_time[0])
+            if int(header[0]) != sequence:
+                self.torn_reads += 1
+                continue
+            self.last_sequence = sequence
+            self.steps, self.time = steps, snapshot_time
+            self._measure_speed(snapshot_time)
+            for i, name in enumerate(SNAPSHOT_FIELDS):
+                getattr(self.engine, name)[:] = values[i]
+            return True
+        return False
+
+    def _measure_speed(self, snapshot_time):
+        now = time.perf_counter()
+        if self._mark is None or snapshot_time < self._mark[1]:
+            self._mark = (now, snapshot_time)
+        elif now - self._mark[0] >= 0.5:
+            self.effective_factor = (snapshot_time - self._mark[1]) / (now - self._mark[0])
+            self._mark = (now, snapshot_time)
+
+    @property
+    def alive(self):
+        return self._process.is_alive()
+
+    def close(self):
+        """停止工作进程并释放共享内存"""
+        if self._shm is None:
+            return
+        if self._process.is_alive():
+            self._commands.put(('stop',))
+            self._process.join(timeout=2)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._views = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
@@ -0,0 +1,215 @@
+# 实验数据分析图表
+# 四幅子图（角度、速度、能量、相位图）的绘制。每条曲线先按坐标轴的像素宽度做保留极值的降采样，
+# 点数再多，绘制量也只与图片宽度有关；稠密的曲线层栅格化，保存为 PDF / SVG 时文件不会随点数膨胀。
+# 无界面模式直接使用 Agg 画布（不经过 pyplot，不依赖显示器，也不改变全局后端），
+# 多个文件可以在进程池中并行出图。matplotlib 只在绘图时导入
+#
+# 用法：
+#   python -m plotting physics_data_*.csv           # 每个文件输出 analysis_<文件名>.png
+#   python -m plotting run.pbt --dpi 150 -j 4
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import ExperimentConfig
+
+
+def decimate(y, buckets):
+    """保留极值的降采样，返回保留下来的下标（递增）
+
+    样本按顺序均分为 buckets 段，每段保留最小值点与最大值点；点数不超过 4 × buckets 时不降采样。
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if buckets <= 0 or n <= 4 * buckets:
+        return np.arange(n)
+    size = -(-n // buckets)  # 向上取整，最后一段可能不满
+    full = n // size
+    offsets = np.arange(full) * size
+    blocks = y[:full * size].reshape(full, size)
+    picked = [[0, n - 1], offsets + np.argmin(blocks, axis=1), offsets + np.argmax(blocks, axis=1)]
+    if full * size < n:
+        tail = y[full * size:]
+        picked.append(full * size + np.array([np.argmin(tail), np.argmax(tail)]))
+    return np.unique(np.concatenate(picked))
+
+
+def decimate_path(x, y, width, height):
+    """曲线路径（相位图）的降采样，返回保留下来的下标（递增）
+
+    路径会多次经过同一处，按时间分段取极值会在不同圈之间连出弦线；
+    这里把坐标映射到 width × height 的像素网格，每个被经过的像素只保留第一次经过的点。
+    点数不超过 4 × (width + height) 时不降采样。
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    n = len(x)
+    if width <= 0 or height <= 0 or n <= 4 * (width + height):
+        return np.arange(n)
+    index = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if not len(index):
+        return index
+    cells = np.zeros(len(index), dtype=np.int64)
+    for values, size in ((x[index], width), (y[index], height)):
+        low, span = values.min(), np.ptp(values)
+        pixel = ((values - low) / span * (size - 1)).astype(np.int64) if span else 0
+        cells = cells * size + pixel
+    _, first = np.unique(cells, return_index=True)
+    return np.sort(index[first])
+
+
+def _pixel_size(fig, ax, dpi):
+    """坐标轴在保存的图片中的像素宽高（按保存分辨率，而不是屏幕分辨率）"""
+    box = ax.get_position()
+    return int(box.width * fig.get_figwidth() * dpi), int(box.height * fig.get_figheight() * dpi)
+
+
+def _plot(fig, ax, dpi, x, y, *args, path=False, **kwargs):
+    """按坐标轴像素大小降采样后绘制；降采样后仍然稠密的曲线层栅格化
+
+    path 为真时按像素网格降采样，并以线宽大小的点绘制（相邻像素的点连成曲线，不画跨圈的弦线）。
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    width, height = _pixel_size(fig, ax, dpi)
+    if path:
+        keep = decimate_path(x, y, width, height)
+        if len(keep) < len(x):
+            kwargs.update(linestyle='none', marker='o', markeredgewidth=0,
+                          markersize=kwargs.get('linewidth', 1))
+    else:
+        keep = decimate(y, width)
+    kwargs.setdefault('rasterized', len(keep) > ExperimentConfig.PLOT_RASTERIZE_POINTS)
+    return ax.plot(x[keep], y[keep], *args, **kwargs)
+
+
+def draw_analysis(fig, times, angles, velocities, ke, pe, te, title, angular_velocities=None,
+                  dpi=ExperimentConfig.PLOT_DPI):
+    """在 fig 上绘制四幅分析子图
+
+    angular_velocities 为记录的角速度列；缺省时才由角度数值微分得到；dpi 为保存时的分辨率，决定降采样点数。
+    """
+    times, angles = np.asarray(times), np.asarray(angles)
+    axes = fig.subplots(2, 2)
+    fig.suptitle(f'实验数据分析 - {title}', fontsize=14)
+    # 先确定布局，降采样才能用到各坐标轴的实际像素宽度
+    fig.tight_layout()
+
+    # 角度随时间变化
+    _plot(fig, axes[0, 0], dpi, times, angles, 'b-', linewidth=2)
+    axes[0, 0].set_title('角度变化')
+    axes[0, 0].set_xlabel('时间 (s)')
+    axes[0, 0].set_ylabel('角度 (rad)')
+    axes[0, 0].grid(True, alpha=0.3)
+
+    # 速度随时间变化
+    _plot(fig, axes[0, 1], dpi, times, velocities, 'r-', linewidth=2)
+    axes[0, 1].set_title('速度变化')
+    axes[0, 1].set_xlabel('时间 (s)')
+    axes[0, 1].set_ylabel('速度 (m/s)')
+    axes[0, 1].grid(True, alpha=0.3)
+
+    # 能量随时间变化
+    _plot(fig, axes[1, 0], dpi, times, ke, 'r-', label='动能', linewidth=2)
+    _plot(fig, axes[1, 0], dpi, times, pe, 'b-', label='势能', linewidth=2)
+    _plot(fig, axes[1, 0], dpi, times, te, 'g-', label='总能量', linewidth=2)
+    axes[1, 0].set_title('能量变化')
+    axes[1, 0].set_xlabel('时间 (s)')
+    axes[1, 0].set_ylabel('能量 (J)')
+    axes[1, 0].legend()
+    axes[1, 0].grid(True, alpha=0.3)
+
+    # 相位图（角度 vs 角速度）
+    if angular_velocities is not None:
+        phase_angles = angles
+        angular_velocities = np.asarray(angular_velocities)
+    else:
+        # 旧数据没有角速度列时，用数值微分估计
+        dt = np.diff(times)
+        dtheta = np.diff(angles)
+        angular_velocities = np.divide(dtheta, dt, out=np.zeros_like(dtheta), where=dt > 0)
+        phase_angles = angles[1:]
+
+    if len(angular_velocities):
+        _plot(fig, axes[1, 1], dpi, phase_angles, angular_velocities, 'purple', path=True,
+              linewidth=1, alpha=0.7)
+        axes[1, 1].set_title('相位图')
+        axes[1, 1].set_xlabel('角度 (rad)')
+        axes[1, 1].set_ylabel('角速度 (rad/s)')
+        axes[1, 1].grid(True, alpha=0.3)
+
+    fig.tight_layout()
+    return axes
+
+
+def render_analysis(times, angles, velocities, ke, pe, te, title, filename,
+                    angular_velocities=None, dpi=ExperimentConfig.PLOT_DPI):
+    """无界面绘制分析图表并保存为 filename（Agg 画布，不弹出窗口）"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(12, 10), dpi=dpi)
+    FigureCanvasAgg(fig)
+    draw_analysis(fig, times, angles, velocities, ke, pe, te, title, angular_velocities, dpi)
+    fig.savefig(filename, dpi=dpi, bbox_inches='tight')
+    return filename
+
+
+def analysis_filename(data_filename, extension='png'):
+    """数据文件对应的图表文件名：analysis_<文件名>.<扩展名>，与数据文件放在同一目录"""
+    directory, name = os.path.split(data_filename)
+    stem = os.path.splitext(name)[0]
+    return os.path.join(directory, f"analysis_{stem}.{extension}")
+
+
+def render_recording(data_filename, filename=None, dpi=ExperimentConfig.PLOT_DPI):
+    """读取一个记录文件（CSV 或 .pbt）并出图，返回图表文件名；文件为空时返回 None"""
+    from analysis import load_recording
+
+    data = load_recording(data_filename)
+    if not data or not len(data['time']):
+        return None
+    filename = filename or analysis_filename(data_filename)
+    return render_analysis(data['time'], data['theta'], data['speed'], data['kinetic_energy'],
+                           data['potential_energy'], data['total_energy'],
+                           os.path.basename(data_filename), filename,
+                           angular_velocities=data.get('omega'), dpi=dpi)
+
+
+def render_recordings(data_filenames, processes=None, dpi=ExperimentConfig.PLOT_DPI):
+    """并行为多个记录文件出图，返回 {数据文件: 图表文件或 None}
+
+    processes 缺省为 CPU 核心数与文件数中的较小者，为 1 时在当前进程中顺序出图。
+    每个进程各自读取文件并绘图，主进程不接触数据。
+    """
+    data_filenames = list(data_filenames)
+    processes = min(processes or os.cpu_count() or 1, max(1, len(data_filenames)))
+    if processes == 1:
+        return {name: render_recording(name, dpi=dpi) for name in data_filenames}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {name: pool.submit(render_recording, name, None, dpi) for name in data_filenames}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(prog="python -m plotting",
+                                     description="无界面为记录文件（CSV 或 .pbt）生成分析图表")
+    parser.add_argument('files', nargs='+', help="记录文件")
+    parser.add_argument('--dpi', type=int, default=ExperimentConfig.PLOT_DPI, help="图片分辨率")
+    parser.add_argument('-j', '--processes', type=int, help="并行进程数（缺省为 CPU 核心数）")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = render_recordings(args.files, args.processes, args.dpi)
+    for data_filename, filename in results.items():
+        print(f"{data_filename} -> {filename}" if filename else f"{data_filename}：文件为空，跳过")
+    print(f"{len(results)} 个文件，用时 {time.perf_counter() - start:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
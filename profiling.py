@@ -0,0 +1,147 @@
+# 主循环分阶段计时
+# 用 with profiler.phase('名称'): 包住主循环的各个阶段（物理、箭头、文本、图表、记录……），
+# 每帧把各阶段的累计耗时放入滚动窗口，随时给出分位数；未启用时 phase() 返回共享的空上下文，几乎没有开销
+
+import contextlib
+import csv
+import json
+import time
+
+import numpy as np
+
+from config import ExperimentConfig
+
+_NULL_PHASE = contextlib.nullcontext()
+
+
+class _PhaseTimer:
+    """单个阶段的计时上下文（每次 phase() 新建一个，嵌套或重入时各自记录开始时间）"""
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = self.profiler.clock()
+        return self
+
+    def __exit__(self, *exc):
+        frame = self.profiler._frame
+        frame[self.name] = frame.get(self.name, 0.0) + self.profiler.clock() - self.start
+        return False
+
+
+class PhaseProfiler:
+    """分阶段性能计时器
+
+    同一帧内同一阶段可以进入多次（例如每个物理子步），耗时累加；
+    end_frame() 把本帧各阶段的合计放入长度为 window 的滚动窗口（单位秒）。
+    """
+
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self, enabled=ExperimentConfig.PROFILE_ENABLED,
+                 window=ExperimentConfig.PROFILE_WINDOW, clock=time.perf_counter):
+        self.window = window
+        self.clock = clock
+        self.enabled = enabled
+        self.clear()
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value):
+        self._enabled = bool(value)
+        self._frame = {}
+
+    def clear(self):
+        """清空已采集的数据"""
+        self._frame = {}
+        self.samples = {}  # 阶段 -> 滚动窗口数组
+        self.counts = {}   # 阶段 -> 累计帧数
+        self.frames = 0
+
+    def phase(self, name):
+        """返回阶段计时上下文；未启用时返回空上下文"""
+        if not self._enabled:
+            return _NULL_PHASE
+        return _PhaseTimer(self, name)
+
+    def record(self, name, seconds):
+        """直接记入一段耗时（计入当前帧）"""
+        if self._enabled:
+            self._frame[name] = self._frame.get(name, 0.0) + seconds
+
+    def end_frame(self):
+        """结束一帧：把本帧各阶段的合计耗时放入滚动窗口"""
+        if not self._enabled or not self._frame:
+            return
+        for name, seconds in self._frame.items():
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = np.zeros(self.window)
+                self.counts[name] = 0
+            samples[self.counts[name] % self.window] = seconds
+            self.counts[name] += 1
+        self._frame = {}
+        self.frames += 1
+
+    def summary(self):
+        """各阶段统计（毫秒）：{阶段: {'frames', 'mean', 'p50', 'p95', 'p99', 'max'}}，按平均耗时降序"""
+        result = {}
+        for name, samples in self.samples.items():
+            values = samples[:min(self.counts[name], self.window)] * 1000
+            stats = {'frames': self.counts[name], 'mean': float(values.mean())}
+            for q, value in zip(self.PERCENTILES, np.percentile(values, self.PERCENTILES)):
+                stats[f'p{q}'] = float(value)
+            stats['max'] = float(values.max())
+            result[name] = stats
+        return dict(sorted(result.items(), key=lambda item: -item[1]['mean']))
+
+    def format_table(self):
+        """格式化为等宽文本表格，用于界面上的性能面板"""
+        summary = self.summary()
+        if not summary:
+            return "（暂无数据）"
+        lines = [f"{'阶段':<14}{'平均':>8}{'p50':>8}{'p95':>8}{'p99':>8}{'最大':>8}  (ms/帧)"]
+        for name, stats in summary.items():
+            lines.append(f"{name:<16}{stats['mean']:>8.3f}{stats['p50']:>8.3f}"
+                         f"{stats['p95']:>8.3f}{stats['p99']:>8.3f}{stats['max']:>8.3f}")
+        return "\n".join(lines)
+
+    def export(self, filename):
+        """导出统计结果：.json 包含统计与窗口内的原始样本，其余扩展名导出 CSV 统计表"""
+        summary = self.summary()
+        if str(filename).endswith('.json'):
+            data = {
+                'frames': self.frames,
+                'window': self.window,
+                'summary_ms': summary,
+                'samples_ms': {name: (self._ordered(name) * 1000).tolist() for name in self.samples},
+            }
+            with open(filename, 'w', encoding='utf-8') as file:
+                json.dump(data, file, ensure_ascii=False, indent=2)
+        else:
+            with open(filename, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(['阶段', '帧数', '平均(ms)', 'p50(ms)', 'p95(ms)', 'p99(ms)', '最大(ms)'])
+                for name, stats in summary.items():
+                    writer.writerow([name, stats['frames']] + [
+                        round(stats[key], 4) for key in ('mean', 'p50', 'p95', 'p99', 'max')])
+        return filename
+
+    def _ordered(self, name):
+        """窗口内的样本，按时间先后排列"""
+        count, samples = self.counts[name], self.samples[name]
+        if count <= self.window:
+            return samples[:count]
+        return np.roll(samples, -(count % self.window))
+
+
+# 全局计时器，主程序与 PhysicsBall 共用；默认不启用
+profiler = PhaseProfiler()
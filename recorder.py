@@ -0,0 +1,275 @@
+# 数据记录器
+# 用预分配的列式数组记录每个小球的物理量，支持环形缓冲（只保留最近的数据）与抽样记录
+# DATA_PRECISION 中的小数位数只在导出时应用，记录时保存原始数值
+
+import csv
+import queue
+import threading
+
+import numpy as np
+
+from config import ExperimentConfig
+
+# CSV 表头（与 analyze_exported_data 读取的列名一致）
+CSV_HEADER = ['时间(s)', '小球', '角度(rad)', '角速度(rad/s)', '速度(m/s)',
+              '动能(J)', '势能(J)', '总能量(J)', '向心加速度(m/s²)']
+
+# 数值列：(列名, 数据类型, DATA_PRECISION 中的精度键)
+COLUMNS = [
+    ('time', np.float64, 'time'),
+    ('theta', np.float64, 'angle'),
+    ('omega', np.float64, 'angular_velocity'),
+    ('speed', np.float32, 'speed'),
+    ('kinetic_energy', np.float64, 'energy'),
+    ('potential_energy', np.float64, 'energy'),
+    ('total_energy', np.float64, 'energy'),
+    ('centripetal_acc', np.float32, 'acceleration'),
+]
+# 引擎中对应的数组名（时间列除外）
+ENGINE_FIELDS = [name for name, _, _ in COLUMNS[1:]]
+
+
+def ball_display_name(ball_names, ball_id):
+    """小球编号对应的名称"""
+    if 0 <= ball_id < len(ball_names):
+        return ball_names[ball_id]
+    return f"小球{ball_id + 1}"
+
+
+def format_rows(arrays, ball_names, precision=ExperimentConfig.DATA_PRECISION):
+    """把列数组按 DATA_PRECISION 舍入，生成与原 CSV 相同格式的行"""
+    rounded = [np.round(arrays[name].astype(np.float64), precision[key]).tolist()
+               for name, _, key in COLUMNS]
+    names = [ball_display_name(ball_names, ball_id) for ball_id in arrays['ball_id'].tolist()]
+    for row in zip(rounded[0], names, *rounded[1:]):
+        yield list(row)
+
+
+class DataRecorder:
+    """列式数据记录器
+
+    capacity    —— 预分配的行数；非环形模式下写满后按倍数扩容
+    ring_buffer —— 为真时容量固定，写满后覆盖最旧的数据
+    sample_every —— 每调用 record() 多少次实际记录一次
+    """
+
+    def __init__(self, ball_names=(), capacity=ExperimentConfig.RECORD_CAPACITY,
+                 ring_buffer=ExperimentConfig.RECORD_RING_BUFFER,
+                 sample_every=ExperimentConfig.RECORD_SAMPLE_EVERY,
+                 precision=ExperimentConfig.DATA_PRECISION):
+        self.ball_names = list(ball_names)
+        self.ring_buffer = ring_buffer
+        self.sample_every = max(1, int(sample_every))
+        self.precision = precision
+        self._allocate(capacity)
+        self.clear()
+
+    def _allocate(self, capacity):
+        self.capacity = int(capacity)
+        self.ball_id = np.empty(self.capacity, dtype=np.int32)
+        self.columns = {name: np.empty(self.capacity, dtype=dtype)
+                        for name, dtype, _ in COLUMNS}
+
+    def clear(self):
+        """清空记录（保留已分配的内存）"""
+        self.size = 0        # 有效行数
+        self.head = 0        # 下一行写入位置
+        self.calls = 0       # record() 调用次数，用于抽样
+        self.overwritten = 0  # 环形模式下被覆盖的行数
+        self.total = 0       # 累计写入的行数
+        self.taken = 0       # 已由 take_new() 取走的行数
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        old_ids, old_columns, size = self.ball_id, self.columns, self.size
+        self._allocate(capacity)
+        self.ball_id[:size] = old_ids[:size]
+        for name in self.columns:
+            self.columns[name][:size] = old_columns[name][:size]
+        self.head = size
+
+    def record(self, time, ball_ids, **values):
+        """记录同一时刻的若干小球
+
+        ball_ids 为小球编号数组，values 以 COLUMNS 中的列名给出对应数组。
+        返回是否实际写入（抽样时可能跳过）。
+        """
+        self.calls += 1
+        if (self.calls - 1) % self.sample_every:
+            return False
+
+        ball_ids = np.atleast_1d(ball_ids)
+        if len(ball_ids) == 0:
+            return False
+        self._write(time, ball_ids, values)
+        return True
+
+    def _write(self, time, ball_ids, values):
+        """写入若干行（time 为标量或与 ball_ids 等长的数组）"""
+        n = len(ball_ids)
+        if self.ring_buffer and n > self.capacity:
+            # 一次写入超过容量时，前面的行立即被覆盖，直接跳过
+            skip = n - self.capacity
+            if np.ndim(time):
+                time = time[skip:]
+            ball_ids = ball_ids[skip:]
+            values = {name: values[name][skip:] for name in ENGINE_FIELDS}
+            self.total += skip
+            self.overwritten += skip
+            n = self.capacity
+        if not self.ring_buffer and self.size + n > self.capacity:
+            self._grow(self.size + n)
+
+        positions = (self.head + np.arange(n)) % self.capacity
+        self.ball_id[positions] = ball_ids
+        self.columns['time'][positions] = time
+        for name in ENGINE_FIELDS:
+            self.columns[name][positions] = values[name]
+
+        self.head = (self.head + n) % self.capacity
+        self.total += n
+        if self.ring_buffer:
+            self.overwritten += max(0, self.size + n - self.capacity)
+            self.size = min(self.size + n, self.capacity)
+        else:
+            self.size += n
+
+    def record_engine(self, time, engine, rows=None):
+        """从批量引擎中记录指定行（缺省为激活的小球）"""
+        if rows is None:
+            rows = np.flatnonzero(engine.active)
+        return self.record(time, rows, **{name: getattr(engine, name)[rows]
+                                          for name in ENGINE_FIELDS})
+
+    def record_history(self, times, history):
+        """记录 PendulumEngine.step_many(history=True) 返回的多个时刻
+
+        与对每个时刻调用 record_engine() 的结果（包括抽样）完全相同。返回实际记录的时刻数。
+        """
+        n_steps = len(times)
+        keep = (self.calls + np.arange(n_steps)) % self.sample_every == 0
+        self.calls += n_steps
+        ball_ids = history['rows']
+        if not keep.any() or len(ball_ids) == 0:
+            return 0
+        times = np.asarray(times)[keep]
+        self._write(np.repeat(times, len(ball_ids)), np.tile(ball_ids, len(times)),
+                    {name: history[name][keep].ravel() for name in ENGINE_FIELDS})
+        return len(times)
+
+    def _order(self):
+        """按记录先后顺序排列的有效行下标"""
+        if self.ring_buffer and self.size == self.capacity:
+            return np.roll(np.arange(self.capacity), -self.head)
+        return np.arange(self.size)
+
+    def to_arrays(self):
+        """按时间顺序返回原始数值列（不做舍入）"""
+        order = self._order()
+        arrays = {name: column[order] for name, column in self.columns.items()}
+        arrays['ball_id'] = self.ball_id[order]
+        return arrays
+
+    def take_new(self):
+        """取出上次调用以来新记录的行（按时间顺序的列数组副本），用于流式导出
+
+        环形模式下若新数据多于容量，最旧的部分已被覆盖，只能取到仍在缓冲区中的行。
+        """
+        new = min(self.total - self.taken, self.size)
+        self.taken = self.total
+        order = self._order()[self.size - new:]
+        arrays = {name: column[order] for name, column in self.columns.items()}
+        arrays['ball_id'] = self.ball_id[order]
+        return arrays
+
+    def export_rows(self):
+        """按 DATA_PRECISION 舍入后生成与原 CSV 相同格式的行"""
+        return format_rows(self.to_arrays(), self.ball_names, self.precision)
+
+    def ball_name(self, ball_id):
+        return ball_display_name(self.ball_names, ball_id)
+
+    def export_trajectory(self, filename):
+        """导出为二进制轨迹文件（见 trajectory_format）"""
+        from trajectory_format import TrajectoryWriter
+
+        with TrajectoryWriter(filename, self.ball_names) as writer:
+            writer.write(self.to_arrays())
+        return filename
+
+    def export_csv(self, filename):
+        """导出为 CSV 文件"""
+        with open(filename, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(self.export_rows())
+        return filename
+
+
+class StreamingCSVWriter:
+    """后台流式 CSV 导出
+
+    记录过程中由主循环把新数据批次 submit() 到有界队列，
+    后台线程负责格式化并追加写入文件，每批写完后刷新到磁盘，
+    即使程序中途崩溃，已写入的数据也不会丢失。文件格式与 export_csv 相同。
+    """
+
+    def __init__(self, filename, ball_names=(), precision=ExperimentConfig.DATA_PRECISION,
+                 max_pending_batches=ExperimentConfig.STREAM_QUEUE_SIZE):
+        self.filename = filename
+        self.ball_names = list(ball_names)
+        self.precision = precision
+        self.rows_written = 0
+        self.error = None
+        self._queue = queue.Queue(maxsize=max_pending_batches)
+        self._file = open(filename, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CSV_HEADER)
+        self._file.flush()
+        self._thread = threading.Thread(target=self._run, name="csv-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, arrays):
+        """提交一批列数组；队列已满时阻塞，避免内存无限增长
+
+        写入已经出错（见 error）或后台线程已退出时丢弃该批并返回 False，不会一直阻塞调用方。
+        """
+        if not len(arrays['ball_id']):
+            return True
+        while self.error is None and self._thread.is_alive():
+            try:
+                self._queue.put(arrays, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        while True:
+            arrays = self._queue.get()
+            if arrays is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                self._writer.writerows(format_rows(arrays, self.ball_names, self.precision))
+                self._file.flush()
+                self.rows_written += len(arrays['ball_id'])
+            except Exception as e:
+                # 任何异常都记录下来并继续取队列（丢弃后续批次），线程不退出，submit() 不会卡住
+                self.error = e
+                print(f"错误：流式导出失败 - {type(e).__name__}: {e}")
+
+    def close(self):
+        """写完队列中剩余的数据并关闭文件"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if not self._file.closed:
+            self._file.close()
+        return self.rows_written
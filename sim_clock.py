@@ -0,0 +1,125 @@
+# 仿真计时工具
+# 把物理步长与渲染帧率解耦：每帧根据真实流逝时间决定推进多少个固定物理步；
+# 仿真时间由步数推导，与暂停、帧率无关，并可按倍速慢放或快进
+
+import time
+
+import numpy as np
+
+from config import ExperimentConfig
+
+
+class FixedStepAccumulator:
+    """固定步长累加器
+
+    每次 advance() 把距离上次调用的真实时间累加起来，
+    返回本帧应执行的固定步数，余下不足一步的时间留到下一帧。
+    """
+
+    def __init__(self, dt, max_steps_per_frame=100, clock=time.perf_counter, time_scale=1.0):
+        self.dt = dt
+        self.max_steps_per_frame = max_steps_per_frame  # 防止渲染卡顿后物理步数雪崩
+        self.clock = clock
+        self.time_scale = time_scale  # 每秒真实时间对应的仿真时间（倍速）
+        self.reset()
+
+    def reset(self):
+        """清空累积时间（开始、继续或重置时调用，暂停期间的时间不计入）"""
+        self.accumulator = 0.0
+        self.last_time = None
+        self.dropped_time = 0.0  # 因超过单帧步数上限而丢弃的时间
+
+    def advance(self, now=None):
+        """返回本帧需要执行的物理步数"""
+        if now is None:
+            now = self.clock()
+        if self.last_time is None:
+            self.last_time = now
+            return 0
+        self.accumulator += (now - self.last_time) * self.time_scale
+        self.last_time = now
+
+        # 快进时上限随倍速放大，否则高倍速会被单帧步数上限卡住
+        max_steps = int(self.max_steps_per_frame * max(1.0, self.time_scale))
+        steps = int(self.accumulator / self.dt)
+        if steps > max_steps:
+            self.dropped_time += (steps - max_steps) * self.dt
+            steps = max_steps
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.dt
+        return steps
+
+
+class SimulationClock:
+    """仿真时钟
+
+    仿真时间由已执行的步数推导（time = steps × dt），不受暂停、帧率和真实时间抖动影响，
+    记录的数据与仿真时间严格对应。real_time_factor 为倍速（小于 1 慢放，大于 1 快进），
+    快进时每帧批量执行的步数随之增加。
+    """
+
+    def __init__(self, dt, real_time_factor=ExperimentConfig.REAL_TIME_FACTOR,
+                 max_steps_per_frame=ExperimentConfig.MAX_SUBSTEPS_PER_FRAME,
+                 clock=time.perf_counter):
+        self.dt = dt
+        self.clock = clock
+        self._accumulator = FixedStepAccumulator(dt, max_steps_per_frame, clock)
+        self.running = False
+        self.real_time_factor = real_time_factor
+        self.reset()
+
+    @property
+    def real_time_factor(self):
+        return self._accumulator.time_scale
+
+    @real_time_factor.setter
+    def real_time_factor(self, factor):
+        if factor <= 0:
+            raise ValueError(f"倍速必须大于 0：{factor}")
+        self._accumulator.time_scale = factor
+        self._mark = None
+
+    @property
+    def time(self):
+        """当前仿真时间（秒）"""
+        return self.steps * self.dt
+
+    @property
+    def dropped_time(self):
+        """因渲染跟不上而未能执行的仿真时间"""
+        return self._accumulator.dropped_time
+
+    def reset(self):
+        """仿真时间归零（不改变运行状态）"""
+        self.steps = 0
+        self.effective_factor = 0.0  # 实测倍速
+        self._mark = None            # (真实时间, 步数)，用于计算实测倍速
+        self._accumulator.reset()
+
+    def start(self):
+        """开始或继续计时，暂停期间的真实时间不计入"""
+        self.running = True
+        self._accumulator.reset()
+        self._mark = None
+
+    def pause(self):
+        self.running = False
+
+    def advance(self, now=None):
+        """返回本帧应执行的步数，并把它们计入仿真时间（调用方须执行这些步）"""
+        if not self.running:
+            return 0
+        now = self.clock() if now is None else now
+        steps = self._accumulator.advance(now)
+        self.steps += steps
+        if self._mark is None:
+            self._mark = (now, self.steps)
+        elif now - self._mark[0] >= 0.5:
+            self.effective_factor = (self.steps - self._mark[1]) * self.dt / (now - self._mark[0])
+            self._mark = (now, self.steps)
+        return steps
+
+    def step_times(self, n_steps):
+        """最近 n_steps 步各自结束时的仿真时间"""
+        return np.arange(self.steps - n_steps + 1, self.steps + 1) * self.dt
@@ -0,0 +1,235 @@
+# 无界面仿真
+# 根据小球参数建立批量引擎，推进指定时长，并汇总每个小球的关键物理量
+
+import time
+
+import numpy as np
+
+from analytic import LIBRATION
+from config import ExperimentConfig
+from events import BOTTOM_CROSSING, LOOP, TURNING_POINT
+from physics_engine import PendulumEngine
+
+# run_simulation 的特殊积分器名：无阻尼运动直接用 Jacobi 椭圆函数精确解求值
+ANALYTIC = 'analytic'
+# 自适应步长积分（Dormand-Prince 5(4)，见 adaptive_solver.py），容差为 rtol / atol
+ADAPTIVE = 'adaptive'
+ADAPTIVE_CHUNK_STEPS = 10000  # 自适应路径每段求解的采样点数，内存占用与时长无关
+
+
+def build_engine(balls, gravity=ExperimentConfig.DEFAULT_GRAVITY,
+                 radius=ExperimentConfig.DEFAULT_RADIUS,
+                 integrator=ExperimentConfig.INTEGRATOR):
+    """由小球参数列表（与 PRESET_SCENARIOS 中 'balls' 的格式相同）建立引擎
+
+    每个小球可包含 theta、omega、mass，以及可选的 radius、gravity。
+    """
+    engine = PendulumEngine(integrator)
+    engine.add_balls(
+        mass=[ball.get('mass', 0.1) for ball in balls],
+        radius=[ball.get('radius', radius) for ball in balls],
+        theta=[ball.get('theta', 0.5) for ball in balls],
+        omega=[ball.get('omega', 0) for ball in balls],
+        g=[ball.get('gravity', gravity) for ball in balls],
+    )
+    return engine
+
+
+def run_simulation(balls, duration, dt=ExperimentConfig.SIMULATION_DT,
+                   gravity=ExperimentConfig.DEFAULT_GRAVITY,
+                   radius=ExperimentConfig.DEFAULT_RADIUS,
+                   integrator=ExperimentConfig.INTEGRATOR, sample_every=0, detect_events=False,
+                   rtol=ExperimentConfig.ADAPTIVE_RTOL, atol=ExperimentConfig.ADAPTIVE_ATOL):
+    """无界面运行一组小球
+
+    sample_every > 0 时每隔 sample_every 步保存一次 theta/omega 轨迹，
+    否则只保留逐步更新的汇总量（内存占用与时长无关）。
+    detect_events 为真时在线检测转折点、经过最低点和完成一圈（见 events.py），
+    汇总中增加周期与事件次数，结果中 'events' 为事件记录。
+    integrator 为 ANALYTIC 时不逐步积分（见 _run_analytic）；
+    为 ADAPTIVE 时按容差 rtol / atol 自适应步长积分（见 _run_adaptive）。
+    """
+    if integrator == ANALYTIC:
+        return _run_analytic(balls, duration, dt, gravity, radius, sample_every, detect_events)
+    if integrator == ADAPTIVE:
+        return _run_adaptive(balls, duration, dt, gravity, radius, sample_every, detect_events,
+                             rtol, atol)
+    engine = build_engine(balls, gravity, radius, integrator)
+    detector = engine.attach_events() if detect_events else None
+    n_steps = int(round(duration / dt))
+
+    initial_energy = engine.total_energy.copy()
+    theta_min = engine.theta.copy()
+    theta_max = engine.theta.copy()
+    max_speed = engine.speed.copy()
+    max_energy_error = np.zeros(engine.count)
+
+    trajectory = None
+    if sample_every:
+        n_samples = n_steps // sample_every + 1
+        trajectory = {
+            'times': np.arange(n_samples) * (sample_every * dt),
+            'theta': np.empty((n_samples, engine.count)),
+            'omega': np.empty((n_samples, engine.count)),
+        }
+        trajectory['theta'][0] = engine.theta
+        trajectory['omega'][0] = engine.omega
+
+    start = time.perf_counter()
+    for step in range(1, n_steps + 1):
+        engine.step(dt)
+        np.minimum(theta_min, engine.theta, out=theta_min)
+        np.maximum(theta_max, engine.theta, out=theta_max)
+        np.maximum(max_speed, engine.speed, out=max_speed)
+        np.maximum(max_energy_error, np.abs(engine.total_energy - initial_energy),
+                   out=max_energy_error)
+        if sample_every and step % sample_every == 0:
+            trajectory['theta'][step // sample_every] = engine.theta
+            trajectory['omega'][step // sample_every] = engine.omega
+    elapsed = time.perf_counter() - start
+
+    result = _result(engine, initial_energy, theta_min, theta_max, max_speed, max_energy_error,
+                     n_steps, elapsed, trajectory)
+    if detector is not None:
+        _add_detector_summary(result, detector)
+    return result
+
+
+def _run_adaptive(balls, duration, dt, gravity, radius, sample_every, detect_events, rtol, atol):
+    """自适应步长路径：结果格式与逐步积分相同，可直接比较
+
+    稠密输出在 dt 的等间隔网格上采样，极值、能量漂移与事件都按这些采样点统计；
+    每段最多求解 ADAPTIVE_CHUNK_STEPS 个采样点。'n_steps' 为实际接受的步数，
+    另含 'n_rejected'、'n_evals'（拒绝步数与加速度求值次数），以及 'fixed_step_cost'：
+    缺省积分器以固定步长 dt 跑完同样时长所需的步数与求值次数（见 PendulumEngine.fixed_step_cost）。
+    """
+    engine = build_engine(balls, gravity, radius)
+    detector = engine.attach_events() if detect_events else None
+    n_samples = int(round(duration / dt))
+
+    initial_energy = engine.total_energy.copy()
+    theta_min = engine.theta.copy()
+    theta_max = engine.theta.copy()
+    max_speed = engine.speed.copy()
+    max_energy_error = np.zeros(engine.count)
+
+    trajectory = None
+    if sample_every:
+        n_records = n_samples // sample_every + 1
+        trajectory = {
+            'times': np.arange(n_records) * (sample_every * dt),
+            'theta': np.empty((n_records, engine.count)),
+            'omega': np.empty((n_records, engine.count)),
+        }
+        trajectory['theta'][0] = engine.theta
+        trajectory['omega'][0] = engine.omega
+
+    n_steps = n_rejected = n_evals = 0
+    start = time.perf_counter()
+    for first in range(0, n_samples, ADAPTIVE_CHUNK_STEPS):
+        count = min(ADAPTIVE_CHUNK_STEPS, n_samples - first)
+        chunk = engine.run_adaptive(count * dt, dt, rtol=rtol, atol=atol)
+        n_steps += chunk['n_steps']
+        n_rejected += chunk['n_rejected']
+        n_evals += chunk['n_evals']
+        theta, omega = chunk['theta'][1:], chunk['omega'][1:]  # 第 0 个采样点是段起点
+        np.minimum(theta_min, theta.min(axis=0), out=theta_min)
+        np.maximum(theta_max, theta.max(axis=0), out=theta_max)
+        np.maximum(max_speed, chunk['speed'][1:].max(axis=0), out=max_speed)
+        np.maximum(max_energy_error, np.abs(chunk['total_energy'][1:] - initial_energy).max(axis=0),
+                   out=max_energy_error)
+        if sample_every:
+            steps = np.arange(first + 1, first + len(theta) + 1)
+            keep = steps % sample_every == 0
+            trajectory['theta'][steps[keep] // sample_every] = theta[keep]
+            trajectory['omega'][steps[keep] // sample_every] = omega[keep]
+    elapsed = time.perf_counter() - start
+
+    result = _result(engine, initial_energy, theta_min, theta_max, max_speed, max_energy_error,
+                     n_steps, elapsed, trajectory)
+    result.update(n_rejected=n_rejected, n_evals=n_evals,
+                  fixed_step_cost=engine.fixed_step_cost(n_samples * dt, dt))
+    if detector is not None:
+        _add_detector_summary(result, detector)
+    return result
+
+
+def _run_analytic(balls, duration, dt, gravity, radius, sample_every, detect_events):
+    """精确解快速路径：结果格式与逐步积分相同，步数按 dt 折算以便比较
+
+    采样网格与 sample_every 对应的时刻一致；极值由 AnalyticPendulum.extremes 直接给出，
+    能量漂移恒为 0（不产生逐条事件记录）。精确周期记为 'exact_period'；'period' 与逐步积分的含义一致：
+    事件检测器以同方向相邻两次经过最低点的间隔为周期，因此只有时长内出现过同方向的两次经过
+    （摆动需经过最低点 3 次，转动 2 次）时才有值，否则为 NaN。
+    只适用于无空气阻力、无摩擦的模式（见 analytic.is_frictionless）。
+    """
+    engine = build_engine(balls, gravity, radius)
+    n_steps = int(round(duration / dt))
+    initial_energy = engine.total_energy.copy()
+
+    start = time.perf_counter()
+    exact = engine.advance_analytic(n_steps * dt)
+    theta_min, theta_max, max_omega = exact.extremes(n_steps * dt)
+    trajectory = None
+    if sample_every:
+        times = np.arange(n_steps // sample_every + 1) * (sample_every * dt)
+        theta, omega = exact.state(times[:, None])
+        trajectory = {'times': times, 'theta': theta, 'omega': omega}
+    elapsed = time.perf_counter() - start
+
+    result = _result(engine, initial_energy, theta_min, theta_max, max_omega * engine.radius,
+                     np.zeros(engine.count), n_steps, elapsed, trajectory)
+    if detect_events:
+        counts = exact.event_counts(n_steps * dt)
+        needed = np.where(exact.regime == LIBRATION, 3, 2)  # 摆动时相邻两次经过方向相反
+        measurable = counts['bottom_crossings'] >= needed
+        _add_event_summary(result, np.where(measurable, exact.period, np.nan),
+                           np.where(measurable, 0.0, np.nan), counts)
+        for summary, period in zip(result['summary'], exact.period):
+            summary['exact_period'] = float(period)
+    return result
+
+
+def _add_detector_summary(result, detector):
+    """把事件检测器统计的周期与事件次数写入汇总，结果中 'events' 为事件记录"""
+    periods = detector.periods()
+    _add_event_summary(result, periods['mean'], periods['std'], {
+        'turning_points': detector.counts(TURNING_POINT),
+        'bottom_crossings': detector.counts(BOTTOM_CROSSING),
+        'loops': detector.counts(LOOP),
+    })
+    result['events'] = detector.log
+
+
+def _add_event_summary(result, period, period_std, counts):
+    """把周期与事件次数写入每个小球的汇总"""
+    for i, summary in enumerate(result['summary']):
+        summary['period'] = float(period[i])
+        summary['period_std'] = float(period_std[i])
+        for key, values in counts.items():
+            summary[key] = int(values[i])
+
+
+def _result(engine, initial_energy, theta_min, theta_max, max_speed, max_energy_error,
+            n_steps, elapsed, trajectory):
+    summary = []
+    for i in range(engine.count):
+        summary.append({
+            'ball': i,
+            'final_theta': float(engine.theta[i]),
+            'final_omega': float(engine.omega[i]),
+            'theta_min': float(theta_min[i]),
+            'theta_max': float(theta_max[i]),
+            'max_speed': float(max_speed[i]),
+            'initial_energy': float(initial_energy[i]),
+            'energy_drift': float(max_energy_error[i] / abs(initial_energy[i]))
+                            if initial_energy[i] else float(max_energy_error[i]),
+        })
+
+    return {
+        'summary': summary,
+        'n_steps': n_steps,
+        'elapsed': elapsed,
+        'ball_steps_per_second': n_steps * engine.count / elapsed if elapsed > 0 else float('inf'),
+        'trajectory': trajectory,
+    }
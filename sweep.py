@@ -0,0 +1,183 @@
+# 参数扫描
+# 把预设场景或参数网格展开为仿真任务，用进程池在所有 CPU 核心上并行运行，并汇总为一张结果表
+
+import csv
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from config import ExperimentConfig, PRESET_SCENARIOS
+from simulation import run_simulation
+
+# 属于单个小球的参数，其余参数作用于整个任务
+BALL_KEYS = ('theta', 'omega', 'mass', 'radius', 'gravity')
+
+DEFAULT_JOB = {
+    'duration': 20.0,
+    'dt': ExperimentConfig.SIMULATION_DT,
+    'gravity': ExperimentConfig.DEFAULT_GRAVITY,
+    'radius': ExperimentConfig.DEFAULT_RADIUS,
+    'integrator': ExperimentConfig.INTEGRATOR,
+    'sample_every': 0,
+    'detect_events': False,
+    'rtol': ExperimentConfig.ADAPTIVE_RTOL,  # 只对 integrator='adaptive' 有效
+    'atol': ExperimentConfig.ADAPTIVE_ATOL,
+    'cache': ExperimentConfig.TRAJECTORY_CACHE_ENABLED,  # 为真时相同输入直接读取缓存结果（见 trajectory_cache.py）
+}
+
+
+def make_job(name, balls, **params):
+    """生成一个任务字典"""
+    job = dict(DEFAULT_JOB)
+    job.update(params)
+    job['name'] = name
+    job['balls'] = [dict(ball) for ball in balls]
+    return job
+
+
+def expand_scenarios(names=None, **params):
+    """把 PRESET_SCENARIOS 中的场景展开为任务（names 缺省时展开全部场景）"""
+    names = list(PRESET_SCENARIOS) if names is None else names
+    return [make_job(name, PRESET_SCENARIOS[name]['balls'], **params) for name in names]
+
+
+def expand_grid(grid, base_ball=None, **params):
+    """展开笛卡尔参数网格，每个参数组合对应一个单小球任务
+
+    grid 形如 {'theta': [0.5, 1.0], 'gravity': [1.62, 9.81]}；
+    小球参数（BALL_KEYS）写入小球，其余参数（如 dt、integrator）写入任务。
+    """
+    keys = list(grid)
+    jobs = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        combo = dict(zip(keys, values))
+        ball = dict(base_ball or {'theta': 0.5, 'omega': 0, 'mass': 0.1})
+        job_params = dict(params)
+        for key, value in combo.items():
+            if key in BALL_KEYS:
+                ball[key] = value
+            else:
+                job_params[key] = value
+        name = ', '.join(f"{key}={value}" for key, value in combo.items())
+        jobs.append(make_job(name, [ball], **job_params))
+    return jobs
+
+
+def jobs_from_experiment(definitions, base_ball=None, **params):
+    """把 PhysicsExperiments 各实验方法返回的配置列表转换为任务
+
+    每条配置对应一个单小球任务，缺省的小球参数取自 base_ball。
+    """
+    jobs = []
+    for index, definition in enumerate(definitions):
+        ball = dict(base_ball or {'theta': 0.5, 'omega': 0, 'mass': 0.1})
+        ball.update({key: value for key, value in definition.items() if key in BALL_KEYS})
+        jobs.append(make_job(definition.get('name', f"实验{index + 1}"), [ball], **params))
+    return jobs
+
+
+def run_job(job):
+    """在工作进程中运行单个任务"""
+    simulate = run_simulation
+    if job.get('cache'):
+        from trajectory_cache import cached_simulation as simulate
+    result = simulate(job['balls'], job['duration'], dt=job['dt'],
+                      gravity=job['gravity'], radius=job['radius'],
+                      integrator=job['integrator'], sample_every=job['sample_every'],
+                      detect_events=job.get('detect_events', False),
+                      rtol=job.get('rtol', ExperimentConfig.ADAPTIVE_RTOL),
+                      atol=job.get('atol', ExperimentConfig.ADAPTIVE_ATOL))
+    result['job'] = job
+    return result
+
+
+def _result_rows(index, result):
+    """把一个任务的结果展开为表格行（每个小球一行）"""
+    job = result['job']
+    rows = []
+    for ball, summary in zip(job['balls'], result['summary']):
+        row = {'job': index, 'name': job['name'], 'integrator': job['integrator'],
+               'dt': job['dt'], 'duration': job['duration']}
+        row['theta0'] = ball.get('theta', 0.5)
+        row['omega0'] = ball.get('omega', 0)
+        row['mass'] = ball.get('mass', 0.1)
+        row['gravity'] = ball.get('gravity', job['gravity'])
+        row['radius'] = ball.get('radius', job['radius'])
+        row['cached'] = result.get('cached', False)
+        if 'n_rejected' in result:  # 自适应积分的步数统计（整个任务的）
+            row.update(n_steps=result['n_steps'], n_rejected=result['n_rejected'],
+                       n_evals=result['n_evals'])
+        row.update(summary)
+        rows.append(row)
+    return rows
+
+
+def run_sweep(jobs, processes=None, max_pending=None, keep_trajectories=False,
+              progress=None, cache_stats=None):
+    """并行运行全部任务，返回 (结果表, 轨迹字典)
+
+    processes 缺省为 CPU 核心数，为 1 时在当前进程中顺序运行；
+    progress(已完成数, 总数) 为可选的进度回调。
+    缓存命中与否随结果从工作进程返回，在这里汇总：传入字典 cache_stats 时
+    写入使用缓存的任务的 'hits'、'misses' 与 'hit_rate'。
+    同时提交的任务数不超过 max_pending（缺省为进程数的 2 倍），
+    避免大网格一次性占满内存；只有 keep_trajectories 为真时才保留轨迹。
+    """
+    processes = processes or os.cpu_count() or 1
+    max_pending = max_pending or 2 * processes
+    rows = []
+    trajectories = {}
+    completed = 0
+    hits = misses = 0
+
+    def collect(index, result):
+        nonlocal completed, hits, misses
+        rows.extend(_result_rows(index, result))
+        if 'cached' in result:
+            hits += int(result['cached'])
+            misses += int(not result['cached'])
+        if keep_trajectories and result['trajectory'] is not None:
+            trajectories[index] = result['trajectory']
+        completed += 1
+        if progress:
+            progress(completed, len(jobs))
+
+    if processes == 1:
+        for index, job in enumerate(jobs):
+            collect(index, run_job(job))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            pending = {}
+            job_iter = iter(enumerate(jobs))
+            while True:
+                for index, job in job_iter:
+                    pending[pool.submit(run_job, job)] = index
+                    if len(pending) >= max_pending:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(pending.pop(future), future.result())
+
+    rows.sort(key=lambda row: (row['job'], row['ball']))
+    if cache_stats is not None:
+        cache_stats.update(hits=hits, misses=misses,
+                           hit_rate=hits / (hits + misses) if hits + misses else 0.0)
+    return rows, trajectories
+
+
+def save_sweep_csv(rows, filename):
+    """把扫描结果表保存为 CSV
+
+    各行的列可能不同（例如只有部分任务检测事件、部分结果来自缓存），
+    表头取所有行的列的并集（按首次出现的顺序），某行缺少的列留空。
+    """
+    if not rows:
+        return
+    fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+    with open(filename, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames, restval='')
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"扫描结果已保存到 {filename}")
@@ -0,0 +1,257 @@
+# 仿真结果缓存
+# 以所有影响结果的输入（各小球初始状态与参数、dt、积分器、时长、采样、阻尼设置……）的哈希为键，
+# 把 run_simulation 的结果（汇总、采样轨迹、事件）保存为磁盘上的 .npz 文件；
+# 输入相同时直接读取，不再重新积分。总大小超过预算时按最近最少使用（文件修改时间）淘汰
+#
+# 用法：
+#   python -m trajectory_cache            # 查看缓存条目数与大小
+#   python -m trajectory_cache --clear    # 清空缓存
+
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from config import ExperimentConfig
+from simulation import ADAPTIVE, run_simulation
+
+# 计算方法或存储格式变化时递增，使旧缓存全部失效
+_CACHE_VERSION = 1
+_TIMING_FIELDS = ('elapsed', 'ball_steps_per_second')  # 只对实际计算有意义，命中的结果不带这些字段
+# 保存的结果字段；后三项只有自适应积分才有
+_META_FIELDS = ('summary', 'n_steps', 'n_rejected', 'n_evals', 'fixed_step_cost')
+_BALL_DEFAULTS = {'theta': 0.5, 'omega': 0, 'mass': 0.1}  # 与 simulation.build_engine 的缺省值一致
+
+
+def cache_key(balls, duration, dt=ExperimentConfig.SIMULATION_DT,
+              gravity=ExperimentConfig.DEFAULT_GRAVITY, radius=ExperimentConfig.DEFAULT_RADIUS,
+              integrator=ExperimentConfig.INTEGRATOR, sample_every=0, detect_events=False,
+              rtol=ExperimentConfig.ADAPTIVE_RTOL, atol=ExperimentConfig.ADAPTIVE_ATOL):
+    """由 run_simulation 的全部输入计算缓存键（SHA-256 十六进制串）
+
+    缺省值先展开再参与哈希，因此省略参数与显式给出缺省值得到同一个键；
+    阻尼设置（空气阻力、摩擦）也计入，开启后的结果不会与无阻尼结果混用。
+    容差只对自适应积分有意义，只在 integrator 为 'adaptive' 时计入。
+    """
+    normalized = []
+    for ball in balls:
+        normalized.append({
+            'theta': float(ball.get('theta', _BALL_DEFAULTS['theta'])),
+            'omega': float(ball.get('omega', _BALL_DEFAULTS['omega'])),
+            'mass': float(ball.get('mass', _BALL_DEFAULTS['mass'])),
+            'radius': float(ball.get('radius', radius)),
+            'gravity': float(ball.get('gravity', gravity)),
+        })
+    inputs = {
+        'version': _CACHE_VERSION,
+        'balls': normalized,
+        'duration': float(duration),
+        'dt': float(dt),
+        'integrator': integrator,
+        'sample_every': int(sample_every),
+        'detect_events': bool(detect_events),
+        'air_resistance': [ExperimentConfig.ENABLE_AIR_RESISTANCE, ExperimentConfig.AIR_RESISTANCE_COEFF],
+        'friction': [ExperimentConfig.ENABLE_FRICTION, ExperimentConfig.FRICTION_COEFF],
+    }
+    if integrator == ADAPTIVE:
+        inputs['tolerance'] = [float(rtol), float(atol)]
+    text = json.dumps(inputs, sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class TrajectoryCache:
+    """磁盘结果缓存
+
+    enabled 为假时 get() 总是未命中、put() 不写入（绕过缓存）；只保存结果，不保存计算耗时；
+    命中时更新条目的修改时间，淘汰时先删除修改时间最早的条目。
+    hits / misses / stores / evictions 为本实例的统计。
+    """
+
+    def __init__(self, directory=ExperimentConfig.TRAJECTORY_CACHE_DIR,
+                 max_bytes=ExperimentConfig.TRAJECTORY_CACHE_MAX_BYTES,
+                 enabled=True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key):
+        """读取缓存的结果，未命中时返回 None"""
+        if not self.enabled:
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                result = json.loads(str(data['meta']))
+                for name in _TIMING_FIELDS:  # 旧版本条目中的耗时不是本次测得的
+                    result.pop(name, None)
+                if 'trajectory_times' in data.files:
+                    result['trajectory'] = {name: data[f'trajectory_{name}']
+                                            for name in ('times', 'theta', 'omega')}
+                else:
+                    result['trajectory'] = None
+                if 'events' in data.files:
+                    result['events'] = data['events']
+            os.utime(path)  # 标记为最近使用
+        except (OSError, KeyError, ValueError):
+            # 不存在、被并发淘汰或文件损坏都按未命中处理
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """保存 run_simulation 的结果，然后按大小预算淘汰旧条目"""
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {name: result[name] for name in _META_FIELDS if name in result}
+        arrays = {'meta': np.array(json.dumps(meta, ensure_ascii=False))}
+        if result.get('trajectory') is not None:
+            for name in ('times', 'theta', 'omega'):
+                arrays[f'trajectory_{name}'] = result['trajectory'][name]
+        if 'events' in result:
+            arrays['events'] = result['events']
+        temporary = self._path(key) + f'.{os.getpid()}.tmp.npz'
+        np.savez(temporary, **arrays)
+        os.replace(temporary, self._path(key))  # 原子替换，并发写入同一个键也不会读到半个文件
+        self.stores += 1
+        self.evict()
+
+    def entries(self):
+        """[(路径, 大小, 修改时间)]，按修改时间从旧到新排列"""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith('.npz') or name.endswith('.tmp.npz'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """删除最近最少使用的条目，直到总大小不超过 max_bytes；返回删除的条目数"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self.evictions += removed
+        return removed
+
+    def invalidate(self, key=None):
+        """删除一个条目（key 为 None 时清空整个缓存），返回删除的条目数"""
+        paths = [self._path(key)] if key is not None else [path for path, _, _ in self.entries()]
+        removed = 0
+        for path in paths:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """统计信息字典（含命中率与当前磁盘占用）"""
+        entries = self.entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+        }
+
+
+_default_cache = None
+
+
+def default_cache():
+    """进程内共享的缓存实例（使用 config 中的设置）"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TrajectoryCache()
+    return _default_cache
+
+
+def cached_simulation(balls, duration, dt=ExperimentConfig.SIMULATION_DT,
+                      gravity=ExperimentConfig.DEFAULT_GRAVITY, radius=ExperimentConfig.DEFAULT_RADIUS,
+                      integrator=ExperimentConfig.INTEGRATOR, sample_every=0, detect_events=False,
+                      rtol=ExperimentConfig.ADAPTIVE_RTOL, atol=ExperimentConfig.ADAPTIVE_ATOL,
+                      cache=None, refresh=False):
+    """带缓存的 run_simulation：参数与返回值相同，结果中 'cached' 表示是否来自缓存
+
+    来自缓存的结果没有 'elapsed' 与 'ball_steps_per_second'（那是当初计算时的耗时，不是本次测得的）。
+
+    refresh 为真时忽略已有条目，重新计算并覆盖（单个条目的失效）。
+    """
+    cache = cache or default_cache()
+    key = cache_key(balls, duration, dt, gravity, radius, integrator, sample_every, detect_events,
+                    rtol, atol)
+    if not refresh:
+        result = cache.get(key)
+        if result is not None:
+            result['cached'] = True
+            return result
+    result = run_simulation(balls, duration, dt=dt, gravity=gravity, radius=radius,
+                            integrator=integrator, sample_every=sample_every,
+                            detect_events=detect_events, rtol=rtol, atol=atol)
+    cache.put(key, result)
+    result['cached'] = False
+    return result
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m trajectory_cache", description="仿真结果缓存管理")
+    parser.add_argument('--clear', action='store_true', help="清空缓存")
+    parser.add_argument('--dir', default=ExperimentConfig.TRAJECTORY_CACHE_DIR, help="缓存目录")
+    args = parser.parse_args(argv)
+
+    cache = TrajectoryCache(args.dir)
+    if args.clear:
+        print(f"已删除 {cache.invalidate()} 个缓存条目")
+        return 0
+    stats = cache.stats()
+    print(f"{args.dir}：{stats['entries']} 个条目，{stats['bytes'] / 1024 / 1024:.2f} MB"
+          f"（上限 {cache.max_bytes / 1024 / 1024:.0f} MB）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
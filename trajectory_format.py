@@ -0,0 +1,246 @@
+# 二进制轨迹文件格式（.pbt）
+# 按小球分块的列式存储，每块可选 zlib 压缩，文件末尾附带块索引（时间范围、小球编号、偏移量），
+# 读取时只定位并读取需要的块：未压缩的块直接内存映射，压缩的块按偏移量读取后解压
+#
+# 文件结构：
+#   MAGIC | 头部长度(uint32) | 头部 JSON（列定义、压缩方式）
+#   块 1 | 块 2 | ...（每块依次存放各列的字节）
+#   索引 JSON（小球名称与各块信息） | 索引偏移(uint64) | MAGIC
+
+import csv
+import json
+import struct
+import zlib
+
+import numpy as np
+
+from config import ExperimentConfig
+from recorder import COLUMNS, CSV_HEADER, ball_display_name, format_rows
+
+MAGIC = b'PBLTRAJ1'
+TRAJECTORY_EXTENSION = '.pbt'
+_FOOTER = struct.Struct('<Q')
+_HEADER_LENGTH = struct.Struct('<I')
+
+
+def is_trajectory_file(filename):
+    return str(filename).endswith(TRAJECTORY_EXTENSION)
+
+
+class TrajectoryWriter:
+    """轨迹文件写入器
+
+    write() 接收与 DataRecorder.to_arrays() 相同格式的列数组（含 ball_id），
+    每个小球的数据累积到 chunk_rows 行后写出一块。
+    小球名称在 close() 时随索引写出，在此之前可随时修改 ball_names。
+    """
+
+    def __init__(self, filename, ball_names=(), compression=ExperimentConfig.TRAJECTORY_COMPRESSION,
+                 chunk_rows=ExperimentConfig.TRAJECTORY_CHUNK_ROWS):
+        self.filename = filename
+        self.ball_names = list(ball_names)
+        self.compression = compression
+        self.chunk_rows = chunk_rows
+        self.index = []
+        self._pending = {}  # 小球编号 -> 待写出的列数组列表
+        self._file = open(filename, 'wb')
+        header = json.dumps({
+            'version': 1,
+            'columns': [[name, np.dtype(dtype).str] for name, dtype, _ in COLUMNS],
+            'compression': compression,
+        }, ensure_ascii=False).encode('utf-8')
+        self._file.write(MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+
+    def write(self, arrays):
+        """追加一批数据（可包含多个小球）"""
+        ball_ids = np.asarray(arrays['ball_id'])
+        for ball in np.unique(ball_ids).tolist():
+            mask = ball_ids == ball
+            pending = self._pending.setdefault(ball, [])
+            pending.append({name: np.asarray(arrays[name])[mask] for name, _, _ in COLUMNS})
+            if sum(len(part['time']) for part in pending) >= self.chunk_rows:
+                self._flush_ball(ball)
+
+    def _flush_ball(self, ball):
+        parts = self._pending.pop(ball, [])
+        if not parts:
+            return
+        columns = {name: np.concatenate([part[name] for part in parts]).astype(dtype)
+                   for name, dtype, _ in COLUMNS}
+        total = len(columns['time'])
+        for start in range(0, total, self.chunk_rows):
+            self._write_chunk(ball, {name: values[start:start + self.chunk_rows]
+                                     for name, values in columns.items()})
+
+    def _write_chunk(self, ball, columns):
+        entry = {
+            'ball': ball,
+            't_start': float(columns['time'][0]),
+            't_end': float(columns['time'][-1]),
+            'rows': len(columns['time']),
+            'offset': self._file.tell(),
+            'sizes': [],
+        }
+        for name, _, _ in COLUMNS:
+            data = np.ascontiguousarray(columns[name]).tobytes()
+            if self.compression == 'zlib':
+                data = zlib.compress(data, 6)
+            self._file.write(data)
+            entry['sizes'].append(len(data))
+        self.index.append(entry)
+
+    def close(self):
+        """写出剩余数据与索引"""
+        if self._file.closed:
+            return
+        for ball in list(self._pending):
+            self._flush_ball(ball)
+        index_offset = self._file.tell()
+        index = {'ball_names': self.ball_names, 'chunks': self.index}
+        self._file.write(json.dumps(index, ensure_ascii=False).encode('utf-8'))
+        self._file.write(_FOOTER.pack(index_offset) + MAGIC)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReader:
+    """轨迹文件读取器，按小球和时间范围只读取需要的块"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"不是有效的轨迹文件：{filename}")
+            (length,) = _HEADER_LENGTH.unpack(file.read(_HEADER_LENGTH.size))
+            header = json.loads(file.read(length).decode('utf-8'))
+            file.seek(-(_FOOTER.size + len(MAGIC)), 2)
+            footer = file.read(_FOOTER.size + len(MAGIC))
+            if footer[_FOOTER.size:] != MAGIC:
+                raise ValueError(f"轨迹文件不完整（缺少索引）：{filename}")
+            (index_offset,) = _FOOTER.unpack(footer[:_FOOTER.size])
+            end = file.tell() - len(footer)
+            file.seek(index_offset)
+            index = json.loads(file.read(end - index_offset).decode('utf-8'))
+        self.columns = [(name, np.dtype(dtype)) for name, dtype in header['columns']]
+        self.compression = header['compression']
+        self.ball_names = index['ball_names']
+        self.index = index['chunks']
+
+    @property
+    def ball_ids(self):
+        return sorted({entry['ball'] for entry in self.index})
+
+    @property
+    def n_rows(self):
+        return sum(entry['rows'] for entry in self.index)
+
+    def select_chunks(self, ball=None, t_start=None, t_end=None):
+        """返回与小球/时间范围有交集的块索引项"""
+        selected = []
+        for entry in self.index:
+            if ball is not None and entry['ball'] != ball:
+                continue
+            if t_start is not None and entry['t_end'] < t_start:
+                continue
+            if t_end is not None and entry['t_start'] > t_end:
+                continue
+            selected.append(entry)
+        return selected
+
+    def _read_chunk(self, file, entry, names):
+        chunk = {}
+        offset = entry['offset']
+        for (name, dtype), size in zip(self.columns, entry['sizes']):
+            if name in names:
+                if self.compression == 'zlib':
+                    file.seek(offset)
+                    values = np.frombuffer(zlib.decompress(file.read(size)), dtype=dtype)
+                else:
+                    values = np.memmap(self.filename, dtype=dtype, mode='r',
+                                       offset=offset, shape=(entry['rows'],))
+                chunk[name] = values
+            offset += size
+        return chunk
+
+    def iter_chunks(self, ball=None, t_start=None, t_end=None, columns=None):
+        """逐块读取，返回列数组字典（含 ball_id），并按时间范围裁剪"""
+        names = set(columns or [name for name, _ in self.columns]) | {'time'}
+        with open(self.filename, 'rb') as file:
+            for entry in self.select_chunks(ball, t_start, t_end):
+                chunk = self._read_chunk(file, entry, names)
+                mask = np.ones(entry['rows'], dtype=bool)
+                if t_start is not None:
+                    mask &= chunk['time'] >= t_start
+                if t_end is not None:
+                    mask &= chunk['time'] <= t_end
+                if not mask.all():
+                    chunk = {name: values[mask] for name, values in chunk.items()}
+                chunk['ball_id'] = np.full(int(mask.sum()), entry['ball'], dtype=np.int32)
+                yield chunk
+
+    def read(self, ball=None, t_start=None, t_end=None, columns=None):
+        """读取并合并所选数据（按时间排序）"""
+        chunks = list(self.iter_chunks(ball, t_start, t_end, columns))
+        if not chunks:
+            return {}
+        data = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+        order = np.lexsort((data['ball_id'], data['time']))
+        return {name: values[order] for name, values in data.items()}
+
+    def ball_name(self, ball_id):
+        return ball_display_name(self.ball_names, ball_id)
+
+
+def csv_to_trajectory(csv_filename, trajectory_filename, **writer_options):
+    """把导出的 CSV 转换为轨迹文件"""
+    from analysis import iter_chunks
+
+    ball_ids = {}
+    with TrajectoryWriter(trajectory_filename, **writer_options) as writer:
+        for chunk in iter_chunks(csv_filename):
+            ids = np.array([ball_ids.setdefault(name, len(ball_ids))
+                            for name in chunk['ball'].tolist()], dtype=np.int32)
+            arrays = {name: chunk[name] for name, _, _ in COLUMNS}
+            arrays['ball_id'] = ids
+            writer.write(arrays)
+        writer.ball_names = list(ball_ids)
+    return trajectory_filename
+
+
+def trajectory_to_csv(trajectory_filename, csv_filename, precision=ExperimentConfig.DATA_PRECISION):
+    """把轨迹文件转换回 export_data 的 CSV 格式（按时间、小球顺序排列）"""
+    reader = TrajectoryReader(trajectory_filename)
+    data = reader.read()
+    with open(csv_filename, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        if data:
+            writer.writerows(format_rows(data, reader.ball_names, precision))
+    return csv_filename
+
+
+def main():
+    """命令行转换：python trajectory_format.py 输入文件 输出文件（按扩展名判断方向）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CSV 与二进制轨迹文件互相转换")
+    parser.add_argument('source')
+    parser.add_argument('target')
+    parser.add_argument('--no-compression', action='store_true', help="不压缩（可内存映射读取）")
+    args = parser.parse_args()
+
+    if is_trajectory_file(args.target):
+        compression = None if args.no_compression else ExperimentConfig.TRAJECTORY_COMPRESSION
+        csv_to_trajectory(args.source, args.target, compression=compression)
+    else:
+        trajectory_to_csv(args.source, args.target)
+    print(f"已转换：{args.source} -> {args.target}")
+
+
+if __name__ == "__main__":
+    main()